@@ -0,0 +1,4 @@
+"""Performance benchmarks for ofxstatement-russian plugins.
+
+Run ``python -m benchmarks --help`` from the project root.
+"""
@@ -0,0 +1,54 @@
+"""Micro-benchmark: datetime.strptime against plugins' date parsers.
+
+Usage::
+
+    python -m benchmarks.dates [--rows N]
+"""
+
+import argparse
+import random
+import timeit
+from datetime import datetime, timedelta
+
+from ofxstatement.plugins.dates import date_parser
+
+# format used by plugin(s) -> seconds between consecutive operations
+FORMATS = {
+    '%d.%m.%Y %H:%M:%S': ('tinkoff', 300),
+    '%d.%m.%Y %H:%M': ('avangard', 300),
+    '%d.%m.%Y': ('sberbank_csv', 300),
+    '%Y-%m-%d %H:%M:%S': ('vtb', 300),
+    '%Y-%m-%d': ('vtb', 300),
+    '%d.%m.%y': ('alfabank', 300),
+}
+
+
+def sample(format, rows, step, seed=1):
+    rnd = random.Random(seed)
+    current = datetime(2019, 1, 1)
+    values = []
+    for _ in range(rows):
+        current += timedelta(seconds=rnd.randrange(step * 2))
+        values.append(current.strftime(format))
+    return values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.dates')
+    parser.add_argument('--rows', type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    for format, (plugin, step) in FORMATS.items():
+        values = sample(format, args.rows, step)
+        strptime = datetime.strptime
+        baseline = min(timeit.repeat(lambda: [strptime(v, format) for v in values], number=1, repeat=3))
+        uncached = date_parser(format, cache_size=0)
+        fast = min(timeit.repeat(lambda: [uncached(v) for v in values], number=1, repeat=3))
+        memoized = date_parser(format, cache_size=4096)
+        cached = min(timeit.repeat(lambda: [memoized(v) for v in values], number=1, repeat=3))
+        print('%-14s %-20s strptime %7.3fs  fast %7.3fs (x%.1f)  fast+cache %7.3fs (x%.1f)' % (
+            plugin, format, baseline, fast, baseline / fast, cached, baseline / cached))
+
+
+if __name__ == '__main__':
+    main()
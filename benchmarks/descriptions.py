@@ -0,0 +1,86 @@
+"""Micro-benchmark: Alfabank user date extraction before and after parse_description().
+
+Dates of every record of a generated Alfabank statement with user_date on:
+the previous code formatted and searched an uncompiled pattern per record and
+parsed both operation and user date, parse_description() scans description
+once with a precompiled pattern and caches results. Recurring case draws
+descriptions from a small set, as recurring payments do.
+Usage::
+
+    python -m benchmarks.descriptions [--rows 100k] [--distinct 500]
+"""
+
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from ofxstatement.plugins.alfabank import AlfabankRecord, date_format, delimiter, parse_description
+from ofxstatement.plugins.dates import date_parser
+from ofxstatement.plugins.records import read_records
+
+from .run import get_plugin, parse_size, sample_path
+
+
+def find_user_date(param):
+    # user date search of AlfabankStatementParser before parse_description()
+    date_pattern = '\\d{2}\\.\\d{2}\\.\\d{2}'
+    m = re.search('{0} ({0})'.format(date_pattern), param)
+    if m:
+        return m.group(1)
+    else:
+        return None
+
+
+def previous(records):
+    parse_date = date_parser(date_format)
+    for op_time, description in records:
+        date = parse_date(op_time)
+        user_date = find_user_date(description)
+        if user_date:
+            date = parse_date(user_date)
+
+
+def current(records):
+    parse_date = date_parser(date_format)
+    parse_description.cache_clear()
+    for op_time, description in records:
+        operation = parse_description(description)
+        date = operation.user_date if operation else parse_date(op_time)
+
+
+def measure(function, records):
+    start = time.perf_counter()
+    function(records)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.descriptions')
+    parser.add_argument('--rows', default='100k')
+    parser.add_argument('--distinct', type=int, default=500,
+                        help='distinct descriptions in recurring case (default: %(default)s)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    rows = parse_size(args.rows)
+    path = sample_path(args.workdir, 'alfabank', rows)
+    with open(path, 'r', encoding=get_plugin('alfabank').get_encoding()) as f:
+        f.readline()
+        records = [(r.op_time, r.description) for r in read_records(f, AlfabankRecord, delimiter)]
+    rnd = random.Random(1)
+    pool = records[:args.distinct]
+    cases = [('unique', records), ('recurring', [rnd.choice(pool) for _ in records])]
+
+    for name, case in cases:
+        baseline = min(measure(previous, case) for _ in range(3))
+        seconds = min(measure(current, case) for _ in range(3))
+        print('%-9s %d records: previous %.3fs, parse_description %.3fs, x%.2f' % (
+            name, len(case), baseline, seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
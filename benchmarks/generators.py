@@ -0,0 +1,258 @@
+#    Synthetic statement generators for ofxstatement-russian benchmarks
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Deterministic generators of statement files in each bank's format.
+
+Every generator takes an output path, a number of transaction rows and a seed
+and writes a file that the corresponding plugin accepts as is. Output only
+depends on the arguments, so the same (plugin, rows, seed) triple always
+produces byte-identical files.
+"""
+
+import csv
+import random
+from datetime import datetime, timedelta
+
+DEFAULT_SEED = 20200101
+
+START_DATE = datetime(2019, 1, 1)
+
+RUS_MONTHS = ['ЯНВ', 'ФЕВ', 'МАР', 'АПР', 'МАЙ', 'ИЮН', 'ИЮЛ', 'АВГ', 'СЕН', 'ОКТ', 'НОЯ', 'ДЕК']
+
+MERCHANTS = [
+    'PEREKRESTOK KRYLATSKOY',
+    'PYATEROCHKA 1234',
+    'AZBUKA VKUSA',
+    'YANDEX.TAXI',
+    'MOSMETRO',
+    'OZON.RU',
+    'WILDBERRIES',
+    'APTEKA 36,6',
+    'SHOKOLADNITSA',
+    'SBOL',
+]
+CITIES = ['MOSCOW', 'MOSKVA', 'SANKT-PETERBU', 'KAZAN', 'NOGINSK']
+CATEGORIES = [
+    ('Супермаркеты', '5411'),
+    ('Транспорт', '4121'),
+    ('Рестораны', '5812'),
+    ('Аптеки', '5912'),
+    ('Переводы', ''),
+    ('Наличные', '6011'),
+]
+
+
+def _dates(rnd, rows, start=START_DATE):
+    """Yield non-decreasing datetimes, dozens of operations per day"""
+    current = start
+    for _ in range(rows):
+        current += timedelta(seconds=rnd.randrange(0, 600))
+        yield current
+
+
+def _amount(rnd, low=1, high=50000):
+    return rnd.randrange(low * 100, high * 100)
+
+
+def _fmt_comma(kopecks):
+    return '%d,%02d' % divmod(kopecks, 100)
+
+
+def _fmt_dot(kopecks):
+    return '%d.%02d' % divmod(kopecks, 100)
+
+
+def generate_tinkoff(path, rows, seed=DEFAULT_SEED):
+    """Tinkoff CSV: quoted, header row, every 100th operation is declined"""
+    rnd = random.Random(seed)
+    types = [
+        ('Оплата в %s' % m, category, mcc) for m in MERCHANTS for category, mcc in CATEGORIES[:4]
+    ] + [
+        ('Пополнение. Тинькофф Банк. Бонус', 'Бонусы', ''),
+        ('Снятие наличных', 'Наличные', '6011'),
+        ('Внешний банковский перевод', 'Переводы', ''),
+        ('Плата за обслуживание', 'Услуги банка', ''),
+    ]
+    with open(path, 'w', encoding='cp1251', newline='') as f:
+        writer = csv.writer(f, delimiter=';', quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(['Дата операции', 'Дата платежа', 'Номер карты', 'Статус', 'Сумма операции',
+                         'Валюта операции', 'Сумма платежа', 'Валюта платежа', 'Кэшбэк', 'Категория',
+                         'MCC', 'Описание', 'Бонусы (включая кэшбэк)'])
+        for i, date in enumerate(_dates(rnd, rows)):
+            description, category, mcc = rnd.choice(types)
+            amount = _fmt_comma(_amount(rnd))
+            if not description.startswith('Пополнение'):
+                amount = '-' + amount
+            writer.writerow([
+                date.strftime('%d.%m.%Y %H:%M:%S'),
+                date.strftime('%d.%m.%Y'),
+                '*%04d' % rnd.randrange(10000),
+                'FAILED' if i % 100 == 99 else 'OK',
+                amount, 'RUB', amount, 'RUB', '', category, mcc, description, '0,00',
+            ])
+    return rows
+
+
+def generate_avangard(path, rows, seed=DEFAULT_SEED):
+    """Avangard CSV: no header, dot decimals, optional operation time"""
+    rnd = random.Random(seed)
+    types = [
+        ('Покупка', False),
+        ('Покупка', False),
+        ('Зачисление', True),
+        ('Перевод с карты', False),
+        ('Комиссия за операцию', False),
+        ('Наличные', False),
+        ('Внесение на счет', True),
+    ]
+    with open(path, 'w', encoding='cp1251', newline='') as f:
+        writer = csv.writer(f, delimiter=';', lineterminator='\n')
+        for date in _dates(rnd, rows):
+            op_type, income = rnd.choice(types)
+            amount = _fmt_dot(_amount(rnd))
+            purchase = op_type == 'Покупка'
+            writer.writerow([
+                date.strftime('%d.%m.%Y %H:%M'),
+                amount if income else '',
+                '' if income else amount,
+                op_type,
+                (date - timedelta(days=1)).strftime('%d.%m.%Y %H:%M') if purchase else '',
+                '5321****%04d' % rnd.randrange(10000) if purchase else '',
+                amount,
+                'RUB',
+                '5411' if purchase else '',
+                rnd.choice(MERCHANTS) if purchase else '',
+            ])
+    return rows
+
+
+def generate_sberbank_csv(path, rows, seed=DEFAULT_SEED):
+    """SberBank CSV: utf-8 with BOM, header row, trailing delimiter"""
+    rnd = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write('﻿Тип карты;Номер карты;Дата совершения операции;Дата обработки операции;'
+                'Код авторизации;Тип операции;Город совершения операции;Страна совершения операции;'
+                'Описание;Валюта операции;Сумма в валюте операции;Сумма в валюте счета;\n')
+        for date in _dates(rnd, rows):
+            amount = _amount(rnd)
+            sign = '' if rnd.random() < 0.2 else '-'
+            f.write('Основная;*6833;%s;%s;%06d;%s;%s;RUS;%s;;;%s%s;\n' % (
+                date.strftime('%d.%m.%Y'),
+                (date + timedelta(days=rnd.randrange(2))).strftime('%d.%m.%Y'),
+                rnd.randrange(1000000),
+                rnd.choice(['4829', '6011', '5411', '']),
+                rnd.choice(CITIES),
+                rnd.choice(MERCHANTS),
+                sign, _fmt_comma(amount)))
+    return rows
+
+
+def generate_alfabank(path, rows, seed=DEFAULT_SEED):
+    """Alfabank CSV: header row, card operations carry a user date in description"""
+    rnd = random.Random(seed)
+    with open(path, 'w', encoding='cp1251', newline='') as f:
+        f.write('Тип счёта;Номер счета;Валюта;Дата операции;Референс проводки;Описание операции;'
+                'Приход;Расход;\n')
+        for i, date in enumerate(_dates(rnd, rows)):
+            amount = _fmt_comma(_amount(rnd))
+            kind = rnd.randrange(10)
+            if kind == 0:
+                description = 'Комиссия за переводы в рублях за период поруч.поданы ч/з ИнтернетБанк'
+                income, withdraw = '0', amount
+            elif kind == 1:
+                description = '{VO%05d} Перечисление ден. средств (зарплата)' % rnd.randrange(100000)
+                income, withdraw = amount, '0'
+            else:
+                user_date = date - timedelta(days=rnd.randrange(3))
+                description = '123456++++++6789    %08d\\123\\%s\\%-22s%s %s %10s  RUR MCC5411' % (
+                    rnd.randrange(100000000), rnd.choice(CITIES), rnd.choice(MERCHANTS),
+                    date.strftime('%d.%m.%y'), user_date.strftime('%d.%m.%y'), amount.replace(',', '.'))
+                income, withdraw = '0', amount
+            f.write('Тек. счёт;11111111111111111111;RUR;%s;ABC%012d;%s;%s;%s;\n' % (
+                date.strftime('%d.%m.%y'), i, description, income, withdraw))
+    return rows
+
+
+def generate_vtb(path, rows, seed=DEFAULT_SEED):
+    """VTB CSV: period, card and balance blocks followed by the operations table"""
+    rnd = random.Random(seed)
+    dates = list(_dates(rnd, rows))
+    amounts = [-_amount(rnd, high=20000) for _ in range(rows)]
+    withdraw = sum(amounts)
+    end_date = dates[-1] if dates else START_DATE
+    with open(path, 'w', encoding='cp1251', newline='') as f:
+        f.write('Начало периода;%s\n' % START_DATE.strftime('%Y-%m-%d'))
+        f.write('Конец периода;%s\n' % end_date.strftime('%Y-%m-%d'))
+        f.write('\n')
+        f.write('Выписка по счету/карте;Номер\n')
+        f.write("Карта с кредитной составляющей;'462235******0069\n")
+        f.write('\n\n')
+        f.write('Валюта;Баланс на конец периода;Поступления;Списания;Заблокировано\n')
+        f.write('RUR;%s;0,00;-%s;0,00\n' % (_fmt_comma(10 ** 12 + withdraw), _fmt_comma(-withdraw)))
+        f.write('\n\n')
+        f.write('Номер карты/счета/договора;Дата операции;Дата обработки;Сумма операции;Валюта операции;'
+                'Сумма пересчитанная в валюту счета;Валюта счета;Основание;Статус\n')
+        for i, (date, amount) in enumerate(zip(dates, amounts)):
+            processing = i >= rows - 3
+            value = '-' + _fmt_comma(-amount)
+            f.write("'462235******7428;%s;%s;%s;RUR;%s;RUR;Карта *1234 %s;%s\n" % (
+                date.strftime('%Y-%m-%d %H:%M:%S'),
+                '' if processing else (date + timedelta(days=1)).strftime('%Y-%m-%d'),
+                value, value, rnd.choice(MERCHANTS),
+                'В обработке' if processing else 'Исполнено'))
+    return rows
+
+
+def generate_sberbank_txt(path, rows, seed=DEFAULT_SEED):
+    """SberBank legacy TXT report: fixed-width two-line transactions"""
+    rnd = random.Random(seed)
+    start_balance = 10 ** 12
+    balance = start_balance
+    card = ['VISA GOLD', 'XXXX XXXX XXX4 6122', 'ОСНОВНАЯ']
+    separator = '--------------------+-----+-----+-------+--------------------------+---------------+--------------\n'
+    with open(path, 'w', encoding='cp1251', newline='') as f:
+        f.write('                                   С Б Е Р Б А Н К  Р О С С И И\n')
+        f.write('                                       ОТЧЕТ ПО СЧЕТУ КАРТЫ\n\n')
+        f.write('ЛИМИТ ОВЕРДРАФТА:                    0.00'
+                '                                            ВАЛЮТА СЧЕТА\n')
+        f.write('%s RUR\n\n\n' % (' ' * 93))
+        f.write('ОСТАТОК НА НАЧАЛО ПЕРИОДА:%64s+\n' % _fmt_dot(start_balance))
+        f.write(separator)
+        f.write('     ТИП КАРТЫ,     |ДАТА |ДАТА |   №   |            ВИД,          |          СУММА|        СУММА\n')
+        f.write(separator)
+        for i, date in enumerate(_dates(rnd, rows)):
+            amount = _amount(rnd, high=20000)
+            credit = rnd.random() < 0.4
+            balance += amount if credit else -amount
+            value = _fmt_dot(amount)
+            f.write('%-20s%02d%s %02d%s%02d %06d %-22s RUR %15s %11s%s\n' % (
+                card[i] if i < len(card) else '',
+                date.day, RUS_MONTHS[date.month - 1],
+                date.day, RUS_MONTHS[date.month - 1], date.year % 100,
+                rnd.randrange(1000000), rnd.choice(MERCHANTS), value, value, 'CR' if credit else ''))
+            f.write('%44s%-13sRU\n' % ('', rnd.choice(CITIES)))
+        f.write(separator)
+        f.write('               ***************** ИТОГО ПО СТРАНИЦЕ%45s\n' % _fmt_dot(abs(balance - start_balance)))
+        f.write('ОСТАТОК НА КОНЕЦ ПЕРИОДА:%65s+\n' % _fmt_dot(balance))
+    return rows
+
+
+GENERATORS = {
+    'tinkoff': generate_tinkoff,
+    'avangard': generate_avangard,
+    'sberbank_csv': generate_sberbank_csv,
+    'alfabank': generate_alfabank,
+    'vtb': generate_vtb,
+    'sberbank_txt': generate_sberbank_txt,
+}
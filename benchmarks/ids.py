@@ -0,0 +1,57 @@
+"""Micro-benchmark: statement.generate_transaction_id against plugins' id schemes.
+
+Hashes (date, memo, amount) of every transaction of a generated statement.
+Usage::
+
+    python -m benchmarks.ids [--plugin tinkoff] [--rows 100k]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from ofxstatement import statement
+from ofxstatement.plugins.ids import COMPAT, FAST, id_generator
+
+from .run import PLUGINS, get_plugin, parse_size, sample_path
+
+
+def measure(function, transactions):
+    start = time.perf_counter()
+    for date, memo, amount in transactions:
+        function(date, memo, amount)
+    return time.perf_counter() - start
+
+
+def generate_transaction_id(date, memo, amount):
+    return statement.generate_transaction_id(statement.StatementLine(date=date, memo=memo, amount=amount))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.ids')
+    parser.add_argument('--plugin', default='tinkoff', choices=sorted(PLUGINS))
+    parser.add_argument('--rows', default='100k')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    rows = parse_size(args.rows)
+    path = sample_path(args.workdir, args.plugin, rows)
+    plugin = get_plugin(args.plugin)
+    with open(path, 'r', encoding=plugin.get_encoding()) as f:
+        lines = plugin.create_parser(f).parse().lines
+    transactions = [(line.date or line.date_user, line.memo, line.amount) for line in lines]
+
+    baseline = min(measure(generate_transaction_id, transactions) for _ in range(3))
+    print('%d ids: generate_transaction_id %.3fs (%.0f ids/s)' % (len(transactions), baseline,
+                                                                len(transactions) / baseline))
+    for scheme in (COMPAT, FAST):
+        # new generator every time, so memoized dates are not reused between runs
+        seconds = min(measure(id_generator(scheme), transactions) for _ in range(3))
+        print('%d ids: %-6s scheme %.3fs (%.0f ids/s), x%.2f' % (
+            len(transactions), scheme, seconds, len(transactions) / seconds, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
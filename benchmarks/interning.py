@@ -0,0 +1,89 @@
+"""Micro-benchmark: memory of parsed statements with and without string pools.
+
+Parses a generated statement of every plugin using interning pools and
+again with pools replaced by pass-through ones, and reports memory held by
+the statement after parse, as traced by tracemalloc. Usage::
+
+    python -m benchmarks.interning [--rows 100k] [--plugin tinkoff]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ofxstatement.plugins.interning import Memo, StringPool
+
+from .run import get_plugin, parse_size, sample_path
+
+PLUGINS = ['tinkoff', 'avangard', 'sberbank_csv', 'alfabank', 'vtb']
+
+
+class Computed:
+    """Memo without the cache: builds a new value on every lookup"""
+
+    def __init__(self, function):
+        self.function = function
+
+    def __getitem__(self, args):
+        return self.function(*args)
+
+
+class Unpooled:
+    """StringPool without the pool: returns the value looked up"""
+
+    def __getitem__(self, value):
+        return value
+
+
+def disable_pools(parser):
+    for name, pool in list(vars(parser).items()):
+        if isinstance(pool, Memo):
+            setattr(parser, name, Computed(pool.function))
+        elif isinstance(pool, StringPool):
+            setattr(parser, name, Unpooled())
+
+
+def parse(plugin, path, pooled):
+    """Return (statement, seconds, bytes held by statement after parse)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'r', encoding=plugin.get_encoding()) as f:
+        parser = plugin.create_parser(f)
+        if not pooled:
+            disable_pools(parser)
+        statement = parser.parse()
+    seconds = time.perf_counter() - start
+    del parser
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return statement, seconds, size
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.interning')
+    parser.add_argument('--rows', default='100k')
+    parser.add_argument('--plugin', action='append', choices=PLUGINS)
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    rows = parse_size(args.rows)
+    for name in args.plugin or PLUGINS:
+        path = sample_path(args.workdir, name, rows)
+        plugin = get_plugin(name)
+        unpooled, unpooled_seconds, unpooled_size = parse(plugin, path, False)
+        pooled, pooled_seconds, pooled_size = parse(plugin, path, True)
+        assert [vars(line) for line in pooled.lines] == [vars(line) for line in unpooled.lines]
+        del unpooled, pooled
+        print('%-12s %d lines: without pools %.1f MB %.2fs, with pools %.1f MB %.2fs, saved %.1f MB (%.0f%%)' % (
+            name, rows, unpooled_size / 2 ** 20, unpooled_seconds, pooled_size / 2 ** 20, pooled_seconds,
+            (unpooled_size - pooled_size) / 2 ** 20, 100 * (unpooled_size - pooled_size) / unpooled_size))
+
+
+if __name__ == '__main__':
+    main()
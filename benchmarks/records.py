@@ -0,0 +1,59 @@
+"""Micro-benchmark: csv.DictReader against plugins' record tuples.
+
+Reads a generated Tinkoff statement and touches the fields parse_record()
+uses. Usage::
+
+    python -m benchmarks.records [--rows 1M]
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+from ofxstatement.plugins import tinkoff
+from ofxstatement.plugins.records import read_records
+
+from .run import parse_size, sample_path
+
+
+def read_dicts(path):
+    with open(path, 'r', encoding=tinkoff.t_encoding) as f:
+        f.readline()
+        for line in csv.DictReader(f, delimiter=tinkoff.t_delimiter, fieldnames=tinkoff.t_fieldnames):
+            (line['status'], line['currency'], line['op_time'], line['amount'], line['description'],
+             line['category'], line['MCC'], line['card'])
+
+
+def read_tuples(path):
+    with open(path, 'r', encoding=tinkoff.t_encoding) as f:
+        f.readline()
+        for line in read_records(f, tinkoff.TinkoffRecord, tinkoff.t_delimiter):
+            (line.status, line.currency, line.op_time, line.amount, line.description,
+             line.category, line.MCC, line.card)
+
+
+def measure(function, path):
+    start = time.perf_counter()
+    function(path)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.records')
+    parser.add_argument('--rows', default='1M')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    rows = parse_size(args.rows)
+    path = sample_path(args.workdir, 'tinkoff', rows)
+    dicts = min(measure(read_dicts, path) for _ in range(3))
+    tuples = min(measure(read_tuples, path) for _ in range(3))
+    print('%d rows: DictReader %.3fs (%.0f rows/s), read_records %.3fs (%.0f rows/s), x%.2f' % (
+        rows, dicts, rows / dicts, tuples, rows / tuples, dicts / tuples))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,267 @@
+#    Benchmark runner for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Run plugin benchmarks and compare them against a stored baseline.
+
+Each (plugin, size) case is parsed in a freshly spawned interpreter so that
+peak RSS belongs to that case alone. Reported phases:
+
+decode
+    separate pass reading the whole file through the text I/O layer
+split_records
+    time spent pulling records out of ``split_records()`` (includes decoding)
+parse_record
+    time spent in ``parse_record()`` excluding transaction id generation
+id_generation
+    time spent in parser's ``transaction_id()`` or ``statement.generate_transaction_id``
+
+SberBank TXT has no record layer: lines of the input file are its records and
+``run()`` is its ``parse_record()``.
+
+Usage::
+
+    python -m benchmarks --sizes 10k,100k --save benchmarks/baseline.json
+    python -m benchmarks --sizes 10k,100k --compare benchmarks/baseline.json
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from unittest import mock
+
+from ofxstatement import statement
+from ofxstatement.parser import StatementParser
+from ofxstatement.ui import UI
+
+from .generators import DEFAULT_SEED, GENERATORS
+
+try:
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None
+
+PLUGINS = {
+    'tinkoff': ('ofxstatement.plugins.tinkoff', 'TinkoffPlugin', {'account': 'bench'}, 'cp1251'),
+    'avangard': ('ofxstatement.plugins.avangard', 'AvangardPlugin', {'account': 'bench'}, 'cp1251'),
+    'sberbank_csv': ('ofxstatement.plugins.sberbank_csv', 'SberBankCSVPlugin', {}, 'utf-8'),
+    'alfabank': ('ofxstatement.plugins.alfabank', 'AlfabankPlugin', {}, 'cp1251'),
+    'vtb': ('ofxstatement.plugins.vtb', 'VtbPlugin', {}, 'cp1251'),
+    'sberbank_txt': ('ofxstatement.plugins.sberbank_txt', 'SberBankTxtPlugin', {}, 'cp1251'),
+}
+
+DEFAULT_SIZES = '10k,100k,1M'
+DEFAULT_TOLERANCE = 0.25
+
+
+def parse_size(value):
+    multipliers = {'k': 10 ** 3, 'm': 10 ** 6}
+    suffix = value[-1:].lower()
+    if suffix in multipliers:
+        return int(value[:-1]) * multipliers[suffix]
+    return int(value)
+
+
+def format_size(rows):
+    if rows % 10 ** 6 == 0:
+        return '%dM' % (rows // 10 ** 6)
+    if rows % 10 ** 3 == 0:
+        return '%dk' % (rows // 10 ** 3)
+    return str(rows)
+
+
+def sample_path(workdir, plugin, rows, seed=DEFAULT_SEED):
+    """Return path to generated sample, generating it on first use"""
+    ext = 'txt' if plugin == 'sberbank_txt' else 'csv'
+    path = os.path.join(workdir, '%s-%s-%d.%s' % (plugin, format_size(rows), seed, ext))
+    if not os.path.exists(path):
+        tmp = path + '.tmp'
+        GENERATORS[plugin](tmp, rows, seed)
+        os.replace(tmp, path)
+    return path
+
+
+def get_plugin(name, settings=None):
+    module, cls, default_settings, _ = PLUGINS[name]
+    plugin_cls = getattr(importlib.import_module(module), cls)
+    return plugin_cls(UI(), dict(default_settings, **(settings or {})))
+
+
+class PhaseTimer:
+    """Accumulates wall time spent in named phases"""
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, phase, elapsed):
+        self.totals[phase] = self.totals.get(phase, 0.0) + elapsed
+
+    def iterate(self, phase, iterable):
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(phase, clock() - start)
+                return
+            self.add(phase, clock() - start)
+            yield item
+
+    def wrap(self, phase, function):
+        clock = time.perf_counter
+
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(phase, clock() - start)
+
+        return timed
+
+
+def measure_decode(path, encoding):
+    start = time.perf_counter()
+    with open(path, 'r', encoding=encoding) as f:
+        for _ in f:
+            pass
+    return time.perf_counter() - start
+
+
+def run_case(plugin, path, rows):
+    """Parse one generated file with instrumentation, return result dict"""
+    encoding = PLUGINS[plugin][3]
+    timer = PhaseTimer()
+    decode = measure_decode(path, encoding)
+
+    parser = get_plugin(plugin).get_parser(path)
+    fin = parser.fin
+    if type(parser).split_records is not StatementParser.split_records:
+        split_records = parser.split_records
+        parser.split_records = lambda: timer.iterate('split_records', split_records())
+        parser.parse_record = timer.wrap('parse_record', parser.parse_record)
+    else:
+        parser.fin = timer.iterate('split_records', parser.fin)
+        parser.run = timer.wrap('parse_record', parser.run)
+
+    if hasattr(parser, 'transaction_id'):
+        parser.transaction_id = timer.wrap('id_generation', parser.transaction_id)
+    generate_id = timer.wrap('id_generation', statement.generate_transaction_id)
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+            mock.patch.object(statement, 'generate_transaction_id', generate_id):
+        start = time.perf_counter()
+        result = parser.parse()
+        total = time.perf_counter() - start
+    fin.close()
+
+    phases = dict(timer.totals)
+    phases['decode'] = decode
+    if 'parse_record' in phases:
+        phases['parse_record'] -= phases.get('id_generation', 0.0)
+
+    return {
+        'plugin': plugin,
+        'rows': rows,
+        'lines': len(result.lines),
+        'seconds': total,
+        'rows_per_sec': rows / total if total else 0.0,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else None,
+        'phases': phases,
+    }
+
+
+def run_isolated(plugin, path, rows):
+    """Run case in a fresh interpreter, so peak RSS is not shared"""
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_case, plugin, path, rows).result()
+
+
+def case_key(result):
+    return '%s/%s' % (result['plugin'], format_size(result['rows']))
+
+
+def compare(results, baseline, tolerance):
+    """Return list of regressions: cases slower than baseline by more than tolerance"""
+    regressions = []
+    for result in results:
+        key = case_key(result)
+        expected = baseline.get(key)
+        if not expected:
+            continue
+        limit = expected['rows_per_sec'] * (1 - tolerance)
+        if result['rows_per_sec'] < limit:
+            regressions.append((key, result['rows_per_sec'], expected['rows_per_sec']))
+    return regressions
+
+
+def print_result(result, out=sys.stdout):
+    phases = result['phases']
+    out.write('%-24s %10d rows %12.0f rows/s %10s KB  %s\n' % (
+        case_key(result), result['lines'], result['rows_per_sec'],
+        result['peak_rss_kb'] if result['peak_rss_kb'] is not None else '-',
+        '  '.join('%s=%.3fs' % (phase, phases[phase]) for phase in sorted(phases))))
+
+
+def make_args_parser():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description='Benchmark ofxstatement-russian plugins')
+    parser.add_argument('--plugins', default=','.join(PLUGINS),
+                        help='comma separated plugin names (default: all)')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help='comma separated row counts, k/M suffixes allowed (default: %s)' % DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED, help='generator seed')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'),
+                        help='directory to keep generated samples in')
+    parser.add_argument('--save', metavar='FILE', help='write results as a new baseline')
+    parser.add_argument('--compare', metavar='FILE', help='fail if slower than given baseline')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help='allowed relative slowdown against baseline (default: %s)' % DEFAULT_TOLERANCE)
+    return parser
+
+
+def main(argv=None):
+    args = make_args_parser().parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    results = []
+    for rows in [parse_size(size) for size in args.sizes.split(',')]:
+        for plugin in args.plugins.split(','):
+            path = sample_path(args.workdir, plugin, rows, args.seed)
+            result = run_isolated(plugin, path, rows)
+            print_result(result)
+            results.append(result)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({case_key(r): r for r in results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for key, actual, expected in regressions:
+            print('REGRESSION %s: %.0f rows/s, baseline %.0f rows/s' % (key, actual, expected))
+        if regressions:
+            return 1
+    return 0
@@ -0,0 +1,52 @@
+"""Startup benchmark: import time of plugin modules, as python -X importtime reports it.
+
+Every plugin module is imported in a fresh interpreter which has already
+imported ofxstatement.tool, the way ofxstatement command line tool loads
+plugins, so only the cost added by the plugin is counted. Best of --repeat
+runs is reported with the slowest modules it imported. Usage::
+
+    python -m benchmarks.startup [--repeat 5] [--top 5]
+"""
+
+import argparse
+import subprocess
+import sys
+
+from .run import PLUGINS
+
+BASELINE = 'ofxstatement.tool'
+
+
+def import_times(module):
+    """Import module after BASELINE in a fresh interpreter, return [(name, self us, cumulative us)]"""
+    code = 'import %s; import %s' % (BASELINE, module)
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], stderr=subprocess.PIPE,
+                            universal_newlines=True, check=True).stderr
+    times = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(own), int(cumulative)))
+    names = [name for name, _, _ in times]
+    # everything imported for the baseline comes before it in the output
+    return times[names.index(BASELINE) + 1:]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.startup')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    modules = sorted(module for module, _, _, _ in PLUGINS.values())
+    for module in modules:
+        best = min((import_times(module) for _ in range(args.repeat)), key=lambda times: times[-1][2])
+        total = best[-1][2]
+        slowest = sorted(best[:-1], key=lambda time: -time[1])[:args.top]
+        print('%-36s %6.1f ms  %s' % (module, total / 1000, ', '.join(
+            '%s %.1f' % (name, own / 1000) for name, own, _ in slowest)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import pytest
+
+from benchmarks import run
+from benchmarks.generators import GENERATORS
+
+ROWS = 250
+
+# rows the plugin is expected to drop from a generated file
+SKIPPED = {
+    'tinkoff': ROWS // 100,
+}
+
+
+@pytest.mark.parametrize('plugin', sorted(GENERATORS))
+def test_generated_sample_parses(plugin, tmpdir):
+    path = run.sample_path(str(tmpdir), plugin, ROWS)
+
+    s = run.get_plugin(plugin).get_parser(path).parse()
+
+    assert len(s.lines) == ROWS - SKIPPED.get(plugin, 0)
+    assert all(l.amount for l in s.lines)
+
+
+@pytest.mark.parametrize('plugin', sorted(GENERATORS))
+def test_generator_is_deterministic(plugin, tmpdir):
+    first, second = tmpdir.join('first'), tmpdir.join('second')
+    GENERATORS[plugin](str(first), ROWS, 1)
+    GENERATORS[plugin](str(second), ROWS, 1)
+
+    assert first.read_binary() == second.read_binary()
+
+
+def test_run_case_reports_phases(tmpdir):
+    path = run.sample_path(str(tmpdir), 'tinkoff', ROWS)
+
+    result = run.run_case('tinkoff', path, ROWS)
+
+    assert result['lines'] == ROWS - SKIPPED['tinkoff']
+    assert set(result['phases']) == {'decode', 'split_records', 'parse_record', 'id_generation'}
+    assert result['rows_per_sec'] > 0
+
+
+def test_compare_reports_regressions():
+    baseline = {'vtb/10k': {'rows_per_sec': 1000.0}}
+    results = [{'plugin': 'vtb', 'rows': 10000, 'rows_per_sec': 700.0}]
+
+    assert run.compare(results, baseline, 0.25) == [('vtb/10k', 700.0, 1000.0)]
+    assert run.compare(results, baseline, 0.5) == []
@@ -0,0 +1,83 @@
+"""Micro-benchmark: memory of parsed transactions, Transaction against StatementLine.
+
+Parses a generated statement keeping every transaction, as parse() and
+parallel workers do, once as slotted Transaction objects and once converted
+to StatementLine ones, and reports memory they hold as traced by
+tracemalloc. Then reports peak memory of streaming OFX conversion of the
+same file. Usage::
+
+    python -m benchmarks.transactions [--rows 1M] [--plugin tinkoff] [--parallel 4]
+"""
+
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+
+from ofxstatement.plugins.streaming import write_ofx
+from ofxstatement.plugins.transactions import to_lines
+
+from .run import get_plugin, parse_size, sample_path
+
+
+def held(plugin, path, convert):
+    """Return (seconds, bytes held by list of parsed transactions)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with open(path, 'r', encoding=plugin.get_encoding()) as f:
+        lines = plugin.create_parser(f).iter_lines()
+        lines = list(to_lines(lines) if convert else lines)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del lines
+    return seconds, size
+
+
+def streamed(plugin, path):
+    """Return (seconds, peak bytes) of converting file to OFX written to /dev/null"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    parser = plugin.get_parser(path)
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            write_ofx(parser, out)
+    finally:
+        parser.close()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.transactions')
+    parser.add_argument('--rows', default='1M')
+    parser.add_argument('--plugin', default='tinkoff')
+    parser.add_argument('--parallel', default='4', help="'parallel' setting of streamed parallel case")
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'ofxstatement-russian-bench'))
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    rows = parse_size(args.rows)
+    path = sample_path(args.workdir, args.plugin, rows)
+    plugin = get_plugin(args.plugin)
+
+    line_seconds, line_size = held(plugin, path, True)
+    slot_seconds, slot_size = held(plugin, path, False)
+    print('%s %d rows held: StatementLine %.1f MB %.2fs, Transaction %.1f MB %.2fs, -%.0f%%' % (
+        args.plugin, rows, line_size / 2 ** 20, line_seconds, slot_size / 2 ** 20, slot_seconds,
+        100 * (line_size - slot_size) / line_size))
+    for name, settings in (('serial', {}), ('parallel=' + args.parallel, {'parallel': args.parallel})):
+        seconds, peak = streamed(get_plugin(args.plugin, settings), path)
+        print('%s %d rows streamed to OFX, %s: peak %.1f MB, %.2fs' % (
+            args.plugin, rows, name, peak / 2 ** 20, seconds))
+
+
+if __name__ == '__main__':
+    main()
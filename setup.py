@@ -39,6 +39,11 @@ setup(name='ofxstatement-russian',
                   'sberbank_txt = ofxstatement.plugins.sberbank_txt:SberBankTxtPlugin',
                   'alfabank = ofxstatement.plugins.alfabank:AlfabankPlugin',
                   'vtb = ofxstatement.plugins.vtb:VtbPlugin',
+              ],
+          'console_scripts':
+              [
+                  'ofxstatement-batch = ofxstatement.plugins.batch:run',
+                  'ofxstatement-server = ofxstatement.plugins.server:run',
               ]
           },
       install_requires=['ofxstatement'],
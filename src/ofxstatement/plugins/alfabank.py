@@ -15,13 +15,18 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import csv
 import re
-from decimal import Decimal
+from collections import namedtuple
+from functools import lru_cache
+from itertools import count
 
-from ofxstatement import statement
-from ofxstatement.parser import StatementParser
 from ofxstatement.plugin import Plugin
+from ofxstatement.plugins.amounts import parse_amount
+from ofxstatement.plugins.columnar import classify_types, filter_columns, new_table, read_columns, select
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.dates import date_parser
+from ofxstatement.plugins.formats import Amount, Format, FormatStatementParser, TypeRule
+from ofxstatement.plugins.parallel import ParallelStatementParser, parallel_workers
 
 # Тип счёта;Номер счета;Валюта;Дата операции;Референс проводки;Описание операции;Приход;Расход;
 
@@ -29,101 +34,159 @@ from ofxstatement.plugin import Plugin
 delimiter = ';'
 default_encoding = 'cp1251'
 fieldnames = ['acc_name', 'acc', 'currency', 'op_time', 'refnum', 'description', 'income', 'withdraw']
+AlfabankRecord = namedtuple('AlfabankRecord', fieldnames)
 type_map = {
     u"Комиссия за ": 'SRVCHG'
 }
 
 
-def parse_type(type, amount):
-    for filter in type_map.keys():
-        if type.startswith(filter):
-            return type_map[filter]
+date_format = '%d.%m.%y'
+# card operation: '123456++++++6789    11111111\123\CITY\MERCHANT    03.05.17 01.05.17    1500.00  RUR MCC1234',
+# card mask, terminal, code, city and merchant followed by transaction and user dates
+user_date_re = re.compile(r'\d{2}\.\d{2}\.\d{2} (\d{2}\.\d{2}\.\d{2})')
+# recurring payments repeat descriptions
+DESCRIPTION_CACHE_SIZE = 4096
 
-    result = None
+CardOperation = namedtuple('CardOperation', ['user_date', 'merchant'])
 
-    if amount > 0:
-        result = 'DEBIT'
-    elif amount < 0:
-        result = 'CREDIT'
 
-    return result
+@lru_cache(maxsize=DESCRIPTION_CACHE_SIZE)
+def parse_description(description):
+    """Return CardOperation of description, None if it has no user date
 
+    User date is the second one of the first pair of dates in description,
+    merchant is the last of backslash separated terminal fields preceding
+    it, None if there are none.
+    """
+    match = user_date_re.search(description)
+    if match is None:
+        return None
+    prefix = description[:match.start()]
+    merchant = prefix.rpartition('\\')[2].strip() if '\\' in prefix else None
+    return CardOperation(date_parser(date_format)(match.group(1)), merchant or None)
+
+
+alfabank_format = Format(
+    record=AlfabankRecord, delimiter=delimiter, skip_lines=1, date_format=date_format,
+    amount=Amount('income', otherwise='withdraw'), trntype=TypeRule('description', type_map),
+    memo='{description}', refnum='refnum')
 
-class AlfabankStatementParser(StatementParser):
-    statement = None
+
+class AlfabankStatementParser(FormatStatementParser):
+    # number of lines preceding transaction records
+    header_lines = 1
+    profile_hooks = {'parse_datetime': 'parse_date', 'parse_description': 'parse_description',
+                     'parse_type': 'parse_type'}
+    format = alfabank_format
+    parse_description = staticmethod(parse_description)
 
     def __init__(self, fin):
-        super().__init__()
-        self.date_format = '%d.%m.%y'
-        self.statement = statement.Statement()
-        self.fin = fin
-        # Skip 1st row with column's headers
-        self.fin.readline()
-        self.cur_record = 1
+        super().__init__(fin)
+        self.date_format = date_format
         self.user_date = False
-
-    def split_records(self):
-        return csv.DictReader(self.fin, delimiter=delimiter, fieldnames=fieldnames)
+        # user date and merchant of card operations as DTUSER and NAME
+        self.card_details = False
 
     def parse_record(self, line):
-        transaction = statement.StatementLine()
-
         if not self.statement.account_id:
-            self.statement.account_id = line['acc']
+            self.statement.account_id = line.acc
 
         if not self.statement.currency:
-            self.statement.currency = line['currency']
+            self.statement.currency = line.currency
 
-        if not line['currency'] == self.statement.currency:
-            print("Transaction %s currency '%s' differ from account currency '%s'." % (
-                line['op_time'], line['currency'], self.statement.currency))
+        if not line.currency == self.statement.currency:
+            self.diagnostics.skip(self.cur_record, "currency %s differs from account currency %s",
+                                  line.currency, self.statement.currency, detail=line.op_time)
             return None
 
-        transaction.date = self.parse_datetime(line['op_time'])
-        date_user = self.try_find_user_date(line['description'])
-
-        if self.user_date and date_user:
-            transaction.date = self.parse_datetime(date_user)
+        # amount, type, reference number and memo as alfabank_format says
+        transaction = self.build_transaction(line)
 
-        transaction.amount = self.get_amount(line['income'], line['withdraw'])
+        operation = self.parse_description(line.description)
+        if self.card_details and operation:
+            transaction.date_user = operation.user_date
+            # merchants repeat in descriptions unique by card and date, share them
+            transaction.payee = self.strings[operation.merchant]
 
-        transaction.trntype = parse_type(line['description'], transaction.amount)
-        transaction.refnum = line['refnum']
-
-        transaction.memo = line['description']
+        if self.user_date and operation:
+            transaction.date = operation.user_date
+        else:
+            transaction.date = self.parse_datetime(line.op_time)
 
         if transaction.trntype:
             return transaction
         else:
             return None
 
-    def get_amount(self, income, withdraw):
-        income_val = Decimal(income.replace(',', '.'))
-        withdraw_val = Decimal(withdraw.replace(',', '.'))
-        if income_val == 0:
-            return -withdraw_val
+    def parse_columns(self):
+        columns = read_columns(self.fin, AlfabankRecord, delimiter)
+        first_record = self.cur_record + 1
+        self.cur_record += len(columns.acc)
+
+        if columns.acc:
+            if not self.statement.account_id:
+                self.statement.account_id = columns.acc[0]
+            if not self.statement.currency:
+                self.statement.currency = columns.currency[0]
+        keep = []
+        for number, currency, op_time in zip(count(first_record), columns.currency, columns.op_time):
+            if not currency == self.statement.currency:
+                self.diagnostics.skip(number, "currency %s differs from account currency %s",
+                                      currency, self.statement.currency, detail=op_time)
+                keep.append(False)
+            else:
+                keep.append(True)
+        columns = filter_columns(columns, keep)
+
+        parse_date = date_parser(self.date_format)
+        operations = list(map(self.parse_description, columns.description))
+        user_dates = [operation and operation.user_date for operation in operations]
+        if self.user_date:
+            dates = [user_date or parse_date(op_time) for user_date, op_time in zip(user_dates, columns.op_time)]
         else:
-            return income_val
+            dates = list(map(parse_date, columns.op_time))
+        amounts = [self.get_amount(income, withdraw) for income, withdraw in zip(columns.income, columns.withdraw)]
+        trntypes = classify_types(columns.description, amounts, self.type_classifier,
+                                  self.format.trntype.type_map)
 
-    @staticmethod
-    def try_find_user_date(param):
-        date_pattern = '\\d{2}\\.\\d{2}\\.\\d{2}'
-        m = re.search('{0} ({0})'.format(date_pattern), param)
-        if m:
-            return m.group(1)
+        if self.card_details:
+            payees = [operation and self.strings[operation.merchant] for operation in operations]
         else:
-            return None
+            user_dates = payees = None
+        table = new_table(len(dates), date=dates, date_user=user_dates, trntype=trntypes, amount=amounts,
+                          refnum=columns.refnum, memo=columns.description, payee=payees)
+        self.diagnostics.report()
+        return select(table, trntypes)
+
+    @staticmethod
+    def split_key(line):
+        """Return (account, currency) of statement record belongs to, see split module"""
+        return line.acc, line.currency
+
+    def get_amount(self, income, withdraw):
+        amount = parse_amount(income)
+        if amount == 0:
+            return -parse_amount(withdraw)
+        return amount
 
 
 class AlfabankPlugin(Plugin):
     """AlfaBank CSV (https://www.alfabank.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'Alfabank', user_date='true', card_details='false')
+
+    def get_encoding(self):
+        return self.settings.get('file_encoding', default_encoding)
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=self.settings.get('file_encoding', default_encoding))
-        parser = AlfabankStatementParser(f)
-        parser.statement.currency = self.settings.get('currency')
-        parser.statement.account_id = self.settings.get('account')
-        parser.statement.bank_id = self.settings.get('bank', 'Alfabank')
-        parser.user_date = self.settings.get('user_date', 'true') == 'true'
-        return parser
+        if parallel_workers(self.settings):
+            return ParallelStatementParser(self, fin, AlfabankStatementParser.header_lines)
+        return self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(AlfabankStatementParser(f), self.config)
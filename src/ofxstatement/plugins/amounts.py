@@ -0,0 +1,31 @@
+#    Amount parsing for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from decimal import Decimal
+
+_SPACES = (' ', '\xa0')
+
+
+def parse_amount(value):
+    """Parse localized amount into exact Decimal
+
+    Decimal separator is comma or dot, thousands may be separated by spaces
+    (no-break spaces too). Digits are kept as written, so str() of the
+    result, which generated transaction ids are computed from, does not
+    depend on the separators used.
+    """
+    for space in _SPACES:
+        if space in value:
+            value = value.replace(space, '')
+    return Decimal(value.replace(',', '.'))
@@ -16,11 +16,12 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ofxstatement.parser import StatementParser
 from ofxstatement.plugin import Plugin
-from ofxstatement import statement
-from datetime import datetime
-import csv
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.fingerprints import incremental
+from ofxstatement.plugins.formats import Amount, Format, FormatStatementParser, TypeRule
+from ofxstatement.plugins.parallel import ParallelStatementParser, parallel_workers
+from collections import namedtuple
 
 # file format options
 av_delimiter = ';'
@@ -29,6 +30,7 @@ av_encoding = 'cp1251'
 av_currency = 'RUB'
 av_fieldnames = ['tr_time', 'debit', 'credit', 'type', 'op_time', 'card', 'currency_value',
                  'currency', 'MCC', 'description']
+AvangardRecord = namedtuple('AvangardRecord', av_fieldnames)
 av_type_map = {
     u"Зачисление": 'CREDIT',
     u"Покупка": 'PAYMENT',
@@ -57,69 +59,39 @@ av_type_map = {
 }
 
 
-def parse_type(type, amount):
-    for filter in av_type_map.keys():
-        if type.startswith(filter):
-            return av_type_map[filter]
+av_format = Format(
+    record=AvangardRecord, delimiter=av_delimiter, skip_lines=0, date_format=av_time_format,
+    date=('op_time', 'tr_time'), amount=Amount('debit', minus='credit'), trntype=TypeRule('type', av_type_map),
+    memo='{description|type}[, {MCC}][, {card}]', id='date', float_ids=True)
 
-    result = None
 
-    if amount > 0:
-        result = 'DEBIT'
-    elif amount < 0:
-        result = 'CREDIT'
-
-    # print("Unknown type \"%s\", consider %s"%(type, result))
-    return result
-
-
-class AvangardStatementParser(StatementParser):
-    statement = None
-
-    def __init__(self, fin):
-        super().__init__()
-        self.statement = statement.Statement()
-        self.fin = fin
-
-    def split_records(self):
-        return csv.DictReader(self.fin, delimiter=av_delimiter, fieldnames=av_fieldnames)
-
-    def parse_record(self, line):
-        transaction = statement.StatementLine()
-
-        transaction.date = datetime.strptime(line[('op_time' if line['op_time'] else 'tr_time')],
-                                             av_time_format)
-
-        transaction.amount = (float(line['debit']) if line['debit'] else 0) - (
-            float(line['credit']) if line['credit'] else 0)
-
-        transaction.trntype = parse_type(line['type'], transaction.amount)
-
-        transaction.memo = line['description'] if line['description'] else line['type']
-
-        if line['MCC']:
-            transaction.memo = "%s, %s" % (transaction.memo, line['MCC'])
-
-        if line['card']:
-            transaction.memo = "%s, %s" % (transaction.memo, line['card'])
-
-        # as csv file does not contain explicit id of transaction, generating artificial one
-        transaction.id = statement.generate_transaction_id(transaction)
-
-        if transaction.trntype:
-            return transaction
-        else:
-            return None
+class AvangardStatementParser(FormatStatementParser):
+    # number of lines preceding transaction records
+    header_lines = 0
+    profile_hooks = {'parse_date': 'parse_date', 'parse_type': 'parse_type', 'format_memo': 'format_memo',
+                     'transaction_id': 'transaction_id'}
+    format = av_format
 
 
 class AvangardPlugin(Plugin):
     """Avangard Bank CSV (http://avangard.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'Avangard', currency=av_currency, account_required=True)
+
+    def get_encoding(self):
+        return av_encoding
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=av_encoding)
-        parser = AvangardStatementParser(f)
-        parser.statement.currency = self.settings.get('currency', av_currency)
-        parser.statement.account_id = self.settings['account']
-        parser.statement.bank_id = self.settings.get('bank', 'Avangard')
-        return parser
+        if parallel_workers(self.settings):
+            parser = ParallelStatementParser(self, fin, AvangardStatementParser.header_lines)
+        else:
+            parser = self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+        return incremental(self, parser)
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(AvangardStatementParser(f), self.config)
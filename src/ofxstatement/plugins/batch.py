@@ -0,0 +1,223 @@
+#    Batch statement conversion for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Convert many statement files at once on a shared pool of worker processes.
+
+Every worker imports plugins once and then converts files one after another,
+so interpreter startup and plugin import are not paid per file. Files are
+matched to plugins by glob patterns of their names::
+
+    ofxstatement-batch -m '*.txt=sberbank_txt' -m 'vtb_*.csv=vtb' -o out/ exports/
+
+As with 'ofxstatement convert -t', plugin name may be a section of
+ofxstatement configuration file, then plugin and its settings are taken from
+there. Plugin name 'auto' picks plugin by contents of the file, see sniff
+module::
+
+    ofxstatement-batch -m '*=auto' -o out/ exports/
+"""
+
+import argparse
+import fnmatch
+import glob
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from ofxstatement import configuration, plugin
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins import fingerprints
+from ofxstatement.plugins.sniff import plugin_settings, sniff
+from ofxstatement.plugins.split import split_enabled, write_split_ofx
+from ofxstatement.plugins.streaming import write_ofx
+
+ConversionResult = namedtuple('ConversionResult', 'path plugin output rows seconds error skipped')
+
+# plugin name telling to detect format of file
+AUTO = 'auto'
+
+
+def collect_files(sources):
+    """Expand directories and glob patterns into a sorted list of files"""
+    files = set()
+    for source in sources:
+        if os.path.isdir(source):
+            names = (os.path.join(source, name) for name in os.listdir(source))
+        else:
+            names = glob.glob(source)
+        files.update(name for name in names if os.path.isfile(name))
+    return sorted(files)
+
+
+def match_plugin(path, patterns):
+    """Return plugin name for the first (pattern, plugin) pair matching file name"""
+    name = os.path.basename(path)
+    for pattern, plugin_name in patterns:
+        if fnmatch.fnmatch(name, pattern):
+            return plugin_name
+    return None
+
+
+def resolve_plugin(name, config=None, path=None):
+    """Return (plugin name, settings) for config section or plugin name
+
+    For 'auto' plugin is detected from contents of file at path, ValueError
+    is raised if its format is not recognized.
+    """
+    if name == AUTO:
+        result = sniff(path)
+        if result is None:
+            raise ValueError('statement format not recognized')
+        plugin_name, settings = resolve_plugin(result.plugin, config)
+        return plugin_name, dict(plugin_settings(result), **settings)
+    if config is not None and name in config:
+        settings = dict(config[name])
+        return settings.get('plugin', name), settings
+    return name, {}
+
+
+def output_paths(files, output_dir):
+    """Return OFX file path in output_dir for every file
+
+    Output is named after the file without its extension. Files whose names
+    would collide, e.g. dir1/stmt.csv and dir2/stmt.csv or a.csv and a.txt,
+    are numbered in order of files: stmt.ofx, stmt-2.ofx.
+    """
+    used = set()
+    paths = []
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name = stem + '.ofx'
+        number = 1
+        while os.path.normcase(name) in used:
+            number += 1
+            name = '%s-%d.ofx' % (stem, number)
+        used.add(os.path.normcase(name))
+        paths.append(os.path.join(output_dir, name))
+    return paths
+
+
+def convert_file(path, plugin_name, settings, output):
+    """Convert one statement into OFX file, never raises
+
+    Output is written next to its final name and renamed when conversion
+    succeeds, so failed conversions leave no partial files behind. With
+    'split' setting, one file per account and currency is written, output of
+    the result lists them separated by commas.
+    """
+    start = time.perf_counter()
+    partial = output + '.part'
+    try:
+        statement_plugin = plugin.get_plugin(plugin_name, UI(), settings)
+        if split_enabled(settings):
+            written = write_split_ofx(statement_plugin, path, output)
+            return ConversionResult(path, plugin_name, ', '.join(target for target, _ in written),
+                                    sum(writer.count for _, writer in written), time.perf_counter() - start,
+                                    None, 0)
+        parser = statement_plugin.get_parser(path)
+        try:
+            with open(partial, 'w', encoding='utf-8') as out:
+                writer = write_ofx(parser, out)
+        finally:
+            parser.close()
+        os.replace(partial, output)
+        # transactions count as exported once their output is in place
+        fingerprints.commit(parser)
+        return ConversionResult(path, plugin_name, output, writer.count, time.perf_counter() - start, None,
+                                getattr(parser, 'skipped', 0))
+    except Exception as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        return ConversionResult(path, plugin_name, output, 0, time.perf_counter() - start,
+                                '%s: %s' % (type(e).__name__, e), 0)
+
+
+def convert_batch(files, patterns, output_dir, workers=None, config=None):
+    """Convert files on a pool of workers, return results in the order of files
+
+    Files not matching any pattern or whose plugin can not be resolved are
+    reported as failed, never raises for a single file.
+    """
+    results = [None] * len(files)
+    with ProcessPoolExecutor(workers) as pool:
+        futures = {}
+        for i, (path, output) in enumerate(zip(files, output_paths(files, output_dir))):
+            name = match_plugin(path, patterns)
+            if name is None:
+                results[i] = ConversionResult(path, None, None, 0, 0.0, 'no plugin pattern matches file', 0)
+                continue
+            try:
+                plugin_name, settings = resolve_plugin(name, config, path)
+            except ValueError as e:
+                results[i] = ConversionResult(path, name, None, 0, 0.0, str(e), 0)
+                continue
+            except Exception as e:
+                # e.g. unreadable file for 'auto', failure of this file only
+                results[i] = ConversionResult(path, name, None, 0, 0.0, '%s: %s' % (type(e).__name__, e), 0)
+                continue
+            futures[i] = pool.submit(convert_file, path, plugin_name, settings, output)
+        for i, future in futures.items():
+            results[i] = future.result()
+    return results
+
+
+def print_summary(results, out=None):
+    out = out or sys.stdout
+    for r in results:
+        out.write('%-6s %8.3fs %8d rows  %s -> %s%s%s\n' % (
+            'FAILED' if r.error else 'OK', r.seconds, r.rows, r.path, r.output or '-',
+            ' (%d skipped)' % r.skipped if r.skipped else '',
+            ' (%s)' % r.error if r.error else ''))
+    failed = sum(1 for r in results if r.error)
+    out.write('%d files converted, %d failed, %d rows, %d skipped, %.3fs total conversion time\n' % (
+        len(results) - failed, failed, sum(r.rows for r in results), sum(r.skipped for r in results),
+        sum(r.seconds for r in results)))
+
+
+def parse_pattern(value):
+    pattern, sep, name = value.rpartition('=')
+    if not sep or not pattern or not name:
+        raise argparse.ArgumentTypeError("expected PATTERN=PLUGIN, got '%s'" % value)
+    return pattern, name
+
+
+def make_args_parser():
+    parser = argparse.ArgumentParser(prog='ofxstatement-batch',
+                                     description='Convert many bank statements to OFX at once.')
+    parser.add_argument('sources', nargs='+', metavar='SOURCE',
+                        help='statement file, directory or glob pattern')
+    parser.add_argument('-m', '--map', dest='patterns', type=parse_pattern, action='append', required=True,
+                        metavar='PATTERN=PLUGIN',
+                        help='convert files with names matching glob PATTERN using PLUGIN '
+                             '(plugin name or configuration section), first match wins')
+    parser.add_argument('-o', '--output', default='.', help='directory to write OFX files to')
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    return parser
+
+
+def run(argv=None):
+    args = make_args_parser().parse_args(argv)
+    files = collect_files(args.sources)
+    os.makedirs(args.output, exist_ok=True)
+    results = convert_batch(files, args.patterns, args.output, args.jobs, configuration.read())
+    print_summary(results)
+    return 1 if any(r.error for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -0,0 +1,53 @@
+#    Transaction description classifier shared by ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+# marks trie node where one of the prefixes ends, never clashes with a character
+_TERMINAL = None
+
+
+class PrefixClassifier:
+    """Longest-prefix lookup over a fixed set of prefixes (e.g. keys of a type map)
+
+    Prefixes are compiled into a character trie once, so classifying a string
+    costs at most one dict lookup per character of the matched prefix instead
+    of a startswith() call per prefix. Classifier is not updated when the
+    source mapping changes, build a new one instead. Trie is built on first
+    use, so classifiers cost nothing to create at import time.
+    """
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+        self.root = None
+
+    def build(self):
+        root = {}
+        for prefix in self.prefixes:
+            node = root
+            for char in prefix:
+                node = node.setdefault(char, {})
+            node[_TERMINAL] = prefix
+        return root
+
+    def match(self, text):
+        """Return the longest prefix of text known to classifier or None"""
+        node = self.root
+        if node is None:
+            node = self.root = self.build()
+        result = node.get(_TERMINAL)
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            result = node.get(_TERMINAL, result)
+        return result
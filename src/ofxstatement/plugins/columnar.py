@@ -0,0 +1,142 @@
+#    Columnar statement parsing for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Statement transactions as columns instead of StatementLine objects.
+
+Parsers return a table: dict mapping every name in COLUMNS to a list of
+values, one per transaction, equal to the attributes of the StatementLine
+objects parse() would produce. CSV parsers build it column by column:
+records are transposed, each distinct type string or payee is processed
+once and rows are filtered with masks. Table can be turned into a NumPy
+structured array or an Arrow table when those packages are installed.
+"""
+
+from itertools import compress
+
+from ofxstatement.plugins.records import read_rows
+
+COLUMNS = ('id', 'date', 'date_user', 'trntype', 'amount', 'memo', 'payee', 'check_no', 'refnum')
+
+
+def lines_to_columns(lines):
+    """Return table of Transaction or StatementLine objects"""
+    table = {name: [] for name in COLUMNS}
+    for line in lines:
+        for name, column in table.items():
+            column.append(getattr(line, name))
+    return table
+
+
+def new_table(size, **columns):
+    """Return table of given columns, others filled with None"""
+    table = {name: columns.pop(name, None) or [None] * size for name in COLUMNS}
+    if columns:
+        raise ValueError('Unknown columns: %s' % ', '.join(columns))
+    return table
+
+
+def read_columns(fin, record, delimiter):
+    """Read CSV file into record of column lists"""
+    columns = list(zip(*read_rows(fin, len(record._fields), delimiter)))
+    if not columns:
+        return record._make([] for _ in record._fields)
+    return record._make(map(list, columns))
+
+
+def filter_columns(columns, mask):
+    """Return record of column lists with rows for which mask is true"""
+    return columns._make(list(compress(column, mask)) for column in columns)
+
+
+def map_distinct(function, values, mask=None):
+    """Return [function(value) for value in values] calling function once per distinct value
+
+    Pays off for columns with few distinct values: types, payees, dates
+    without time of day.
+
+    If mask is given, values for which it is false are not passed to
+    function and are None in the result.
+    """
+    if mask is None:
+        results = {value: function(value) for value in set(values)}
+        return [results[value] for value in values]
+    results = {value: function(value) for value in set(compress(values, mask))}
+    return [results[value] if keep else None for value, keep in zip(values, mask)]
+
+
+def select(table, mask):
+    """Return table rows for which mask is true"""
+    return {name: list(compress(column, mask)) for name, column in table.items()}
+
+
+def classify_types(types, amounts, classifier, type_map):
+    """Bulk version of plugins' parse_type()
+
+    Type strings are classified once per distinct value, transactions of
+    unknown types are DEBIT or CREDIT by the sign of amount.
+    """
+    prefixes = map_distinct(classifier.match, types)
+    return [type_map[prefix] if prefix is not None else
+            'DEBIT' if amount > 0 else 'CREDIT' if amount < 0 else None
+            for prefix, amount in zip(prefixes, amounts)]
+
+
+def map_types(parse_type, types, amounts):
+    """Return [parse_type(type, amount) for type, amount in zip(types, amounts)]
+
+    parse_type is called for zero, positive and negative amount once per
+    distinct type, transactions get the result for sign of their amount.
+    """
+    results = {type: (parse_type(type, 0), parse_type(type, 1), parse_type(type, -1)) for type in set(types)}
+    return [results[type][(amount > 0) - (amount < 0)] for type, amount in zip(types, amounts)]
+
+
+def parse_columns(plugin, path):
+    """Parse statement file with plugin, return statement without lines and table"""
+    with open(path, 'r', encoding=plugin.get_encoding()) as f:
+        parser = plugin.create_parser(f)
+        table = parser.parse_columns()
+    return parser.statement, table
+
+
+def to_numpy(table):
+    """Return table as NumPy structured array
+
+    Dates are datetime64, amounts stay exact Decimal objects, strings are
+    Python objects.
+    """
+    import numpy
+
+    dtypes = {'date': 'datetime64[us]', 'date_user': 'datetime64[us]'}
+    size = len(table['id'])
+    array = numpy.empty(size, dtype=[(name, dtypes.get(name, object)) for name in COLUMNS])
+    for name in COLUMNS:
+        if name in dtypes:
+            array[name] = [numpy.datetime64('NaT') if value is None else value for value in table[name]]
+        else:
+            array[name] = table[name]
+    return array
+
+
+def to_arrow(table):
+    """Return table as pyarrow.Table, amounts as decimal"""
+    import pyarrow
+
+    return pyarrow.table({name: table[name] for name in COLUMNS})
+
+
+def write_parquet(table, path):
+    import pyarrow.parquet
+
+    pyarrow.parquet.write_table(to_arrow(table), path)
@@ -0,0 +1,67 @@
+#    Plugin configuration shared by parsers of ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Plugins as immutable configuration, parsers as per-file context.
+
+Plugin turns its settings into a ParserConfig once, when it is created.
+get_parser() only reads it and returns a new parser holding all mutable
+state of one file: input stream, statement, record counter, memoized ids.
+Everything else parsers use (type classifiers, date parsers, SberBank TXT
+state machine) is immutable or cached per process, so one plugin object
+may serve concurrent parses from a thread pool.
+"""
+
+from collections import namedtuple
+
+from ofxstatement.plugins.ids import COMPAT, id_generator
+from ofxstatement.plugins.profiling import instrument, profile_setting
+
+ParserConfig = namedtuple('ParserConfig', ['currency', 'account_id', 'bank_id', 'user_date', 'card_details',
+                                           'id_scheme', 'profile', 'verbose'])
+
+
+def parser_config(settings, bank_id, currency=None, account_required=False, user_date=None, card_details=None):
+    """Return ParserConfig of plugin settings
+
+    user_date and card_details are defaults of the settings of these names,
+    None if plugin does not have them. If account_required, 'account'
+    setting must be present.
+    """
+    return ParserConfig(
+        currency=settings.get('currency', currency),
+        account_id=settings['account'] if account_required else settings.get('account'),
+        bank_id=settings.get('bank', bank_id),
+        user_date=user_date is not None and settings.get('user_date', user_date) == 'true',
+        card_details=card_details is not None and settings.get('card_details', card_details) == 'true',
+        id_scheme=settings.get('id_scheme', COMPAT),
+        profile=profile_setting(settings),
+        verbose=settings.get('verbose') == 'true',
+    )
+
+
+def configure(parser, config):
+    """Set up new parser with plugin configuration, return parser"""
+    parser.statement.currency = config.currency
+    parser.statement.account_id = config.account_id
+    parser.statement.bank_id = config.bank_id
+    if hasattr(parser, 'user_date'):
+        parser.user_date = config.user_date
+    if hasattr(parser, 'card_details'):
+        parser.card_details = config.card_details
+    parser.diagnostics.verbose = config.verbose
+    if hasattr(parser, 'transaction_id'):
+        parser.transaction_id = id_generator(config.id_scheme)
+    if config.profile:
+        instrument(parser, config.profile)
+    return parser
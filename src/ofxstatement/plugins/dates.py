@@ -0,0 +1,105 @@
+#    Fast date parsing for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+# repeated date strings are common: many operations per day in a statement,
+# strings with time of day rarely repeat and are not cached by default
+DEFAULT_CACHE_SIZE = 4096
+
+# fixed width directives: datetime() argument position and field width
+_DIRECTIVES = {
+    'Y': (0, 4),
+    'y': (0, 2),
+    'm': (1, 2),
+    'd': (2, 2),
+    'H': (3, 2),
+    'M': (4, 2),
+    'S': (5, 2),
+}
+
+_parsers = {}
+
+
+def _compile(format):
+    """Generate function parsing format with string slicing, None if not possible"""
+    tokens = re.findall(r'%.|[^%]', format)
+    args = ['0'] * 6
+    checks = []
+    pos = 0
+    for token in tokens:
+        if token.startswith('%'):
+            if token[1] not in _DIRECTIVES:
+                return None
+            index, width = _DIRECTIVES[token[1]]
+            if args[index] != '0':
+                return None
+            args[index] = 'int(value[%d:%d])' % (pos, pos + width)
+            if token[1] == 'y':
+                # same century rule as strptime
+                args[index] = '_century(%s)' % args[index]
+            pos += width
+        else:
+            checks.append('value[%d] == %r' % (pos, token))
+            pos += 1
+    if '0' in args[:3]:
+        return None
+
+    source = (
+        'def parse(value):\n'
+        '    if len(value) == %d%s:\n'
+        '        return datetime(%s)\n'
+        '    return strptime(value, format)\n'
+    ) % (pos, ''.join(' and ' + check for check in checks), ', '.join(args))
+    namespace = {
+        'datetime': datetime,
+        'strptime': datetime.strptime,
+        'format': format,
+        '_century': _century,
+    }
+    exec(source, namespace)
+    return namespace['parse']
+
+
+def _century(year):
+    return year + (2000 if year < 69 else 1900)
+
+
+def date_parser(format, cache_size=None):
+    """Return function parsing strings in strptime format into datetime objects
+
+    Zero padded numeric formats (%d, %m, %y, %Y, %H, %M, %S and literal
+    separators) are parsed by fixed position slicing, strings which do not
+    match expected layout and all other formats fall back to strptime().
+    Results are memoized in a LRU cache of cache_size entries, by default
+    only for formats without time of day. Parsers are shared between callers
+    asking for the same format.
+    """
+    key = (format, cache_size)
+    parser = _parsers.get(key)
+    if parser is None:
+        if cache_size is None:
+            cache_size = 0 if re.search('%[HMS]', format) else DEFAULT_CACHE_SIZE
+        parser = _compile(format) or (lambda value: datetime.strptime(value, format))
+        if cache_size:
+            parser = lru_cache(maxsize=cache_size)(parser)
+        parser = _parsers.setdefault(key, parser)
+    return parser
+
+
+def parse_datetime(value, format):
+    """Same as datetime.strptime(value, format), but faster"""
+    return date_parser(format)(value)
@@ -0,0 +1,75 @@
+#    Skipped record diagnostics for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+from collections import Counter
+
+log = logging.getLogger(__name__)
+
+# line numbers kept per reason to point at in the report
+SAMPLE_LINES = 5
+
+
+class Diagnostics:
+    """Records left out of statement, counted by reason
+
+    Parsers call skip() for every record they leave out, report() logs one
+    warning per distinct reason once the statement is parsed. Reason is a
+    format string with its arguments, formatted only for the report, so
+    skipping a record costs a counter increment. If verbose, every skipped
+    record is logged at once as well.
+    """
+
+    def __init__(self, verbose=False):
+        self.verbose = verbose
+        self.counts = Counter()
+        self.samples = {}
+
+    def skip(self, line, reason, *args, detail=None):
+        """Count record at line skipped for reason % args
+
+        detail, e.g. transaction time, is only shown in verbose output.
+        """
+        key = (reason, args)
+        self.counts[key] += 1
+        samples = self.samples.setdefault(key, [])
+        if len(samples) < SAMPLE_LINES:
+            samples.append(line)
+        if self.verbose:
+            log.warning('Skipping line %d%s: %s', line, ' (%s)' % detail if detail else '', reason % args)
+
+    @property
+    def skipped(self):
+        return sum(self.counts.values())
+
+    def merge(self, other):
+        """Add records skipped by other, e.g. by a worker process"""
+        self.counts.update(other.counts)
+        for key, lines in other.samples.items():
+            samples = self.samples.setdefault(key, [])
+            samples.extend(lines[:SAMPLE_LINES - len(samples)])
+
+    def summary(self):
+        """Return list of report messages, most frequent reasons first"""
+        messages = []
+        for (reason, args), count in self.counts.most_common():
+            lines = ', '.join(map(str, sorted(self.samples[reason, args])))
+            messages.append('Skipped %d record%s: %s (line%s %s%s)' % (
+                count, '' if count == 1 else 's', reason % args, '' if count == 1 else 's', lines,
+                ', ...' if count > SAMPLE_LINES else ''))
+        return messages
+
+    def report(self):
+        for message in self.summary():
+            log.warning(message)
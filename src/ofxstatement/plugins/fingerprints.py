@@ -0,0 +1,206 @@
+#    Incremental import of overlapping statements for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from contextlib import closing
+from datetime import datetime, timedelta
+
+from ofxstatement import exceptions
+
+from ofxstatement.plugins.dates import parse_datetime
+from ofxstatement.plugins.transactions import to_lines
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS exported (
+    account_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    date TEXT,
+    PRIMARY KEY (account_id, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS exported_date ON exported (date);
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id TEXT PRIMARY KEY,
+    last_date TEXT
+);
+'''
+
+# sorts as text in date order
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _date(value):
+    return value.strftime(DATE_FORMAT) if value is not None else None
+
+
+class FingerprintIndex:
+    """Persistent index of transaction ids exported so far, per account
+
+    Kept in sqlite database at path. Besides ids, the date of every exported
+    transaction is stored for pruning, and for every account the latest
+    transaction date. Transactions without date are dated by the latest
+    transaction of the account, or by the time of import if there is none,
+    so they are pruned as well.
+    """
+
+    def __init__(self, path):
+        # imported here, sqlite3 is not needed unless index is configured
+        import sqlite3
+        self.db = sqlite3.connect(os.path.expanduser(path))
+        self.db.executescript(SCHEMA)
+        self._ids = {}
+
+    def exported(self, account_id):
+        """Return set of transaction ids exported for account"""
+        ids = self._ids.get(account_id)
+        if ids is None:
+            rows = self.db.execute('SELECT id FROM exported WHERE account_id = ?', (account_id,))
+            ids = self._ids[account_id] = {id for id, in rows}
+        return ids
+
+    def add(self, account_id, transactions):
+        """Record (id, date) pairs as exported for account"""
+        transactions = [(id, _date(date)) for id, date in transactions]
+        dates = [date for _, date in transactions if date is not None]
+        last_date = self.last(account_id)
+        if last_date is not None:
+            dates.append(_date(last_date))
+        last_date = max(dates, default=None)
+        undated = last_date or _date(datetime.now())
+        rows = [(account_id, id, date or undated) for id, date in transactions]
+        with self.db:
+            self.db.executemany('INSERT OR IGNORE INTO exported VALUES (?, ?, ?)', rows)
+            # column list keeps databases of earlier versions with last_offset column working
+            self.db.execute('INSERT OR REPLACE INTO accounts (account_id, last_date) VALUES (?, ?)',
+                            (account_id, last_date))
+        self.exported(account_id).update(id for _, id, _ in rows)
+
+    def last(self, account_id):
+        """Return latest exported transaction date of account, None if unknown"""
+        row = self.db.execute('SELECT last_date FROM accounts WHERE account_id = ?', (account_id,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return parse_datetime(row[0], DATE_FORMAT)
+
+    def prune(self, before, account_id=None):
+        """Forget transactions dated before given datetime, return number of removed ids
+
+        Undated ones, recorded by earlier versions, are forgotten too.
+        """
+        query = 'DELETE FROM exported WHERE (date < ? OR date IS NULL)'
+        args = [_date(before)]
+        if account_id is not None:
+            query += ' AND account_id = ?'
+            args.append(account_id)
+        with self.db:
+            count = self.db.execute(query, args).rowcount
+        self._ids.clear()
+        return count
+
+    def close(self):
+        self.db.close()
+
+
+class IncrementalParser:
+    """Statement parser wrapper leaving out transactions exported before
+
+    Lines of the wrapped parser are looked up in the index by statement
+    account and transaction id. Known lines are skipped and counted in
+    self.skipped, new ones are passed on and held until commit() records
+    them in the index. Callers commit once the statement is validated and
+    its output is written, so transactions of a failed run are exported
+    again next time. Ids repeating within one statement are all kept. Start
+    balance is moved by the total of skipped transactions to stay
+    consistent with the remaining lines.
+
+    If keep_days is set, ids of transactions older than keep_days before
+    the latest exported transaction of the account are pruned on commit.
+    """
+
+    def __init__(self, parser, path, keep_days=None, ui=None):
+        self.parser = parser
+        self.statement = parser.statement
+        self.path = path
+        self.keep_days = keep_days
+        self.ui = ui
+        self.skipped = 0
+        # (id, date) pairs per account passed on and not committed yet
+        self.new = {}
+
+    def iter_lines(self):
+        skipped_total = 0
+        new = {}
+        with closing(FingerprintIndex(self.path)) as index:
+            for line in self.parser.iter_lines():
+                account_id = self.statement.account_id or ''
+                if line.id in index.exported(account_id):
+                    self.skipped += 1
+                    if line.amount is not None:
+                        skipped_total += line.amount
+                    continue
+                # e.g. VTB operations in processing have user date only
+                new.setdefault(account_id, []).append((line.id, line.date or line.date_user))
+                yield line
+        # complete statements only
+        self.new = new
+
+        if self.skipped and self.statement.start_balance is not None:
+            self.statement.start_balance += skipped_total
+        if self.ui is not None:
+            self.ui.status('Skipped %d transactions exported before' % self.skipped)
+
+    def commit(self):
+        """Record transactions passed on by iter_lines() as exported"""
+        if not self.new:
+            return
+        with closing(FingerprintIndex(self.path)) as index:
+            for account_id, transactions in self.new.items():
+                index.add(account_id, transactions)
+                last_date = index.last(account_id)
+                if self.keep_days is not None and last_date is not None:
+                    index.prune(last_date - timedelta(days=self.keep_days), account_id)
+        self.new = {}
+
+    def parse(self):
+        self.statement.lines.extend(to_lines(self.iter_lines()))
+        # 'ofxstatement convert' validates and writes the statement returned
+        # with no way to commit afterwards: commit statements it accepts
+        try:
+            self.statement.assert_valid()
+        except exceptions.ValidationError:
+            pass
+        else:
+            self.commit()
+        return self.statement
+
+    def close(self):
+        self.parser.close()
+
+
+def incremental(plugin, parser):
+    """Wrap parser into IncrementalParser if plugin is configured with index
+
+    'index' setting is the path of index database, 'index_keep_days' tells
+    how many days of history to keep in it.
+    """
+    path = plugin.settings.get('index')
+    if not path:
+        return parser
+    keep_days = plugin.settings.get('index_keep_days')
+    return IncrementalParser(parser, path, int(keep_days) if keep_days else None, plugin.ui)
+
+
+def commit(parser):
+    """Record transactions of IncrementalParser as exported, other parsers have no index"""
+    if isinstance(parser, IncrementalParser):
+        parser.commit()
@@ -0,0 +1,423 @@
+#    Declarative CSV statement formats for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""CSV statement formats described as data.
+
+A Format names the record fields transaction fields are made of:
+
+record
+    namedtuple of CSV fields, in file order
+delimiter, skip_lines
+    field delimiter, lines of column titles skipped before records
+date_format
+    strptime format of date fields
+date
+    tuple of fields, date is parsed from the first non-empty one
+date_user
+    field of user date
+amount
+    Amount(field), Amount(field, minus=field) for debit and credit
+    columns, empty ones counting as 0, or Amount(field, otherwise=field) for
+    income and withdrawal, withdrawal negated when income is 0
+trntype
+    TypeRule(field, type_map, zero): type_map value of the longest prefix
+    of field, DEBIT or CREDIT by sign of amount if none, zero if amount is 0
+memo
+    template like '{category}: {description}[, {MCC}]': {a|b} is the first
+    non-empty of fields, [...] is left out when its fields are empty;
+    or Join(separator, fields) of non-empty fields
+refnum
+    field of reference number
+id
+    'date' or 'date_user': transaction id is generated from it, memo and
+    amount
+float_ids
+    True for banks whose amounts previous versions computed in floats: ids
+    are generated from amount computed the same way, so they do not change
+interned
+    names of single field memos taken through parser's string pool
+
+Parts set to None are left to the parser. FormatStatementParser subclasses
+set format, build_transaction(record) is generated for it as the source of
+a method doing just what the format asks for, like dates module does for
+date formats: no lookups of the format and no branches for the parts it
+does not use are left for parse time. build_columns(columns) does the same
+for columns of records, see columnar module. Memo template becomes a
+function the same way. Code is generated when parser class is first used
+rather than when it is defined, so importing plugins costs nothing.
+"""
+
+import re
+from collections import namedtuple
+from decimal import Decimal
+from operator import sub
+
+from ofxstatement import statement
+
+from ofxstatement.plugins.amounts import parse_amount
+from ofxstatement.plugins.classifier import PrefixClassifier
+from ofxstatement.plugins.columnar import map_types, new_table, read_columns, select
+from ofxstatement.plugins.dates import date_parser
+from ofxstatement.plugins.ids import id_generator
+from ofxstatement.plugins.interning import Memo, StringPool
+from ofxstatement.plugins.records import read_records
+from ofxstatement.plugins.streaming import StreamingStatementParser
+from ofxstatement.plugins.transactions import Transaction
+
+Format = namedtuple('Format', ['record', 'delimiter', 'skip_lines', 'date_format', 'date', 'date_user', 'amount',
+                               'trntype', 'memo', 'refnum', 'id', 'float_ids', 'interned'])
+Format.__new__.__defaults__ = (None,) * 9 + (False, ())
+
+Amount = namedtuple('Amount', ['field', 'minus', 'otherwise'])
+Amount.__new__.__defaults__ = (None, None)
+
+TypeRule = namedtuple('TypeRule', ['field', 'type_map', 'zero'])
+TypeRule.__new__.__defaults__ = (None, None)
+
+Join = namedtuple('Join', ['separator', 'fields'])
+
+ZERO = Decimal(0)
+
+_TEMPLATE_TOKEN = re.compile(r'\{([\w|]+)\}|(\[)|(\])|([^{}\[\]]+)')
+
+
+def type_parser(type_map, zero=None, classifier=None):
+    """Return parse_type(type, amount) of TypeRule with type_map and zero"""
+    match = (classifier or PrefixClassifier(type_map)).match
+
+    def parse_type(type, amount):
+        prefix = match(type)
+        if prefix is not None:
+            return type_map[prefix]
+        if amount > 0:
+            return 'DEBIT'
+        if amount < 0:
+            return 'CREDIT'
+        return zero
+    return parse_type
+
+
+def sign_type(zero=None):
+    """Return parse_type(amount) of TypeRule without field"""
+    def parse_type(amount):
+        if amount > 0:
+            return 'DEBIT'
+        if amount < 0:
+            return 'CREDIT'
+        return zero
+    return parse_type
+
+
+def parse_template(template):
+    """Return parts of memo template: strings, tuples of alternative fields and lists of optional parts"""
+    parts = []
+    group = None
+    for name, start, end, text in _TEMPLATE_TOKEN.findall(template):
+        if start:
+            if group is not None:
+                raise ValueError('Nested optional parts in memo template %r' % template)
+            group = []
+            parts.append(group)
+        elif end:
+            if group is None:
+                raise ValueError('Unbalanced ] in memo template %r' % template)
+            group = None
+        else:
+            (parts if group is None else group).append(tuple(name.split('|')) if name else text)
+    if group is not None:
+        raise ValueError('Unbalanced [ in memo template %r' % template)
+    return parts
+
+
+def memo_fields(memo):
+    """Return fields memo template or Join is made of, in order of appearance"""
+    if isinstance(memo, Join):
+        return tuple(memo.fields)
+    fields = []
+    for part in parse_template(memo):
+        for names in (part if isinstance(part, list) else [part]):
+            if isinstance(names, tuple):
+                fields.extend(name for name in names if name not in fields)
+    return tuple(fields)
+
+
+def memo_field(memo):
+    """Return field of template made of a single field and nothing else, None otherwise"""
+    if isinstance(memo, Join):
+        return None
+    parts = parse_template(memo)
+    if len(parts) == 1 and isinstance(parts[0], tuple) and len(parts[0]) == 1:
+        return parts[0][0]
+    return None
+
+
+def _field(names):
+    return names[0] if len(names) == 1 else '(%s)' % ' or '.join(names)
+
+
+def _expression(parts, memo=False):
+    # %-formatting like plugins did before, missing fields become 'None' instead of failing
+    fields = ['memo'] if memo else []
+    fields.extend(_field(part) for part in parts if isinstance(part, tuple))
+    text = ('%s' if memo else '') + ''.join(part.replace('%', '%%') if isinstance(part, str) else '%s'
+                                            for part in parts)
+    if not fields:
+        return repr(''.join(parts))
+    if text == '%s':
+        return fields[0]
+    return '%r %% (%s)' % (text, ', '.join(fields))
+
+
+def _memo_source(memo):
+    if isinstance(memo, Join):
+        return ['    return %r.join(f for f in (%s,) if f)' % (memo.separator, ', '.join(memo.fields))]
+    lines = []
+    pending = []
+    for part in parse_template(memo) + [None]:
+        if isinstance(part, (str, tuple)):
+            pending.append(part)
+            continue
+        if pending:
+            lines.append('    memo = ' + _expression(pending, memo=bool(lines)))
+            pending = []
+        if part is not None:
+            if not lines:
+                lines.append("    memo = ''")
+            lines.append('    if %s:' % ' and '.join(_field(names) for names in part if isinstance(names, tuple)))
+            lines.append('        memo = ' + _expression(part, memo=True))
+    return lines + ['    return memo']
+
+
+def memo_formatter(memo):
+    """Return function(*memo_fields(memo)) formatting memo template or Join"""
+    source = 'def memo_text(%s):\n%s\n' % (', '.join(memo_fields(memo)), '\n'.join(_memo_source(memo)))
+    return _compile(source, 'memo_text')
+
+
+def _builder_source(format):
+    lines = ['def build_transaction(self, record):', '    transaction = Transaction()']
+    if format.date:
+        lines.append('    transaction.date = self.parse_date(%s)'
+                     % ' or '.join('record.' + field for field in format.date))
+    if format.date_user:
+        lines.append('    transaction.date_user = self.parse_date(record.%s)' % format.date_user)
+    amount = format.amount
+    id_amount = 'transaction.amount'
+    if amount:
+        if amount.minus:
+            lines.append('    amount = parse_amount(record.{0}) if record.{0} else ZERO'.format(amount.field))
+            lines.append('    minus = parse_amount(record.{0}) if record.{0} else ZERO'.format(amount.minus))
+            value = 'amount - minus'
+            if format.float_ids:
+                # empty fields were int 0 then
+                id_amount = ('(float(amount) if record.{0} else 0) - (float(minus) if record.{1} else 0)'
+                             .format(amount.field, amount.minus))
+        elif amount.otherwise:
+            value = 'parse_amount(record.%s) or -parse_amount(record.%s)' % (amount.field, amount.otherwise)
+        else:
+            value = 'parse_amount(record.%s)' % amount.field
+        lines.append('    transaction.amount = ' + value)
+        if format.float_ids and id_amount == 'transaction.amount':
+            id_amount = 'float(transaction.amount)'
+    if format.trntype:
+        args = 'record.%s, transaction.amount' % format.trntype.field if format.trntype.field else 'transaction.amount'
+        lines.append('    transaction.trntype = self.parse_type(%s)' % args)
+    if format.memo:
+        field = memo_field(format.memo)
+        if field is None:
+            lines.append('    transaction.memo = self.format_memo(record)')
+        elif 'memo' in format.interned:
+            lines.append('    transaction.memo = self.strings[record.%s]' % field)
+        else:
+            lines.append('    transaction.memo = record.%s' % field)
+    if format.refnum:
+        lines.append('    transaction.refnum = record.%s' % format.refnum)
+    if format.id:
+        lines.append('    transaction.id = self.transaction_id(transaction.%s, transaction.memo,' % format.id)
+        lines.append('                                         %s)' % id_amount)
+    return '\n'.join(lines + ['    return transaction']) + '\n'
+
+
+def _columns_source(format):
+    lines = ['def build_columns(self, columns):']
+    names = []
+    if format.date:
+        if len(format.date) == 1:
+            lines.append('    date = list(map(self.parse_date, columns.%s))' % format.date[0])
+        else:
+            lines.append('    date = [self.parse_date(%s) for %s in zip(%s)]'
+                         % (' or '.join(format.date), ', '.join(format.date),
+                            ', '.join('columns.' + field for field in format.date)))
+        names.append('date')
+    if format.date_user:
+        lines.append('    date_user = list(map(self.parse_date, columns.%s))' % format.date_user)
+        names.append('date_user')
+    amount = format.amount
+    id_amount = 'amount'
+    if amount:
+        if amount.minus:
+            lines.append('    plus = [parse_amount(value) if value else ZERO for value in columns.%s]' % amount.field)
+            lines.append('    minus = [parse_amount(value) if value else ZERO for value in columns.%s]' % amount.minus)
+            lines.append('    amount = list(map(sub, plus, minus))')
+            if format.float_ids:
+                # same as id amounts of build_transaction()
+                lines.append('    id_amount = [(float(value) if text else 0) - (float(other) if other_text else 0)')
+                lines.append('                 for value, other, text, other_text in zip(plus, minus, columns.%s, '
+                             'columns.%s)]' % (amount.field, amount.minus))
+                id_amount = 'id_amount'
+        elif amount.otherwise:
+            lines.append('    amount = [parse_amount(value) or -parse_amount(otherwise)')
+            lines.append('              for value, otherwise in zip(columns.%s, columns.%s)]'
+                         % (amount.field, amount.otherwise))
+        else:
+            lines.append('    amount = list(map(parse_amount, columns.%s))' % amount.field)
+        if format.float_ids and id_amount == 'amount':
+            lines.append('    id_amount = list(map(float, amount))')
+            id_amount = 'id_amount'
+        names.append('amount')
+    if format.trntype:
+        if format.trntype.field:
+            lines.append('    trntype = map_types(self.parse_type, columns.%s, amount)' % format.trntype.field)
+        else:
+            lines.append('    trntype = list(map(self.parse_type, amount))')
+        names.append('trntype')
+    if format.memo:
+        field = memo_field(format.memo)
+        if field is None:
+            lines.append('    memo = [self.memos[key] for key in zip(%s)]'
+                         % ', '.join('columns.' + field for field in memo_fields(format.memo)))
+        elif 'memo' in format.interned:
+            lines.append('    memo = [self.strings[value] for value in columns.%s]' % field)
+        else:
+            lines.append('    memo = columns.%s' % field)
+        names.append('memo')
+    if format.refnum:
+        lines.append('    refnum = columns.%s' % format.refnum)
+        names.append('refnum')
+    if format.id:
+        lines.append('    id = list(map(self.transaction_id, %s, memo, %s))' % (format.id, id_amount))
+        names.append('id')
+    lines.append('    table = new_table(len(columns[0]), %s)' % ', '.join('%s=%s' % (name, name) for name in names))
+    if format.trntype:
+        lines.append('    return select(table, trntype)')
+    else:
+        lines.append('    return table')
+    return '\n'.join(lines) + '\n'
+
+
+# names of attributes compile_format() may generate
+GENERATED = ('build_transaction', 'build_columns', 'format_memo', 'memo_text', 'parse_type', 'type_classifier')
+
+
+def _compile(source, name, **namespace):
+    exec(source, namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+def compile_format(format):
+    """Return dict of parser attributes generated for format"""
+    methods = {'build_transaction': _compile(_builder_source(format), 'build_transaction', Transaction=Transaction,
+                                             parse_amount=parse_amount, ZERO=ZERO),
+               'build_columns': _compile(_columns_source(format), 'build_columns', parse_amount=parse_amount,
+                                         ZERO=ZERO, sub=sub, map_types=map_types,
+                                         new_table=new_table, select=select)}
+    if format.memo and memo_field(format.memo) is None:
+        key = ', '.join('record.' + field for field in memo_fields(format.memo))
+        source = 'def format_memo(self, record):\n    return self.memos[%s,]\n' % key
+        methods['format_memo'] = _compile(source, 'format_memo')
+        methods['memo_text'] = staticmethod(memo_formatter(format.memo))
+    if format.trntype:
+        rule = format.trntype
+        if rule.field:
+            methods['type_classifier'] = PrefixClassifier(rule.type_map)
+            methods['parse_type'] = staticmethod(type_parser(rule.type_map, rule.zero, methods['type_classifier']))
+        else:
+            methods['parse_type'] = staticmethod(sign_type(rule.zero))
+    return methods
+
+
+def _generate(cls):
+    """Add attributes generated for cls.format to cls, except those defined by its classes"""
+    if cls.format is None:
+        raise TypeError('%s does not set format' % cls.__name__)
+    methods = compile_format(cls.format)
+    for name, method in methods.items():
+        owner = next((base for base in cls.__mro__ if name in vars(base)), FormatStatementParser)
+        if owner is FormatStatementParser or name in vars(owner).get('_generated', ()):
+            setattr(cls, name, method)
+    cls._generated = frozenset(methods)
+
+
+class FormatParserType(type):
+    """Type of FormatStatementParser classes
+
+    Attributes generated for the format are added to the class on first
+    access to any of them or when its first parser is created, whatever
+    comes first.
+    """
+
+    def __getattr__(cls, name):
+        if name in GENERATED and cls.format is not None and '_generated' not in vars(cls):
+            _generate(cls)
+            return getattr(cls, name)
+        raise AttributeError("type object '%s' has no attribute '%s'" % (cls.__name__, name))
+
+
+class FormatStatementParser(StreamingStatementParser, metaclass=FormatParserType):
+    """Parser of CSV statements in a Format
+
+    Subclasses set format; build_transaction(), build_columns(),
+    format_memo(), memo_text(), parse_type() and type_classifier of
+    TypeRule's type_map generated for it are added to the class unless it
+    defines them itself, see FormatParserType.
+    parse_record() returns transaction built of the record unless it has
+    no type, parse_columns() the table of rows with types, subclasses add
+    checks and fields the format leaves to them.
+    """
+
+    format = None
+
+    def __init__(self, fin):
+        if '_generated' not in vars(type(self)):
+            _generate(type(self))
+        super().__init__()
+        self.statement = statement.Statement()
+        self.fin = fin
+        self.transaction_id = id_generator()
+        self.parse_date = date_parser(self.format.date_format)
+        # memos repeat with the fields they are made of, share them
+        memo_text = getattr(self, 'memo_text', None)
+        self.memos = Memo(memo_text) if memo_text else None
+        self.strings = StringPool()
+        # Skip rows with column's headers
+        for _ in range(self.format.skip_lines or 0):
+            self.fin.readline()
+        self.cur_record = self.format.skip_lines or 0
+
+    def split_records(self):
+        return read_records(self.fin, self.format.record, self.format.delimiter)
+
+    def parse_columns(self):
+        columns = read_columns(self.fin, self.format.record, self.format.delimiter)
+        self.cur_record += len(columns[0])
+        return self.build_columns(columns)
+
+    def parse_record(self, line):
+        transaction = self.build_transaction(line)
+        if transaction.trntype:
+            return transaction
+        else:
+            return None
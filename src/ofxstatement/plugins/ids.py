@@ -0,0 +1,69 @@
+#    Transaction id generation for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from hashlib import blake2b, sha1
+
+from ofxstatement.plugins.interning import POOL_SIZE
+
+# same ids as statement.generate_transaction_id()
+COMPAT = 'compat'
+# shorter ids, not compatible with ids exported before
+FAST = 'fast'
+
+ID_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+FAST_DIGEST_SIZE = 16
+
+
+def id_generator(scheme=COMPAT):
+    """Return function(date, memo, amount) computing transaction ids
+
+    'compat' scheme gives ids equal to statement.generate_transaction_id()
+    of a line with the same date, memo and amount. 'fast' scheme hashes ISO
+    date, amount and memo joined by unit separators with BLAKE2b. Both are
+    stable between runs. Formatted dates are memoized, the memo is cleared
+    when it reaches POOL_SIZE of them: dates of date-only statements
+    repeat, timestamps are mostly unique and must not make memory grow with
+    the statement.
+    """
+    dates = {}
+
+    if scheme == COMPAT:
+        def generate(date, memo, amount):
+            data = dates.get(date)
+            if data is None:
+                data = date.strftime(ID_DATE_FORMAT).encode('utf8')
+                if len(dates) >= POOL_SIZE:
+                    dates.clear()
+                dates[date] = data
+            if memo is not None:
+                data += memo.encode('utf8')
+            if amount is not None:
+                data += str(amount).encode('utf8')
+            return sha1(data).hexdigest()
+
+    elif scheme == FAST:
+        def generate(date, memo, amount):
+            prefix = dates.get(date)
+            if prefix is None:
+                prefix = date.isoformat() + '\x1f'
+                if len(dates) >= POOL_SIZE:
+                    dates.clear()
+                dates[date] = prefix
+            data = '%s%s\x1f%s' % (prefix, '' if amount is None else amount, memo or '')
+            return blake2b(data.encode('utf8'), digest_size=FAST_DIGEST_SIZE).hexdigest()
+
+    else:
+        raise ValueError('Unknown transaction id scheme: %s' % scheme)
+    return generate
+
@@ -0,0 +1,63 @@
+#    Per-parse string pools for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Share equal strings between transactions of a statement.
+
+Categories, MCC codes, cities, card numbers and payees take few distinct
+values in a statement, so do memos built from them, yet every record gets
+its own copies. Parsers keep pools for them, created with the parser and
+dropped with it: lookup is a dict access, the function building a value
+runs on the first occurrence only.
+
+Pools are cleared when they reach POOL_SIZE values, so a field unique per
+record costs a bounded amount of memory even in streaming mode, while
+values repeating later in a long statement are shared again.
+"""
+
+# values kept by one pool
+POOL_SIZE = 4096
+
+
+class StringPool(dict):
+    """pool[value] returns the first value equal to value seen by the pool"""
+
+    def __init__(self, size=POOL_SIZE):
+        super().__init__()
+        self.size = size
+
+    def __missing__(self, value):
+        if len(self) >= self.size:
+            self.clear()
+        self[value] = value
+        return value
+
+
+class Memo(dict):
+    """memo[args] returns function(*args), computed once per distinct args tuple
+
+    Equal arguments give the same result object, so memos and payees built
+    from repeated fields are shared like pooled strings.
+    """
+
+    def __init__(self, function, size=POOL_SIZE):
+        super().__init__()
+        self.function = function
+        self.size = size
+
+    def __missing__(self, args):
+        value = self.function(*args)
+        if len(self) >= self.size:
+            self.clear()
+        self[args] = value
+        return value
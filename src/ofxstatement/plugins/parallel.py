@@ -0,0 +1,155 @@
+#    Parallel parsing of large CSV statements for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import mmap
+import os
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.profiling import timed_stream
+from ofxstatement.plugins.transactions import to_lines
+
+# smallest byte range worth sending to a worker process
+MIN_CHUNK_SIZE = 1 << 20
+# ranges per worker, evens out the load when some ranges parse slower
+CHUNKS_PER_WORKER = 4
+
+
+def parallel_workers(settings):
+    """Return number of worker processes requested by plugin settings
+
+    'parallel' setting is either a number of processes or 'auto' for one
+    process per CPU. 0 (default) disables parallel parsing.
+    """
+    value = settings.get('parallel', '0')
+    if value == 'auto':
+        return os.cpu_count() or 1
+    return int(value)
+
+
+def split_ranges(path, start, chunks, min_size=MIN_CHUNK_SIZE):
+    """Split file after start offset into about chunks byte ranges on line boundaries
+
+    Returns list of (start, end, number of lines) tuples.
+    """
+    ranges = []
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if start >= size:
+            return ranges
+        chunk_size = max(min_size, (size - start) // chunks + 1)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while start < size:
+                end = data.find(b'\n', start + chunk_size - 1) + 1 or size
+                ranges.append((start, end, data[start:end].count(b'\n')))
+                start = end
+    return ranges
+
+
+def _text(data, encoding):
+    # decode the same way open(path, 'r', encoding=...) does
+    return io.TextIOWrapper(io.BytesIO(data), encoding=encoding)
+
+
+def _parse_range(plugin_cls, settings, path, start, end, cur_record, state):
+    plugin = plugin_cls(UI(), settings)
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    parser = plugin.create_parser(_text(b'', plugin.get_encoding()))
+    parser.fin = timed_stream(parser, _text(data, plugin.get_encoding()))
+    parser.cur_record = cur_record
+    vars(parser.statement).update(state)
+    # header was consumed by the calling process, which reports profile too
+    return list(parser.iter_records()), parser.diagnostics, getattr(parser, 'profile', None)
+
+
+class ParallelStatementParser:
+    """Parses CSV statement records in a pool of worker processes
+
+    Header and records up to the first transaction are parsed in the calling
+    process, so statement level values set by the first accepted record
+    (account, currency) are resolved exactly as in sequential mode, however
+    many records are skipped before it, and passed on to workers. The rest
+    of the file is split on line boundaries into byte ranges, each range is
+    parsed by plugin's own parse_record() in a worker and results are merged
+    back in file order. Records must not span several lines.
+    """
+
+    min_chunk_size = MIN_CHUNK_SIZE
+
+    def __init__(self, plugin, fin, header_lines, workers=None):
+        self.plugin = plugin
+        self.fin = fin
+        self.workers = workers or parallel_workers(plugin.settings)
+        with open(fin, 'rb') as f:
+            head = b''.join(f.readline() for _ in range(header_lines))
+        self.body_start = len(head)
+        self.parser = plugin.create_parser(_text(head, plugin.get_encoding()))
+        self.statement = self.parser.statement
+        # profile of the parser in this process, worker profiles are added to it
+        self.profile = getattr(self.parser, 'profile', None)
+
+    def iter_lines(self):
+        self.parser.parse_header()
+        yield from self.iter_first_records()
+        yield from self.iter_ranges()
+        self.parser.diagnostics.report()
+        if self.profile is not None:
+            self.profile.report()
+
+    def iter_first_records(self):
+        """Parse records in the calling process one by one up to the first transaction"""
+        encoding = self.plugin.get_encoding()
+        with open(self.fin, 'rb') as f:
+            f.seek(self.body_start)
+            for record in iter(f.readline, b''):
+                self.body_start += len(record)
+                self.parser.fin = timed_stream(self.parser, _text(record, encoding))
+                lines = list(self.parser.iter_records())
+                yield from lines
+                if lines:
+                    return
+
+    def iter_ranges(self):
+        ranges = split_ranges(self.fin, self.body_start, self.workers * CHUNKS_PER_WORKER,
+                              self.min_chunk_size)
+        if not ranges:
+            return
+        state = {k: v for k, v in vars(self.statement).items() if k != 'lines'}
+        # same profile mode in workers, explicit in case it comes from environment
+        settings = dict(self.plugin.settings, profile=self.profile.mode if self.profile else '')
+        cur_record = self.parser.cur_record
+        # imported here, multiprocessing is not needed unless parallel parsing is enabled
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(self.workers) as pool:
+            futures = []
+            for start, end, lines in ranges:
+                futures.append(pool.submit(_parse_range, type(self.plugin), settings, self.fin,
+                                           start, end, cur_record, state))
+                cur_record += lines
+            for future in futures:
+                lines, diagnostics, profile = future.result()
+                self.parser.diagnostics.merge(diagnostics)
+                if profile is not None:
+                    self.profile.merge(profile)
+                yield from lines
+
+    def parse(self):
+        self.statement.lines.extend(to_lines(self.iter_lines()))
+        return self.statement
+
+    def close(self):
+        self.parser.close()
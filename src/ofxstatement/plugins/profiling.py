@@ -0,0 +1,218 @@
+#    Parse phase profiling for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Time spent by parsers in each phase of parsing, for slow imports.
+
+Enabled by 'profile' plugin setting or OFXSTATEMENT_PROFILE environment
+variable, setting wins. Value is one of
+
+summary
+    print table of phases to stderr when statement is parsed
+json
+    print the same as JSON to stderr
+json:PATH
+    write JSON to file PATH
+
+Parsers list their hot callables in profile_hooks, mapping attribute name
+to phase name: date parsing, type classification, memo formatting, id
+hashing. When profiling is on, configure() replaces them on the parser
+object with timing wrappers, together with reading of input stream
+(decode), split_records() and parse_record(). SberBank TXT parser counts
+state machine transitions as well. When it is off nothing is wrapped and
+parsers run exactly as without profiling.
+
+Times are cumulative and inclusive: split_records includes decode,
+parse_record includes phases it calls, all include the wrappers' own
+overhead of about a microsecond per call. With parallel parsing, profiles
+of worker processes are added up into the one reported, so times are
+summed over processes.
+"""
+
+import os
+import sys
+import time
+from collections import Counter
+
+PROFILE_ENV = 'OFXSTATEMENT_PROFILE'
+SUMMARY = 'summary'
+JSON = 'json'
+JSON_FILE_PREFIX = 'json:'
+
+
+def profile_setting(settings):
+    """Return profiling mode requested by plugin settings or environment, None if disabled"""
+    mode = settings.get('profile', os.environ.get(PROFILE_ENV))
+    if not mode:
+        return None
+    if mode not in (SUMMARY, JSON) and not mode.startswith(JSON_FILE_PREFIX):
+        raise ValueError('Unknown profile mode: %s' % mode)
+    return mode
+
+
+class Profile:
+    """Cumulative time and number of calls per phase, state transition counts"""
+
+    def __init__(self, name, mode=None):
+        self.name = name
+        self.mode = mode
+        self.seconds = Counter()
+        self.calls = Counter()
+        self.transitions = Counter()
+
+    def add(self, phase, elapsed):
+        self.seconds[phase] += elapsed
+        self.calls[phase] += 1
+
+    def merge(self, other):
+        """Add times, calls and transitions of other, e.g. of a worker process"""
+        self.seconds.update(other.seconds)
+        self.calls.update(other.calls)
+        self.transitions.update(other.transitions)
+
+    def wrap(self, phase, function):
+        clock = time.perf_counter
+        add = self.add
+
+        def timed(*args):
+            start = clock()
+            try:
+                return function(*args)
+            finally:
+                add(phase, clock() - start)
+
+        return timed
+
+    def iterate(self, phase, iterable):
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        add = self.add
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                add(phase, clock() - start)
+                return
+            add(phase, clock() - start)
+            yield item
+
+    def to_dict(self):
+        return {
+            'parser': self.name,
+            'phases': {phase: {'calls': self.calls[phase], 'seconds': seconds}
+                       for phase, seconds in self.seconds.most_common()},
+            'transitions': {'%s -> %s' % transition: count
+                            for transition, count in self.transitions.most_common()},
+        }
+
+    def summary(self):
+        lines = ['Profile of %s' % self.name,
+                 '%-16s %10s %10s %10s' % ('phase', 'calls', 'seconds', 'us/call')]
+        for phase, seconds in self.seconds.most_common():
+            calls = self.calls[phase]
+            lines.append('%-16s %10d %10.4f %10.2f' % (phase, calls, seconds, seconds / calls * 1e6))
+        if self.transitions:
+            lines.append('%-33s %10s' % ('transition', 'count'))
+            for transition, count in self.transitions.most_common():
+                lines.append('%-33s %10d' % ('%s -> %s' % transition, count))
+        return '\n'.join(lines)
+
+    def report(self):
+        # imported here, json is not needed unless profile is reported as JSON
+        import json
+
+        mode = self.mode
+        if mode == SUMMARY:
+            print(self.summary(), file=sys.stderr)
+        elif mode == JSON:
+            print(json.dumps(self.to_dict(), indent=2), file=sys.stderr)
+        else:
+            with open(mode[len(JSON_FILE_PREFIX):], 'w') as f:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+class TimedStream:
+    """Text stream wrapper timing iteration over its lines as decode phase"""
+
+    def __init__(self, stream, profile):
+        self.stream = stream
+        self.profile = profile
+        self.clock = time.perf_counter
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = self.clock()
+        try:
+            return next(self.stream)
+        finally:
+            self.profile.add('decode', self.clock() - start)
+
+    def readline(self, *args):
+        return self.stream.readline(*args)
+
+    def close(self):
+        self.stream.close()
+
+
+def timed_stream(parser, stream):
+    """Return stream to set as parser.fin, timed if parser is profiled"""
+    profile = getattr(parser, 'profile', None)
+    return stream if profile is None else TimedStream(stream, profile)
+
+
+def instrument(parser, mode):
+    """Wrap parser hot paths with timers, report profile once statement is parsed
+
+    Returns the Profile, also available as parser.profile.
+    """
+    profile = parser.profile = Profile(type(parser).__name__, mode)
+    for attribute, phase in parser.profile_hooks.items():
+        setattr(parser, attribute, profile.wrap(phase, getattr(parser, attribute)))
+
+    parser.fin = TimedStream(parser.fin, profile)
+    split_records = parser.split_records
+    parser.split_records = lambda: profile.iterate('split_records', split_records())
+    parser.parse_record = profile.wrap('parse_record', parser.parse_record)
+    if hasattr(parser, 'machine'):
+        _count_transitions(parser, profile)
+
+    iter_lines = parser.iter_lines
+    parse_columns = parser.parse_columns
+
+    def profiled_iter_lines():
+        yield from iter_lines()
+        profile.report()
+
+    def profiled_parse_columns():
+        table = parse_columns()
+        profile.report()
+        return table
+
+    parser.iter_lines = profiled_iter_lines
+    parser.parse_columns = profiled_parse_columns
+    return profile
+
+
+def _count_transitions(parser, profile):
+    run = profile.wrap('parse_record', parser.run)
+    transitions = profile.transitions
+
+    def counted(line):
+        state = parser.currentState
+        run(line)
+        transitions[state, parser.currentState] += 1
+
+    parser.run = counted
@@ -0,0 +1,66 @@
+#    Lightweight CSV records for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import csv
+from itertools import chain
+
+QUOTECHAR = '"'
+
+
+def read_records(fin, record, delimiter):
+    """Read CSV rows from fin as record namedtuples
+
+    Drop-in replacement for csv.DictReader(fin, delimiter=delimiter,
+    fieldnames=record._fields) in parsers: fields are accessed as attributes
+    at tuple index speed, no dict is built per row. Like DictReader, blank
+    lines are skipped, missing trailing fields are None and extra fields are
+    ignored.
+
+    Files with quoted fields in the first line are read by csv.reader. In
+    other files lines without quotes are split on delimiter directly, which
+    gives the same fields much faster, and only lines with quotes are left
+    to csv.reader.
+    """
+    return map(record._make, read_rows(fin, len(record._fields), delimiter))
+
+
+def read_rows(fin, size, delimiter):
+    """Read CSV rows from fin as lists of exactly size fields, skipping blank lines"""
+    padding = [None] * size
+    for row in _rows(fin, delimiter):
+        if len(row) != size:
+            if not row:
+                continue
+            row = (row + padding)[:size]
+        yield row
+
+
+def _rows(fin, delimiter):
+    lines = iter(fin)
+    for first in lines:
+        break
+    else:
+        return
+    lines = chain((first,), lines)
+    if QUOTECHAR in first:
+        yield from csv.reader(lines, delimiter=delimiter)
+        return
+    for line in lines:
+        if QUOTECHAR in line:
+            # quoted field may span several lines, reader takes as many as it needs
+            yield next(csv.reader(chain((line,), lines), delimiter=delimiter), [])
+            continue
+        line = line.rstrip('\r\n')
+        if line:
+            yield line.split(delimiter)
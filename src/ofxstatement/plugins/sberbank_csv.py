@@ -16,13 +16,13 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import csv
-from decimal import Decimal
-
-from ofxstatement.parser import StatementParser
+from collections import namedtuple
 from ofxstatement.plugin import Plugin
-from ofxstatement import statement
-from datetime import datetime
+from ofxstatement.plugins.columnar import read_columns
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.fingerprints import incremental
+from ofxstatement.plugins.formats import Amount, Format, FormatStatementParser, Join, TypeRule
+from ofxstatement.plugins.parallel import ParallelStatementParser, parallel_workers
 
 # file format options
 SB_DELIMITER = ';'
@@ -30,52 +30,55 @@ SD_TIME_FORMAT = '%d.%m.%Y'
 SD_ENCODING = 'utf-8'
 SB_FIELDNAMES = ['card_type', 'card_num', 'date_user', 'date', 'auth_code', 'op_type', 'op_city',
                  'op_country', 'description', 'currency', 'currency_amount', 'amount']
+SberBankRecord = namedtuple('SberBankRecord', SB_FIELDNAMES)
 
+SB_FORMAT = Format(
+    record=SberBankRecord, delimiter=SB_DELIMITER, skip_lines=1, date_format=SD_TIME_FORMAT,
+    date=('date',), date_user='date_user', amount=Amount('amount'), trntype=TypeRule(None, zero='CREDIT'),
+    memo=Join(', ', ('description', 'op_city', 'op_country', 'op_type')), id='date')
 
-class SberBankCSVStatementParser(StatementParser):
-    statement = None
-
-    def __init__(self, fin):
-        super().__init__()
-        self.statement = statement.Statement()
-        self.fin = fin
-        # Skip 1st row with column's headers
-        self.fin.readline()
-        self.cur_record = 1
 
-    def split_records(self):
-        return csv.DictReader(self.fin, delimiter=SB_DELIMITER, fieldnames=SB_FIELDNAMES)
+class SberBankCSVStatementParser(FormatStatementParser):
+    # number of lines preceding transaction records
+    header_lines = 1
+    profile_hooks = {'parse_date': 'parse_date', 'format_memo': 'format_memo', 'transaction_id': 'transaction_id'}
+    format = SB_FORMAT
 
     def parse_record(self, line):
-        transaction = statement.StatementLine()
-
         if not self.statement.account_id:
-            self.statement.account_id = '{} {}'.format(line['card_type'], line['card_num'])
-
-        transaction.date = datetime.strptime(line['date'], SD_TIME_FORMAT)
-        transaction.date_user = datetime.strptime(line['date_user'], SD_TIME_FORMAT)
+            self.statement.account_id = '{} {}'.format(line.card_type, line.card_num)
 
-        transaction.amount = Decimal(line['amount'].replace(',', '.'))
+        return super().parse_record(line)
 
-        transaction.trntype = 'DEBIT' if transaction.amount > 0 else 'CREDIT'
+    def parse_columns(self):
+        columns = read_columns(self.fin, SberBankRecord, SB_DELIMITER)
+        self.cur_record += len(columns.date)
 
-        transaction.memo = ', '.join(line[f] for f in
-                                     ('description', 'op_city', 'op_country', 'op_type') if line[f])
-
-        # as csv file does not contain explicit id of transaction, generating artificial one
-        transaction.id = statement.generate_transaction_id(transaction)
-
-        return transaction
+        if not self.statement.account_id and columns.date:
+            self.statement.account_id = '{} {}'.format(columns.card_type[0], columns.card_num[0])
 
+        # dates, amount, type, memo and id as SB_FORMAT says
+        return self.build_columns(columns)
 
 class SberBankCSVPlugin(Plugin):
     """SberBank CSV (http://sberbank.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'SberBank')
+
+    def get_encoding(self):
+        return SD_ENCODING
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=SD_ENCODING)
-        parser = SberBankCSVStatementParser(f)
-        parser.statement.currency = self.settings.get('currency')
-        parser.statement.account_id = self.settings.get('account')
-        parser.statement.bank_id = self.settings.get('bank', 'SberBank')
-        return parser
+        if parallel_workers(self.settings):
+            parser = ParallelStatementParser(self, fin, SberBankCSVStatementParser.header_lines)
+        else:
+            parser = self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+        return incremental(self, parser)
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(SberBankCSVStatementParser(f), self.config)
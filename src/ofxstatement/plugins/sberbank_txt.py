@@ -15,36 +15,120 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ofxstatement.parser import StatementParser
 from ofxstatement.plugin import Plugin
+from ofxstatement.plugins.amounts import parse_amount
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.streaming import StreamingStatementParser
+from ofxstatement.plugins.transactions import Transaction
 from ofxstatement import statement
 from datetime import datetime
+from operator import methodcaller
+from types import MappingProxyType
 import re
 
 # file format options
 sb_encoding = 'cp1251'
+sb_months = {
+    u'ЯНВ': 1,
+    u'ФЕВ': 2,
+    u'МАР': 3,
+    u'АПР': 4,
+    u'МАЙ': 5,
+    u'ИЮН': 6,
+    u'ИЮЛ': 7,
+    u'АВГ': 8,
+    u'СЕН': 9,
+    u'ОКТ': 10,
+    u'НОЯ': 11,
+    u'ДЕК': 12,
+}
 
 
-class ParserState:
-    name = ""
-    matchers = None
+class _Groups:
+    """Groups of one alternative of a combined pattern match, numbered as in
+    the alternative's own pattern"""
+    __slots__ = ('match', 'offset')
 
-    def __init__(self, name, parser):
-        self.name = name
-        self.matchers = list()
-        parser.append(self)
+    def __init__(self, match, offset):
+        self.match = match
+        self.offset = offset
 
-    def addMatcher(self, reString, nextState=None, function=None):
-        self.matchers.append([re.compile(reString), nextState, function])
+    def group(self, index=0):
+        return self.match.group(self.offset + index)
 
-    def run(self, line):
-        for (matcher, nextState, function) in self.matchers:
-            match = matcher.match(line)
-            if match:
-                if function:
-                    function(match)
-                return nextState
-        return None
+
+class _Patterns(dict):
+    """Combined pattern and dispatch table of state, by frozenset of passed
+    guards, compiled on first lookup"""
+
+    def __init__(self, state):
+        super().__init__()
+        self.state = state
+
+    def __missing__(self, passed):
+        value = self[passed] = self.state.compile(passed)
+        return value
+
+
+# cheap literal tests telling that a pattern cannot match a line
+separator_guard = methodcaller('startswith', ('-', '+'))
+amount_guard = methodcaller('__contains__', '.')
+total_guard = methodcaller('__contains__', 'ИТОГО ПО')
+
+
+class ParserState:
+    """State of the statement parser
+
+    Matchers of a state are merged into one pattern of named alternatives,
+    so a line is matched once whatever the number of matchers. Matcher may
+    have a guard: a cheap test returning false for lines its pattern can
+    never match. Alternatives with failed guards are left out of the pattern
+    and if no alternatives are left, the regex is not run at all.
+
+    Combined pattern for a combination of passed guards is compiled the
+    first time a line passes it and cached in the state, not at import.
+    States are otherwise immutable and shared by all parsers. Matcher
+    functions get the parser as first argument.
+    """
+    __slots__ = ('name', 'matchers', 'guards', 'patterns')
+
+    def __init__(self, name, matchers):
+        self.name = name
+        self.matchers = tuple(matchers)
+        guards = []
+        for _, _, _, guard in self.matchers:
+            if guard is not None and guard not in guards:
+                guards.append(guard)
+        self.guards = tuple(guards)
+        self.patterns = _Patterns(self)
+
+    def compile(self, passed):
+        """Return combined pattern and its dispatch table for matchers with
+        guards from passed set"""
+        alternatives = []
+        dispatch = {}
+        offset = 1
+        for i, (pattern, nextState, function, guard) in enumerate(self.matchers):
+            if guard is None or guard in passed:
+                alternatives.append('(?P<m%d>%s)' % (i, pattern))
+                dispatch[offset] = (nextState, function, offset)
+                offset += re.compile(pattern).groups + 1
+        if not alternatives:
+            return None, dispatch
+        return re.compile('|'.join(alternatives)), dispatch
+
+    def run(self, parser, line):
+        pattern, dispatch = self.patterns[frozenset(guard for guard in self.guards if guard(line))]
+        if pattern is None:
+            return None
+        match = pattern.match(line)
+        if match is None:
+            return None
+        # outer group of the matched alternative is closed last
+        nextState, function, offset = dispatch[match.lastindex]
+        if function:
+            function(parser, _Groups(match, offset))
+        return nextState
 
     def __str__(self):
         string = "State '%s' matchers:\n" % self.name
@@ -53,19 +137,13 @@ class ParserState:
         return string
 
 
-class SberBankTxtStatementParser(StatementParser):
-    statement = None
+def matcher(reString, nextState=None, function=None, guard=None):
+    """Return matcher of ParserState: line pattern, state to switch to,
+    function(parser, match) to call and guard"""
+    return reString, nextState, function, guard
 
-    transaction = None
-    account_id = ""
-    account_fl_len = 0
 
-    machine = {}
-    currentState = None
-    internal = None
-
-    def append(self, state):
-        self.machine[state.name] = state
+class SberBankTxtStatementParser(StreamingStatementParser):
 
     def extractCurrency(self, match):
         if not self.statement.currency:
@@ -73,127 +151,117 @@ class SberBankTxtStatementParser(StatementParser):
 
     def extractBeginBalance(self, match):
         if not self.statement.start_balance:
-            self.statement.start_balance = float(match.group(1))
+            self.statement.start_balance = parse_amount(match.group(1))
 
     def extractEndBalance(self, match):
         if not self.statement.end_balance:
-            self.statement.end_balance = float(match.group(1))
+            self.statement.end_balance = parse_amount(match.group(1))
         if not self.statement.account_id:
-            self.statement.account_id = " ".join(self.account_id.split())
+            self.statement.account_id = " ".join("".join(self.account_id).split())
         if self.transaction:
             self.transaction.memo = " ".join(self.transaction.memo.split())
-            self.statement.lines.append(self.transaction)
+            self.completed.append(self.transaction)
             self.transaction = None
 
     def parseDate(self, string):
-        rusMonths = {
-            u'ЯНВ': 1,
-            u'ФЕВ': 2,
-            u'МАР': 3,
-            u'АПР': 4,
-            u'МАЙ': 5,
-            u'ИЮН': 6,
-            u'ИЮЛ': 7,
-            u'АВГ': 8,
-            u'СЕН': 9,
-            u'ОКТ': 10,
-            u'НОЯ': 11,
-            u'ДЕК': 12,
-        }
-        return datetime(2000 + int(string[5:]), rusMonths[string[2:5]], int(string[:2]))
+        return datetime(2000 + int(string[5:]), sb_months[string[2:5]], int(string[:2]))
 
     def extractTransaction(self, match):
         if self.transaction:
             self.transaction.memo = " ".join(self.transaction.memo.split())
-            self.statement.lines.append(self.transaction)
+            self.completed.append(self.transaction)
 
-        self.transaction = statement.StatementLine()
+        self.transaction = Transaction()
 
         self.account_fl_len = len(match.group(1))
 
         self.transaction.date = self.parseDate(match.group(3))
         self.transaction.memo = match.group(4)
-        self.transaction.amount = float(match.group(5)) * (1 if match.group(6) else -1)
+        self.transaction.amount = parse_amount(match.group(5)) * (1 if match.group(6) else -1)
         self.transaction.trntype = 'DEBIT' if match.group(6) else 'CREDIT'
         if match.group(1).strip():
-            self.account_id += match.group(1)
+            self.account_id.append(match.group(1))
 
     def extractTransactionAppend(self, match):
         first = match.group(1)[:self.account_fl_len]
         second = match.group(1)[self.account_fl_len:]
-        self.account_id += first
+        self.account_id.append(first)
         self.transaction.memo += second
 
+    # transition table, compiled once for all parsers
+    machine = MappingProxyType({state.name: state for state in [
+        ParserState('init', [
+            matcher(r"^.*ВАЛЮТА СЧЕТА.*$", 'currency'),
+        ]),
+        ParserState('currency', [
+            matcher(r"^\s*(\w{3})\s*$", 'begin_balance', extractCurrency),
+        ]),
+        ParserState('begin_balance', [
+            matcher(r"^ОСТАТОК НА НАЧАЛО ПЕРИОДА:\s*(\d+\.\d{2})(\+)?\s*$", 'table_header', extractBeginBalance),
+        ]),
+        ParserState('table_header', [
+            matcher(r"^[-+]{80,}$", 'table_header2', guard=separator_guard),
+        ]),
+        ParserState('table_header2', [
+            matcher(r"^[-+]{80,}$", 'transaction', guard=separator_guard),
+        ]),
+        ParserState('transaction', [
+            matcher(r"^[-+]{80,}$", 'end_balance', guard=separator_guard),
+            matcher(r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(.*)\s\w{3}\s+\d*\.\d{2}\s+"
+                    r"(\d*\.\d{2})(CR)?\s*$",
+                    None, extractTransaction, amount_guard),
+            matcher(r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(КОМИССИЯ)\s+(\d*\.\d{2})(CR)?\s*$",
+                    None, extractTransaction, amount_guard),
+            matcher(r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(.*)\s(\d*\.\d{2})(CR)?\s*$",
+                    None, extractTransaction, amount_guard),
+            matcher(r".*ИТОГО ПО.*", guard=total_guard),
+            matcher(r"^(.+)\s*$", None, extractTransactionAppend),
+        ]),
+        ParserState('end_balance', [
+            matcher(r"^ОСТАТОК НА КОНЕЦ ПЕРИОДА:\s*(\d+\.\d{2})\+?\s*$", 'table_header', extractEndBalance),
+        ]),
+    ]})
+
     def __init__(self, fin):
+        super().__init__()
         self.statement = statement.Statement()
-        self.internal = {}
         self.fin = fin
-
         self.currentState = 'init'
-
-        state = ParserState('init', self)
-        state.addMatcher(r"^.*ВАЛЮТА СЧЕТА.*$", 'currency')
-
-        state = ParserState('currency', self)
-        state.addMatcher(r"^\s*(\w{3})\s*$",
-                         'begin_balance',
-                         self.extractCurrency)
-
-        state = ParserState('begin_balance', self)
-        state.addMatcher(r"^ОСТАТОК НА НАЧАЛО ПЕРИОДА:\s*(\d+\.\d{2})(\+)?\s*$",
-                         'table_header',
-                         self.extractBeginBalance)
-
-        state = ParserState('table_header', self)
-        state.addMatcher(r"^[-+]{80,}$", 'table_header2')
-
-        state = ParserState('table_header2', self)
-        state.addMatcher(r"^[-+]{80,}$", 'transaction')
-
-        state = ParserState('transaction', self)
-        state.addMatcher(r"^[-+]{80,}$", 'end_balance')
-        state.addMatcher(
-            r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(.*)\s\w{3}\s+\d*\.\d{2}\s+(\d*\.\d{2})(CR)?\s*$",
-            None,
-            self.extractTransaction)
-        state.addMatcher(
-            r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(КОМИССИЯ)\s+(\d*\.\d{2})(CR)?\s*$",
-            None,
-            self.extractTransaction)
-        state.addMatcher(
-            r"^(.*)\s*(\d{2}[А-Я]{3})\s+(\d{2}[А-Я]{3}\d{2})\s+\d{6}\s+(.*)\s(\d*\.\d{2})(CR)?\s*$",
-            None,
-            self.extractTransaction)
-        state.addMatcher(r".*ИТОГО ПО.*")
-        state.addMatcher(r"^(.+)\s*$",
-                         None,
-                         self.extractTransactionAppend)
-
-        state = ParserState('end_balance', self)
-        state.addMatcher(r"^ОСТАТОК НА КОНЕЦ ПЕРИОДА:\s*(\d+\.\d{2})\+?\s*$",
-                         'table_header',
-                         self.extractEndBalance)
+        # per-parse state of matcher functions
+        self.completed = []
+        self.transaction = None
+        # parts of account id, joined at the end of transaction table
+        self.account_id = []
+        self.account_fl_len = 0
 
     def run(self, line):
-        nextState = self.machine[self.currentState].run(line)
+        nextState = self.machine[self.currentState].run(self, line)
         if nextState:
             self.currentState = nextState
 
-    def parse(self):
+    def iter_lines(self):
         for line in self.fin:
             self.run(line)
-
-        return self.statement
+            if self.completed:
+                yield from self.completed
+                self.completed.clear()
 
 
 class SberBankTxtPlugin(Plugin):
     """SberBank TXT (http://sbrf.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'SberBank')
+
+    def get_encoding(self):
+        return sb_encoding
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=sb_encoding)
-        parser = SberBankTxtStatementParser(f)
-        parser.statement.currency = self.settings.get('currency', None)
-        parser.statement.account_id = self.settings.get('account', None)
-        parser.statement.bank_id = self.settings.get('bank', 'SberBank')
-        return parser
+        return self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(SberBankTxtStatementParser(f), self.config)
@@ -0,0 +1,335 @@
+#    Statement conversion server for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Convert statements uploaded over HTTP, for services that would otherwise
+run ofxstatement once per file.
+
+    ofxstatement-server --port 8730 --workers 4 --queue-size 32
+
+``POST /convert/PLUGIN`` with a statement file as request body returns it
+converted to OFX. As with ofxstatement-batch, PLUGIN is a plugin name, a
+section of ofxstatement configuration file or 'auto' to detect it from the
+statement. ``GET /metrics`` returns queue depth, request counters and
+latency percentiles as JSON.
+
+Conversions run on a pool of worker processes, each converting one file at
+a time. At most workers + queue_size requests are uploading, waiting for a
+free worker or converting at once, further ones are refused with 503 right
+away instead of piling up, so a spike of uploads cannot exhaust memory or
+disk. Upload and OFX are spooled to a
+temporary directory and streamed from there, never held in memory whole.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import unquote
+
+from ofxstatement import configuration
+
+from ofxstatement.plugins.batch import convert_file, resolve_plugin
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8730
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_MAX_SIZE = 64 << 20
+CHUNK_SIZE = 1 << 16
+# number of latest conversions latency percentiles are computed over
+LATENCY_WINDOW = 1000
+
+REASONS = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    411: 'Length Required',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+CONVERT_PREFIX = '/convert/'
+
+# new in Python 3.7, get_event_loop() returns the running loop in coroutines before
+get_running_loop = getattr(asyncio, 'get_running_loop', asyncio.get_event_loop)
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResponseBroken(Exception):
+    """Response failed after its head was sent, connection can only be closed"""
+
+
+def percentiles(values):
+    """Return dict of p50, p95, p99 and max of values (nearest rank), None if empty"""
+    if not values:
+        return None
+    values = sorted(values)
+    result = {name: values[min(len(values) - 1, int(fraction * len(values)))]
+              for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))}
+    result['max'] = values[-1]
+    return result
+
+
+class Metrics:
+    """Request counters, queue depth and latencies of the latest conversions
+
+    latency is the time from request to the end of response of every
+    admitted conversion, failed ones included, queue_wait the part of it
+    spent waiting for a free worker, both in seconds.
+    """
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.requests = Counter()
+        self.plugins = Counter()
+        self.queued = 0
+        self.max_queued = 0
+        self.running = 0
+        self.latency = deque(maxlen=window)
+        self.queue_wait = deque(maxlen=window)
+
+    def snapshot(self):
+        return {
+            'queued': self.queued,
+            'max_queued': self.max_queued,
+            'running': self.running,
+            'requests': {str(status): count for status, count in sorted(self.requests.items())},
+            'plugins': dict(self.plugins),
+            'latency': percentiles(self.latency),
+            'queue_wait': percentiles(self.queue_wait),
+        }
+
+
+async def read_head(reader):
+    """Read request line and headers, return (method, target, headers dict)"""
+    parts = (await reader.readline()).decode('latin-1').split()
+    if len(parts) != 3:
+        raise HTTPError(400, 'malformed request line')
+    method, target, _ = parts
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if not line.strip():
+            return method, target, headers
+        name, sep, value = line.partition(':')
+        if not sep:
+            raise HTTPError(400, 'malformed header')
+        headers[name.strip().lower()] = value.strip()
+
+
+def response_head(status, content_type, length, headers=()):
+    lines = ['HTTP/1.1 %d %s' % (status, REASONS[status]),
+             'Content-Type: %s' % content_type,
+             'Content-Length: %d' % length,
+             'Connection: close']
+    lines.extend('%s: %s' % header for header in headers)
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+
+
+class ConversionServer:
+    """HTTP front end converting uploads on a bounded pool of workers
+
+    executor defaults to a pool of workers processes, conversions do not
+    block the event loop nor each other.
+    """
+
+    def __init__(self, workers=None, queue_size=DEFAULT_QUEUE_SIZE, max_size=DEFAULT_MAX_SIZE, config=None,
+                 executor=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_size = max_size
+        self.config = config
+        self.executor = executor or ProcessPoolExecutor(self.workers)
+        self.metrics = Metrics()
+        self.slots = None
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT, path=None):
+        """Start listening on TCP host and port, or on unix socket path if given"""
+        self.slots = asyncio.Semaphore(self.workers)
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def handle(self, reader, writer):
+        status = None
+        try:
+            method, target, headers = await read_head(reader)
+            if target == '/metrics':
+                if method != 'GET':
+                    raise HTTPError(405, 'use GET')
+                body = json.dumps(self.metrics.snapshot(), indent=2).encode('utf-8')
+                writer.write(response_head(200, 'application/json', len(body)) + body)
+                status = 200
+            elif target.startswith(CONVERT_PREFIX):
+                if method != 'POST':
+                    raise HTTPError(405, 'use POST')
+                status = await self.convert(unquote(target[len(CONVERT_PREFIX):]), headers, reader, writer)
+            else:
+                raise HTTPError(404, 'unknown path %s' % target)
+        except HTTPError as e:
+            status = e.status
+            body = (str(e) + '\n').encode('utf-8')
+            writer.write(response_head(e.status, 'text/plain; charset=utf-8', len(body)) + body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # client went away, nothing to answer
+            pass
+        except ResponseBroken:
+            # client has the head of a 200 response already, body is cut short
+            log.exception('Failed to send response')
+            status = 500
+        except Exception as e:
+            # e.g. header line over the stream limit, temporary directory not writable
+            log.exception('Failed to handle request')
+            status = 500
+            body = ('%s: %s\n' % (type(e).__name__, e)).encode('utf-8')
+            writer.write(response_head(500, 'text/plain; charset=utf-8', len(body)) + body)
+        finally:
+            if status is not None:
+                self.metrics.requests[status] += 1
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+            writer.close()
+
+    async def convert(self, name, headers, reader, writer):
+        start = time.perf_counter()
+        if 'content-length' not in headers:
+            raise HTTPError(411, 'Content-Length is required')
+        try:
+            length = int(headers['content-length'])
+        except ValueError:
+            raise HTTPError(400, 'malformed Content-Length')
+        if length < 0:
+            raise HTTPError(400, 'negative Content-Length')
+        if length > self.max_size:
+            raise HTTPError(413, 'statement is larger than %d bytes' % self.max_size)
+        metrics = self.metrics
+        if metrics.queued + metrics.running >= self.workers + self.queue_size:
+            raise HTTPError(503, 'conversion queue is full, retry later')
+
+        # place in the queue is taken before upload, so uploads are bounded too
+        metrics.queued += 1
+        metrics.max_queued = max(metrics.max_queued, metrics.queued)
+        queued = True
+        try:
+            with tempfile.TemporaryDirectory(prefix='ofxstatement-server-') as workdir:
+                path = os.path.join(workdir, 'statement')
+                output = os.path.join(workdir, 'statement.ofx')
+                await receive(reader, path, length)
+                try:
+                    # 'auto' needs the statement to detect its format
+                    plugin_name, settings = resolve_plugin(name, self.config, path)
+                except ValueError as e:
+                    raise HTTPError(422, str(e))
+                metrics.plugins[plugin_name] += 1
+                waiting = time.perf_counter()
+                async with self.slots:
+                    metrics.queued -= 1
+                    queued = False
+                    metrics.queue_wait.append(time.perf_counter() - waiting)
+                    metrics.running += 1
+                    try:
+                        result = await get_running_loop().run_in_executor(
+                            self.executor, convert_file, path, plugin_name, settings, output)
+                    finally:
+                        metrics.running -= 1
+                if result.error:
+                    raise HTTPError(422, result.error)
+                await send_file(writer, output, [('X-Transactions', result.rows), ('X-Skipped', result.skipped)])
+        finally:
+            if queued:
+                metrics.queued -= 1
+            metrics.latency.append(time.perf_counter() - start)
+        return 200
+
+
+async def receive(reader, path, length):
+    """Copy length bytes of request body into file at path"""
+    with open(path, 'wb') as f:
+        while length:
+            chunk = await reader.readexactly(min(length, CHUNK_SIZE))
+            f.write(chunk)
+            length -= len(chunk)
+
+
+async def send_file(writer, path, headers):
+    """Send file at path as OFX response, waiting for slow clients between chunks
+
+    Failures after the head is written are raised as ResponseBroken.
+    """
+    writer.write(response_head(200, 'application/x-ofx; charset=utf-8', os.path.getsize(path), headers))
+    try:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                writer.write(chunk)
+                await writer.drain()
+    except ConnectionError:
+        raise
+    except Exception as e:
+        raise ResponseBroken() from e
+
+
+def make_args_parser():
+    parser = argparse.ArgumentParser(prog='ofxstatement-server',
+                                     description='Convert bank statements uploaded over HTTP to OFX.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='port to listen on (default: %(default)s)')
+    parser.add_argument('--unix', metavar='PATH', help='listen on unix socket PATH instead of TCP')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help='requests allowed to wait for a free worker (default: %(default)s)')
+    parser.add_argument('--max-size', type=int, default=DEFAULT_MAX_SIZE,
+                        help='largest accepted statement in bytes (default: %(default)s)')
+    return parser
+
+
+def run(argv=None):
+    args = make_args_parser().parse_args(argv)
+    server = ConversionServer(args.workers, args.queue_size, args.max_size, configuration.read())
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    listener = loop.run_until_complete(server.start(args.host, args.port, args.unix))
+    print('Listening on %s' % (args.unix or '%s:%d' % (args.host, args.port)))
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.close()
+        loop.run_until_complete(listener.wait_closed())
+        server.close()
+        loop.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(run())
@@ -0,0 +1,161 @@
+#    Statement format detection for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Tell which plugin a statement file is for from its first few kilobytes.
+
+Every plugin has a Signature: encodings, header text, delimiter and number
+of fields of records, format of dates in a given field. sniff() reads the
+head of file as bytes, detects its encoding and scores each signature from
+0 to 1 on the checks that apply to it:
+
+encoding
+    head decodes in one of plugin's encodings
+header
+    share of plugin's header strings found in the head
+fields
+    share of records split on plugin's delimiter into its number of fields
+dates
+    share of records with a date of plugin's format in its date field
+
+Score is the weighted mean of these. A wrong plugin gets a low score in
+well under a millisecond instead of failing after a full parse.
+"""
+
+import re
+from collections import namedtuple
+
+from ofxstatement.plugins import alfabank, avangard, sberbank_csv, tinkoff, vtb
+
+# bytes of file read for detection
+SNIFF_SIZE = 8192
+# records of the head checked against signatures
+SNIFF_RECORDS = 20
+# scores below are no match
+MIN_CONFIDENCE = 0.5
+
+WEIGHTS = {'encoding': 1, 'header': 2, 'fields': 1, 'dates': 2}
+
+Signature = namedtuple('Signature', ['plugin', 'encodings', 'header', 'header_lines', 'delimiter', 'fields',
+                                     'date_field', 'date_pattern'])
+SniffResult = namedtuple('SniffResult', ['plugin', 'encoding', 'confidence'])
+
+_DATE_DIRECTIVES = {'d': r'\d{2}', 'm': r'\d{2}', 'y': r'\d{2}', 'Y': r'\d{4}', 'H': r'\d{2}', 'M': r'\d{2}',
+                    'S': r'\d{2}'}
+
+
+def date_pattern(format):
+    """Return compiled regex fully matching dates in zero padded strptime format"""
+    pattern = ''.join(_DATE_DIRECTIVES[token[1]] if token.startswith('%') else re.escape(token)
+                      for token in re.findall(r'%.|[^%]', format))
+    return re.compile(pattern + '$')
+
+
+SIGNATURES = (
+    Signature('tinkoff', (tinkoff.t_encoding,), ('Дата операции', 'Номер карты', 'Статус', 'Кэшбэк'),
+              tinkoff.TinkoffStatementParser.header_lines, tinkoff.t_delimiter, len(tinkoff.t_fieldnames),
+              tinkoff.t_fieldnames.index('op_time'), date_pattern(tinkoff.t_time_format)),
+    Signature('avangard', (avangard.av_encoding,), (),
+              avangard.AvangardStatementParser.header_lines, avangard.av_delimiter, len(avangard.av_fieldnames),
+              avangard.av_fieldnames.index('tr_time'), date_pattern(avangard.av_time_format)),
+    Signature('sberbank_csv', (sberbank_csv.SD_ENCODING,), ('Тип карты', 'Номер карты', 'Дата совершения операции'),
+              sberbank_csv.SberBankCSVStatementParser.header_lines, sberbank_csv.SB_DELIMITER,
+              len(sberbank_csv.SB_FIELDNAMES), sberbank_csv.SB_FIELDNAMES.index('date'),
+              date_pattern(sberbank_csv.SD_TIME_FORMAT)),
+    Signature('alfabank', (alfabank.default_encoding, 'utf-8'),
+              ('Тип счёта', 'Номер счета', 'Дата операции', 'Референс проводки'),
+              alfabank.AlfabankStatementParser.header_lines, alfabank.delimiter, len(alfabank.fieldnames),
+              alfabank.fieldnames.index('op_time'), date_pattern(alfabank.date_format)),
+    Signature('vtb', (vtb.default_encoding, 'utf-8'), ('Начало периода', 'Конец периода', 'Баланс на конец периода'),
+              vtb.VtbStatementParser.header_lines, vtb.delimiter, len(vtb.records_fieldnames),
+              vtb.records_fieldnames.index('operation_date'), date_pattern(vtb.operation_date_format)),
+    # transaction table of text report, dates like 16ИЮН19
+    Signature('sberbank_txt', ('cp1251',), ('ОТЧЕТ ПО СЧЕТУ КАРТЫ', 'ВАЛЮТА СЧЕТА', 'ОСТАТОК НА НАЧАЛО ПЕРИОДА'),
+              0, None, None, None, re.compile(r'\d{2}[А-Я]{3}\d{2}')),
+)
+
+
+def read_head(path, size=SNIFF_SIZE):
+    """Return first size bytes of file, cut after the last complete line if file is longer"""
+    with open(path, 'rb') as f:
+        head = f.read(size + 1)
+    if len(head) > size:
+        head = head[:head.rfind(b'\n', 0, size) + 1] or head[:size]
+    return head
+
+
+def detect_encoding(head):
+    """Return 'ascii', 'utf-8', 'cp1251' or None, first of them head decodes in"""
+    for encoding in ('ascii', 'utf-8', 'cp1251'):
+        try:
+            head.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        return encoding
+    return None
+
+
+def score(signature, text, encoding):
+    """Return confidence from 0 to 1 of text decoded from head in encoding being in signature's format"""
+    checks = {'encoding': encoding == 'ascii' or encoding in signature.encodings}
+    lines = text.splitlines()
+    if signature.header:
+        head = '\n'.join(lines[:signature.header_lines + 1]) if signature.delimiter else text
+        checks['header'] = sum(marker in head for marker in signature.header) / len(signature.header)
+    if signature.delimiter is None:
+        checks['dates'] = signature.date_pattern.search(text) is not None
+    else:
+        records = [line.split(signature.delimiter)
+                   for line in lines[signature.header_lines:signature.header_lines + SNIFF_RECORDS] if line]
+        if records:
+            # trailing delimiter gives an extra empty field
+            checks['fields'] = sum(len(fields) == signature.fields or
+                                   len(fields) == signature.fields + 1 and not fields[-1]
+                                   for fields in records) / len(records)
+            checks['dates'] = sum(len(fields) > signature.date_field and
+                                  signature.date_pattern.match(fields[signature.date_field].strip('"')) is not None
+                                  for fields in records) / len(records)
+        else:
+            checks['fields'] = checks['dates'] = 0
+    return sum(WEIGHTS[check] * value for check, value in checks.items()) / sum(WEIGHTS[check] for check in checks)
+
+
+def score_head(head, signatures=SIGNATURES):
+    """Return SniffResult of every signature for head bytes, best first"""
+    encoding = detect_encoding(head)
+    texts = {}
+    results = []
+    for signature in signatures:
+        text_encoding = encoding if encoding in signature.encodings else signature.encodings[0]
+        text = texts.get(text_encoding)
+        if text is None:
+            text = texts[text_encoding] = head.decode(text_encoding, errors='replace').lstrip('\ufeff')
+        results.append(SniffResult(signature.plugin, text_encoding, score(signature, text, encoding)))
+    results.sort(key=lambda result: result.confidence, reverse=True)
+    return results
+
+
+def sniff(path, size=SNIFF_SIZE, signatures=SIGNATURES):
+    """Return SniffResult of plugin best matching file, None if none reaches MIN_CONFIDENCE"""
+    results = score_head(read_head(path, size), signatures)
+    if results and results[0].confidence >= MIN_CONFIDENCE:
+        return results[0]
+    return None
+
+
+def plugin_settings(result, signatures=SIGNATURES):
+    """Return settings making plugin of SniffResult read file in detected encoding"""
+    for signature in signatures:
+        if signature.plugin == result.plugin and result.encoding != signature.encodings[0]:
+            return {'file_encoding': result.encoding}
+    return {}
@@ -0,0 +1,137 @@
+#    Per-currency statement split for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""One statement per account and currency out of a single file.
+
+Tinkoff and Alfabank exports mix operations in several currencies (and
+Alfabank ones several accounts), while statement has one currency, so
+records in other currencies than the first one are left out. With 'split'
+setting the file is read once and every record goes into the statement of
+its (account, currency) pair, given by parser's split_key(record).
+Plugins whose parsers have no split_key() do not support the setting.
+
+Records are parsed by plugin's own parse_record() with the target
+statement set as parser.statement, so they are checked and converted
+exactly as in a single currency statement. Parallel parsing and
+transaction index are not used in this mode.
+"""
+
+import os
+import re
+
+from ofxstatement import statement as ofx_statement
+
+from ofxstatement.plugins.streaming import StreamingOfxWriter
+
+
+def split_enabled(settings):
+    return settings.get('split') == 'true'
+
+
+def new_statement(template, account_id, currency):
+    """Return empty statement for account and currency, other fields taken from template"""
+    return ofx_statement.Statement(template.bank_id, account_id or template.account_id, currency)
+
+
+def split_parser(plugin, fin):
+    """Return plugin's parser of fin, ValueError if plugin does not support split"""
+    parser = plugin.create_parser(fin)
+    if not hasattr(parser, 'split_key'):
+        raise ValueError('%s does not support split' % type(plugin).__name__)
+    return parser
+
+
+def iter_split(parser, statements):
+    """Parse records yielding (key, line), statements of keys are put into statements dict
+
+    Statements appear in statements dict in order of their first records.
+    """
+    template = parser.statement
+    parser.parse_header()
+    try:
+        for record in parser.split_records():
+            parser.cur_record += 1
+            if not record:
+                continue
+            key = parser.split_key(record)
+            target = statements.get(key)
+            if target is None:
+                target = statements[key] = new_statement(template, *key)
+            parser.statement = target
+            line = parser.parse_record(record)
+            if line:
+                line.assert_valid()
+                yield key, line
+    finally:
+        parser.statement = template
+    parser.diagnostics.report()
+
+
+def parse_split(plugin, path):
+    """Parse statement file with plugin, return list of statements per account and currency"""
+    statements = {}
+    with open(path, 'r', encoding=plugin.get_encoding()) as f:
+        for key, line in iter_split(split_parser(plugin, f), statements):
+            statements[key].lines.append(line.to_line())
+    return list(statements.values())
+
+
+def split_path(output, statement):
+    """Return output path with account and currency of statement added to file name
+
+    'out/statement.ofx' becomes 'out/statement-40817810-USD.ofx'.
+    """
+    root, ext = os.path.splitext(output)
+    parts = [root]
+    if statement.account_id:
+        parts.append(re.sub(r'[^\w.]+', '_', statement.account_id))
+    parts.append(statement.currency or 'none')
+    return '-'.join(parts) + (ext or '.ofx')
+
+
+def write_split_ofx(plugin, path, output):
+    """Convert statement file into one OFX file per account and currency in one pass
+
+    Files are named by split_path(output, statement). Transactions are
+    spooled per statement while the file is parsed and OFX files are written
+    at the end, under temporary names until all of them are complete.
+    Returns list of (path, writer) pairs.
+    """
+    statements = {}
+    writers = {}
+    results = []
+    try:
+        with open(path, 'r', encoding=plugin.get_encoding()) as f:
+            for key, line in iter_split(split_parser(plugin, f), statements):
+                writer = writers.get(key)
+                if writer is None:
+                    writer = writers[key] = StreamingOfxWriter(statements[key])
+                writer.add(line)
+        for key, writer in writers.items():
+            target = split_path(output, statements[key])
+            results.append((target, writer))
+            with open(target + '.part', 'w', encoding='utf-8') as out:
+                writer.finish(out)
+            writer.assert_valid()
+        for target, _ in results:
+            os.replace(target + '.part', target)
+        return results
+    except Exception:
+        for target, _ in results:
+            if os.path.exists(target + '.part'):
+                os.remove(target + '.part')
+        raise
+    finally:
+        for writer in writers.values():
+            writer.discard()
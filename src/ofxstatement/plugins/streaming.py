@@ -0,0 +1,184 @@
+#    Streaming statement parsing and OFX output for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import shutil
+import tempfile
+from math import isclose
+from xml.etree import ElementTree as etree
+
+from ofxstatement import exceptions
+from ofxstatement.ofx import OfxWriter
+from ofxstatement.parser import StatementParser
+
+from ofxstatement.plugins.columnar import lines_to_columns
+from ofxstatement.plugins.dates import parse_datetime
+from ofxstatement.plugins.diagnostics import Diagnostics
+from ofxstatement.plugins.transactions import to_lines
+
+BANKTRANLIST_END = '</BANKTRANLIST>'
+
+
+class StreamingStatementParser(StatementParser):
+    """Statement parser able to produce transactions one by one
+
+    iter_lines() yields parsed transactions without keeping them, parse()
+    collects them into statement.lines as StatementLine objects as usual. Statement level data
+    (account, currency, balances) is available in self.statement once
+    iter_lines() is exhausted, together with the report of records left out
+    in self.diagnostics.
+    """
+
+    # parser attributes timed when profiling is enabled, see profiling module
+    profile_hooks = {}
+
+    def __init__(self):
+        super().__init__()
+        self.diagnostics = Diagnostics()
+
+    def parse_datetime(self, value):
+        return parse_datetime(value, self.date_format)
+
+    def parse_header(self):
+        """Read statement data preceding transaction records, if any
+        """
+
+    def iter_lines(self):
+        self.parse_header()
+        yield from self.iter_records()
+        self.diagnostics.report()
+
+    def iter_records(self):
+        for line in self.split_records():
+            self.cur_record += 1
+            if not line:
+                continue
+            stmt_line = self.parse_record(line)
+            if stmt_line:
+                stmt_line.assert_valid()
+                yield stmt_line
+
+    def parse(self):
+        self.statement.lines.extend(to_lines(self.iter_lines()))
+        return self.statement
+
+    def parse_columns(self):
+        """Parse transactions into a table of columns, see columnar module
+
+        Statement level data is set in self.statement as with parse().
+        """
+        return lines_to_columns(self.iter_lines())
+
+    def close(self):
+        """Close input stream"""
+        self.fin.close()
+
+
+class StreamingOfxWriter(OfxWriter):
+    """OfxWriter that writes transactions out as soon as they are parsed
+
+    Transactions are serialized into a temporary spool file while parsing goes
+    on, statement header is rendered when the stream is over, so values known
+    only at the end of the file (balances, account id) get into it. Output is
+    the same as OfxWriter(parser.parse()).toxml() would produce.
+    """
+
+    def __init__(self, statement):
+        super().__init__(statement)
+        self.count = 0
+        self.total = 0
+        self.spool = None
+
+    def write(self, lines, out):
+        try:
+            for line in lines:
+                self.add(line)
+            self.finish(out)
+        finally:
+            self.discard()
+
+    def add(self, line):
+        """Serialize transaction into the spool file"""
+        if self.spool is None:
+            self.spool = tempfile.TemporaryFile('w+', encoding='utf-8')
+        self.spool.write(self.transaction_xml(line))
+        self.count += 1
+        if line.amount is not None:
+            self.total += line.amount
+
+    def finish(self, out):
+        """Write OFX document with transactions added so far to out"""
+        head, tail = self.header_xml().split(BANKTRANLIST_END, 1)
+        out.write(head)
+        if self.spool is not None:
+            self.spool.seek(0)
+            shutil.copyfileobj(self.spool, out)
+            self.discard()
+        out.write(BANKTRANLIST_END)
+        out.write(tail)
+
+    def discard(self):
+        """Remove the spool file"""
+        if self.spool is not None:
+            self.spool.close()
+            self.spool = None
+
+    def transaction_xml(self, line):
+        self.tb = etree.TreeBuilder()
+        self.buildTransaction(line)
+        return etree.tostring(self.tb.close(), 'unicode')
+
+    def header_xml(self):
+        lines, self.statement.lines = self.statement.lines, []
+        self.tb = etree.TreeBuilder()
+        try:
+            return self.toxml()
+        finally:
+            self.statement.lines = lines
+
+    def assert_valid(self):
+        """Same balance check as Statement.assert_valid() for streamed lines"""
+        stmt = self.statement
+        if not (stmt.start_balance is None or stmt.end_balance is None):
+            if not isclose(stmt.start_balance + self.total, stmt.end_balance):
+                raise exceptions.ValidationError(
+                    "Start balance ({0}) plus the total amount ({1}) "
+                    "should be equal to the end balance ({2})".format(
+                        stmt.start_balance, self.total, stmt.end_balance), stmt)
+
+
+def parse_file(plugin, path):
+    """Parse statement file with plugin, return statement
+
+    File is closed afterwards. Safe to call with one plugin object from
+    several threads at once.
+    """
+    parser = plugin.get_parser(path)
+    try:
+        return parser.parse()
+    finally:
+        parser.close()
+
+
+def write_ofx(parser, out):
+    """Parse statement in streaming mode writing OFX to out
+
+    Returns the writer, which holds number of transactions and their total.
+    Raises exceptions.ValidationError if statement balances do not match.
+    Transactions are not recorded in transaction index, callers do it with
+    fingerprints.commit(parser) once the output is stored.
+    """
+    writer = StreamingOfxWriter(parser.statement)
+    writer.write(parser.iter_lines(), out)
+    writer.assert_valid()
+    return writer
@@ -2,7 +2,9 @@ import datetime
 from decimal import Decimal
 from unittest import mock
 
-from ofxstatement.plugins.alfabank import AlfabankPlugin
+import pytest
+
+from ofxstatement.plugins.alfabank import AlfabankPlugin, CardOperation, parse_description
 from .util import file_sample
 
 
@@ -28,6 +30,33 @@ def test_user_date():
     statement = plugin.get_parser(file_sample("alfabank.csv")).parse()
 
     assert statement.lines[2].date == datetime.datetime(2017, 5, 1, 0, 0)
+    assert all(line.date_user is None and line.payee is None for line in statement.lines)
+
+
+def test_card_details():
+    plugin = AlfabankPlugin(mock.Mock(), {'card_details': 'true'})
+    statement = plugin.get_parser(file_sample("alfabank.csv")).parse()
+    with open(file_sample("alfabank.csv"), encoding=plugin.get_encoding()) as f:
+        columns = plugin.create_parser(f).parse_columns()
+
+    assert plugin.config.card_details
+    assert statement.lines[2].date_user == datetime.datetime(2017, 5, 1, 0, 0)
+    assert statement.lines[2].payee == 'SOME BANK'
+    assert statement.lines[0].date_user is None
+    assert statement.lines[0].payee is None
+    assert columns['date_user'] == [line.date_user for line in statement.lines]
+    assert columns['payee'] == [line.payee for line in statement.lines]
+
+
+@pytest.mark.parametrize('description, expected', [
+    ('123456++++++6789    11111111\\123\\Visa Direct\\SOME BANK             03.05.17 01.05.17    1500.00  RUR',
+     CardOperation(datetime.datetime(2017, 5, 1), 'SOME BANK')),
+    ('Перевод 30.04.17 29.04.17', CardOperation(datetime.datetime(2017, 4, 29), None)),
+    ('1.05.17 30.04.17 29.04.17 28.04.17', CardOperation(datetime.datetime(2017, 4, 29), None)),
+    ('{VO11111} Перечисление ден. средств (зарплата за май 2017 г.)', None),
+])
+def test_parse_description(description, expected):
+    assert parse_description(description) == expected
 
 
 def _check_line(line, amount, date, memo, refnum, trntype):
@@ -0,0 +1,22 @@
+from decimal import Decimal
+
+import pytest
+
+from ofxstatement.plugins.amounts import parse_amount
+
+
+@pytest.mark.parametrize('value, amount', [
+    ('-37858,06', '-37858.06'),
+    ('1 234 567,89', '1234567.89'),
+    ('1\xa0000.5', '1000.5'),
+    ('100', '100'),
+    ('-4320,4', '-4320.4'),
+])
+def test_parse_amount(value, amount):
+    # written digits are kept, generated ids depend on them
+    assert str(parse_amount(value)) == amount
+
+
+def test_sums_are_exact():
+    assert sum(parse_amount(a) for a in ['0,10', '0,20', '-0,30']) == 0
+    assert parse_amount('0.10') + parse_amount('0.20') == Decimal('0.3')
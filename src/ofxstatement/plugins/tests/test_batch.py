@@ -0,0 +1,89 @@
+import configparser
+import os
+import shutil
+
+from ofxstatement.plugins import batch
+from .util import file_sample
+
+PATTERNS = [('sberbank_*.txt', 'sberbank_txt'), ('alfa*.csv', 'alfabank'), ('vtb*.csv', 'vtb')]
+
+
+def _copy_samples(tmpdir, *names):
+    source = tmpdir.mkdir('source')
+    for name in names:
+        shutil.copy(file_sample(name), str(source))
+    return source
+
+
+def test_convert_batch(tmpdir):
+    source = _copy_samples(tmpdir, 'alfabank.csv', 'sberbank_visa.txt', 'vtb.csv', 'sberbank.csv')
+    output = tmpdir.mkdir('output')
+
+    files = batch.collect_files([str(source)])
+    results = batch.convert_batch(files, PATTERNS, str(output), workers=2)
+
+    assert [r.path for r in results] == files
+    alfabank, sberbank_csv, sberbank_txt, vtb = results
+    assert (alfabank.error, alfabank.rows) == (None, 3)
+    assert (sberbank_txt.error, sberbank_txt.rows) == (None, 34)
+    assert output.join('sberbank_visa.ofx').check()
+    assert sberbank_csv.error == 'no plugin pattern matches file'
+    # balances in vtb sample do not add up with its transactions
+    assert vtb.error.startswith('ValidationError')
+    assert not output.join('vtb.ofx').check()
+    assert not output.join('vtb.ofx.part').check()
+
+
+def test_unreadable_file(tmpdir):
+    source = _copy_samples(tmpdir, 'alfabank.csv')
+    missing = str(source.join('missing.csv'))
+    output = tmpdir.mkdir('output')
+
+    results = batch.convert_batch([missing, str(source.join('alfabank.csv'))], [('*', 'auto')], str(output),
+                                  workers=1)
+
+    assert results[0].error.startswith('FileNotFoundError: ')
+    assert (results[1].error, results[1].rows) == (None, 3)
+
+
+def test_same_names(tmpdir):
+    source = _copy_samples(tmpdir, 'alfabank.csv')
+    other = source.mkdir('other')
+    shutil.copy(file_sample('alfabank.csv'), str(other))
+    shutil.copy(file_sample('alfabank.csv'), str(source.join('alfabank.txt')))
+    output = tmpdir.mkdir('output')
+    files = [str(source.join('alfabank.csv')), str(source.join('alfabank.txt')), str(other.join('alfabank.csv'))]
+
+    results = batch.convert_batch(files, [('alfabank.*', 'alfabank')], str(output), workers=2)
+
+    assert [r.output for r in results] == [str(output.join(name))
+                                           for name in ('alfabank.ofx', 'alfabank-2.ofx', 'alfabank-3.ofx')]
+    assert all(r.error is None and os.path.exists(r.output) for r in results)
+
+
+def test_output_paths():
+    files = ['a/stmt.csv', 'b/stmt.csv', 'stmt-2.txt', 'other.csv']
+
+    assert batch.output_paths(files, 'out') == ['out/stmt.ofx', 'out/stmt-2.ofx', 'out/stmt-2-2.ofx', 'out/other.ofx']
+
+
+def test_collect_files_glob(tmpdir):
+    source = _copy_samples(tmpdir, 'alfabank.csv', 'sberbank_visa.txt')
+
+    assert batch.collect_files([str(source.join('*.txt'))]) == [str(source.join('sberbank_visa.txt'))]
+
+
+def test_resolve_plugin():
+    config = configparser.ConfigParser()
+    config.read_dict({'salary': {'plugin': 'alfabank', 'user_date': 'false'}})
+
+    assert batch.resolve_plugin('salary', config) == ('alfabank', {'plugin': 'alfabank', 'user_date': 'false'})
+    assert batch.resolve_plugin('vtb', config) == ('vtb', {})
+    assert batch.resolve_plugin('vtb') == ('vtb', {})
+
+
+def test_run(tmpdir, capsys):
+    source = _copy_samples(tmpdir, 'alfabank.csv')
+
+    assert batch.run(['-m', '*.csv=alfabank', '-o', str(tmpdir.join('out')), str(source)]) == 0
+    assert '1 files converted, 0 failed, 3 rows' in capsys.readouterr().out
@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from ofxstatement.plugins import alfabank, avangard, tinkoff
+from ofxstatement.plugins.classifier import PrefixClassifier
+
+TYPE_MAPS = [alfabank.type_map, avangard.av_type_map, tinkoff.t_type_map]
+
+
+def _first_match(type_map, text):
+    # reference implementation: linear startswith scan used by plugins before
+    for prefix in type_map.keys():
+        if text.startswith(prefix):
+            return prefix
+    return None
+
+
+def _samples(type_map):
+    rnd = random.Random(1)
+    alphabet = ''.join(sorted(set(''.join(type_map)))) + ' xyz'
+    for prefix in type_map:
+        yield prefix
+        yield prefix + ' operation description'
+        yield prefix[:-1]
+        yield prefix[:rnd.randrange(len(prefix))]
+    for _ in range(1000):
+        yield ''.join(rnd.choice(alphabet) for _ in range(rnd.randrange(40)))
+    yield ''
+
+
+@pytest.mark.parametrize('type_map', TYPE_MAPS)
+def test_same_as_first_match(type_map):
+    classifier = PrefixClassifier(type_map)
+    for text in _samples(type_map):
+        assert classifier.match(text) == _first_match(type_map, text), text
+
+
+def test_longest_prefix_wins():
+    classifier = PrefixClassifier(['Пополнение', 'Пополнение. Бонус', 'По'])
+
+    assert classifier.match('Пополнение. Бонус за май') == 'Пополнение. Бонус'
+    assert classifier.match('Пополнение. Бо') == 'Пополнение'
+    assert classifier.match('Покупка') == 'По'
+    assert classifier.match('Оплата') is None
+
+
+def test_parse_type():
+    assert avangard.AvangardStatementParser.parse_type('Погашение овердрафта', 100) is None
+    assert avangard.AvangardStatementParser.parse_type('Покупка в магазине', -100) == 'PAYMENT'
+    assert avangard.AvangardStatementParser.parse_type('Что-то новое', -100) == 'CREDIT'
+    assert tinkoff.TinkoffStatementParser.parse_type('Пополнение. Тинькофф Банк. Бонус', 100) == 'DIV'
+    assert tinkoff.TinkoffStatementParser.parse_type('Пополнение с карты', 100) == 'XFER'
+    assert alfabank.AlfabankStatementParser.parse_type('Комиссия за переводы', -50) == 'SRVCHG'
+
+
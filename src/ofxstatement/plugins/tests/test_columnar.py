@@ -0,0 +1,95 @@
+import pytest
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins import columnar
+from ofxstatement.plugins.alfabank import AlfabankPlugin
+from ofxstatement.plugins.avangard import AvangardPlugin
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.sberbank_txt import SberBankTxtPlugin
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+TINKOFF = '''"Дата операции";"Дата платежа";"Номер карты";"Статус";"Сумма операции";"Валюта операции";"Сумма платежа";"Валюта платежа";"Кэшбэк";"Категория";"MCC";"Описание";"Бонусы (включая кэшбэк)"
+"01.01.2019 00:02:05";"01.01.2019";"*4789";"OK";"-378,06";"RUB";"-378,06";"RUB";"";"Аптеки";"5912";"Оплата в APTEKA";"0,00"
+"01.01.2019 10:15:00";"01.01.2019";"*4789";"FAILED";"-100,00";"RUB";"-100,00";"RUB";"";"Супермаркеты";"5411";"Оплата в AZBUKA";"0,00"
+"02.01.2019 12:00:00";"02.01.2019";"";"OK";"5000,00";"RUB";"5000,00";"RUB";"";"Пополнения";"";"Пополнение. Тинькофф Банк";"0,00"
+"02.01.2019 13:00:00";"02.01.2019";"*4789";"OK";"-10,00";"USD";"-10,00";"USD";"";"Сервис";"4111";"Оплата в AMAZON";"0,00"
+"03.01.2019 09:30:00";"03.01.2019";"*4789";"OK";"-99,00";"RUB";"-99,00";"RUB";"";"Другое";"";"Плата за обслуживание";"0,00"
+"03.01.2019 09:30:00";"03.01.2019";"*4789";"OK";"0,00";"RUB";"0,00";"RUB";"";"Другое";"";"Неизвестная операция";"0,00"
+'''
+
+AVANGARD = '''01.01.2019 00:05;41366.37;;Зачисление;;;41366.37;RUB;;
+01.01.2019 10:00;;250.00;Покупка;31.12.2018 18:40;*1234;250.00;RUB;5411;PYATEROCHKA
+02.01.2019 11:00;;1000;Погашение овердрафта;;;1000;RUB;;
+02.01.2019 12:00;15.5;;Непонятная операция;;;15.5;RUB;;Описание
+'''
+
+
+def _write(tmpdir, name, text):
+    path = tmpdir.join(name)
+    path.write_binary(text.encode('cp1251'))
+    return str(path)
+
+
+def _check(plugin, path):
+    expected = plugin.get_parser(path).parse()
+    statement, table = columnar.parse_columns(plugin, path)
+
+    assert table == columnar.lines_to_columns(expected.lines)
+    expected.lines = []
+    assert vars(statement) == vars(expected)
+    return table
+
+
+@pytest.mark.parametrize('plugin, sample', [
+    (AlfabankPlugin(UI(), {}), 'alfabank.csv'),
+    (AlfabankPlugin(UI(), {'user_date': 'false'}), 'alfabank.csv'),
+    (SberBankCSVPlugin(UI(), {}), 'sberbank.csv'),
+    (VtbPlugin(UI(), {}), 'vtb.csv'),
+    (VtbPlugin(UI(), {'user_date': 'true'}), 'vtb_user_date.csv'),
+    (SberBankTxtPlugin(UI(), {}), 'sberbank_visa.txt'),
+])
+def test_same_as_parse(plugin, sample):
+    assert _check(plugin, file_sample(sample))['id']
+
+
+def test_tinkoff(tmpdir):
+    table = _check(TinkoffPlugin(UI(), {'account': 'test'}), _write(tmpdir, 'tinkoff.csv', TINKOFF))
+
+    assert table['trntype'] == ['CREDIT', 'XFER', 'SRVCHG']
+
+
+def test_avangard(tmpdir):
+    table = _check(AvangardPlugin(UI(), {'account': 'test'}), _write(tmpdir, 'avangard.csv', AVANGARD))
+
+    assert table['trntype'] == ['CREDIT', 'PAYMENT', 'DEBIT']
+
+
+def test_to_numpy():
+    numpy = pytest.importorskip('numpy')
+    _, table = columnar.parse_columns(VtbPlugin(UI(), {}), file_sample('vtb.csv'))
+
+    array = columnar.to_numpy(table)
+
+    assert list(array['amount']) == table['amount']
+    assert numpy.isnat(array['date'][3])
+
+
+def test_to_arrow():
+    pytest.importorskip('pyarrow')
+    _, table = columnar.parse_columns(SberBankCSVPlugin(UI(), {}), file_sample('sberbank.csv'))
+
+    assert columnar.to_arrow(table).column('amount').to_pylist() == table['amount']
+
+
+def test_map_types():
+    calls = []
+
+    def parse_type(type, amount):
+        calls.append(type)
+        return type if type != 'x' else 'DEBIT' if amount > 0 else 'CREDIT' if amount < 0 else None
+
+    assert columnar.map_types(parse_type, ['x', 'FEE', 'x', 'x'], [1, -5, -2, 0]) == ['DEBIT', 'FEE', 'CREDIT', None]
+    assert len(calls) == 6
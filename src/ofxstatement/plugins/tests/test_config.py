@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.alfabank import AlfabankPlugin
+from ofxstatement.plugins.config import ParserConfig, parser_config
+from ofxstatement.plugins.ids import COMPAT, FAST
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.sberbank_txt import SberBankTxtPlugin
+from ofxstatement.plugins.streaming import parse_file
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+PARSES = 20
+
+
+def test_parser_config(monkeypatch):
+    monkeypatch.delenv('OFXSTATEMENT_PROFILE', raising=False)
+    assert parser_config({}, 'Bank') == ParserConfig(None, None, 'Bank', False, False, COMPAT, None, False)
+    assert parser_config({'user_date': 'true', 'id_scheme': FAST, 'account': '1'}, 'Bank', 'RUB') == \
+        ParserConfig('RUB', '1', 'Bank', False, False, FAST, None, False)
+    assert parser_config({'bank': 'Other'}, 'Bank', user_date='true') == \
+        ParserConfig(None, None, 'Other', True, False, COMPAT, None, False)
+    assert parser_config({'card_details': 'true'}, 'Bank', card_details='false') == \
+        ParserConfig(None, None, 'Bank', False, True, COMPAT, None, False)
+    assert parser_config({'card_details': 'true'}, 'Bank') == \
+        ParserConfig(None, None, 'Bank', False, False, COMPAT, None, False)
+    with pytest.raises(KeyError):
+        TinkoffPlugin(UI(), {})
+
+
+def _lines(statement):
+    return [vars(line) for line in statement.lines]
+
+
+@pytest.mark.parametrize('plugin, sample', [
+    (AlfabankPlugin(UI(), {}), 'alfabank.csv'),
+    (SberBankCSVPlugin(UI(), {}), 'sberbank.csv'),
+    (VtbPlugin(UI(), {'user_date': 'true'}), 'vtb_user_date.csv'),
+    (SberBankTxtPlugin(UI(), {}), 'sberbank_maestro.txt'),
+    (SberBankTxtPlugin(UI(), {}), 'sberbank_visa.txt'),
+])
+def test_concurrent_parses(plugin, sample):
+    path = file_sample(sample)
+    expected = parse_file(plugin, path)
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda _: parse_file(plugin, path), range(PARSES)))
+
+    for statement in results:
+        assert statement is not expected
+        assert _lines(statement) == _lines(expected)
+        assert statement.account_id == expected.account_id
+        assert statement.end_balance == expected.end_balance
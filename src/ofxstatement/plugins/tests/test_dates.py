@@ -0,0 +1,35 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from ofxstatement.plugins.dates import date_parser, parse_datetime
+
+FORMATS = ['%d.%m.%Y %H:%M:%S', '%d.%m.%Y %H:%M', '%d.%m.%Y', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d.%m.%y']
+
+
+@pytest.mark.parametrize('format', FORMATS)
+def test_same_as_strptime(format):
+    rnd = random.Random(1)
+    parser = date_parser(format)
+    start = datetime(1970, 1, 1)
+    for _ in range(2000):
+        value = (start + timedelta(seconds=rnd.randrange(100 * 365 * 86400))).strftime(format)
+        assert parser(value) == datetime.strptime(value, format), value
+
+
+def test_unexpected_layout_falls_back_to_strptime():
+    assert parse_datetime('1.2.2019', '%d.%m.%Y') == datetime(2019, 2, 1)
+    assert parse_datetime('01.05.17', '%d.%m.%y') == datetime(2017, 5, 1)
+    assert parse_datetime('01.05.70', '%d.%m.%y') == datetime(1970, 5, 1)
+    assert parse_datetime('Jan 05 2019', '%b %d %Y') == datetime(2019, 1, 5)
+
+
+@pytest.mark.parametrize('value', ['31.02.2019', '01/02/2019', '01.02.2019 10:00', ''])
+def test_invalid_dates(value):
+    with pytest.raises(ValueError):
+        parse_datetime(value, '%d.%m.%Y')
+
+
+def test_parsers_are_shared():
+    assert date_parser('%d.%m.%Y') is date_parser('%d.%m.%Y')
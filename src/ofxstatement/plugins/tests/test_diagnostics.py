@@ -0,0 +1,83 @@
+import logging
+
+import pytest
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.diagnostics import SAMPLE_LINES, Diagnostics
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+
+RECORDS = 40
+
+
+def _tinkoff_sample(tmpdir):
+    # every 4th operation declined, every 10th in dollars
+    lines = ['"Дата операции";"Дата платежа";"Номер карты";"Статус";"Сумма операции";"Валюта операции";'
+             '"Сумма платежа";"Валюта платежа";"Кэшбэк";"Категория";"MCC";"Описание";"Бонусы"']
+    for i in range(1, RECORDS + 1):
+        status = 'FAILED' if i % 4 == 0 else 'OK'
+        currency = 'USD' if i % 10 == 5 else 'RUB'
+        lines.append('01.02.2020 10:%02d:00;01.02.2020;*1234;%s;-%d,00;%s;-%d,00;%s;;Кафе;5812;Оплата в кафе;0,00'
+                     % (i, status, i, currency, i, currency))
+    path = tmpdir.join('tinkoff.csv')
+    path.write_text('\n'.join(lines) + '\n', encoding='cp1251')
+    return str(path)
+
+
+def test_skip_and_summary():
+    diagnostics = Diagnostics()
+    for line in range(2, 2 + SAMPLE_LINES + 2):
+        diagnostics.skip(line, 'status is %s', 'FAILED')
+    diagnostics.skip(20, 'currency %s differs from account currency %s', 'USD', 'RUB')
+
+    assert diagnostics.skipped == SAMPLE_LINES + 3
+    assert diagnostics.summary() == [
+        'Skipped 7 records: status is FAILED (lines 2, 3, 4, 5, 6, ...)',
+        'Skipped 1 record: currency USD differs from account currency RUB (line 20)',
+    ]
+
+    other = Diagnostics()
+    other.skip(30, 'currency %s differs from account currency %s', 'USD', 'RUB')
+    diagnostics.merge(other)
+    assert diagnostics.summary()[1] == 'Skipped 2 records: currency USD differs from account currency RUB ' \
+                                       '(lines 20, 30)'
+
+
+@pytest.mark.parametrize('columns', [False, True])
+def test_aggregated_report(columns, tmpdir, caplog, capsys):
+    parser = TinkoffPlugin(UI(), {'account': '1'}).get_parser(_tinkoff_sample(tmpdir))
+    with caplog.at_level(logging.WARNING):
+        parsed = len(parser.parse_columns()['id']) if columns else len(parser.parse().lines)
+    parser.close()
+
+    assert parsed == RECORDS - 10 - 4
+    assert parser.diagnostics.skipped == 14
+    assert [r.getMessage() for r in caplog.records] == [
+        'Skipped 10 records: status is FAILED (lines 5, 9, 13, 17, 21, ...)',
+        'Skipped 4 records: currency USD differs from account currency RUB (lines 6, 16, 26, 36)',
+    ]
+    assert capsys.readouterr().out == ''
+
+
+def test_verbose(tmpdir, caplog):
+    parser = TinkoffPlugin(UI(), {'account': '1', 'verbose': 'true'}).get_parser(_tinkoff_sample(tmpdir))
+    with caplog.at_level(logging.WARNING):
+        parser.parse()
+    parser.close()
+
+    messages = [r.getMessage() for r in caplog.records]
+    assert len(messages) == 14 + 2
+    assert messages[0] == 'Skipping line 5 (01.02.2020 10:04:00): status is FAILED'
+
+
+def test_parallel_workers_merged(tmpdir, caplog):
+    parser = TinkoffPlugin(UI(), {'account': '1', 'parallel': '2'}).get_parser(_tinkoff_sample(tmpdir))
+    parser.min_chunk_size = 100
+    with caplog.at_level(logging.WARNING):
+        parser.parse()
+    parser.close()
+
+    assert [r.getMessage() for r in caplog.records] == [
+        'Skipped 10 records: status is FAILED (lines 5, 9, 13, 17, 21, ...)',
+        'Skipped 4 records: currency USD differs from account currency RUB (lines 6, 16, 26, 36)',
+    ]
@@ -0,0 +1,125 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from ofxstatement.plugins import batch
+from ofxstatement.plugins.fingerprints import FingerprintIndex, IncrementalParser
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+
+def test_reimport_skips_exported(tmpdir):
+    settings = {'index': str(tmpdir.join('index.sqlite'))}
+    parser = SberBankCSVPlugin(mock.Mock(), settings).get_parser(file_sample('sberbank.csv'))
+    first = parser.parse()
+    assert len(first.lines) == 11
+    assert parser.skipped == 0
+
+    parser = SberBankCSVPlugin(mock.Mock(), settings).get_parser(file_sample('sberbank.csv'))
+    assert parser.parse().lines == []
+    assert parser.skipped == 11
+
+    index = FingerprintIndex(settings['index'])
+    assert index.exported(first.account_id) == {l.id for l in first.lines}
+    assert index.last(first.account_id) == max(l.date for l in first.lines)
+
+
+def test_new_records_are_kept(tmpdir):
+    index = FingerprintIndex(str(tmpdir.join('index.sqlite')))
+    plugin = VtbPlugin(mock.Mock(), {'currency': 'RUR'})
+    lines = plugin.get_parser(file_sample('vtb.csv')).parse().lines
+    index.add('462235******0069', [(l.id, l.date) for l in lines[1:]])
+    index.close()
+
+    parser = IncrementalParser(plugin.get_parser(file_sample('vtb.csv')), str(tmpdir.join('index.sqlite')))
+    statement = parser.parse()
+
+    assert [l.id for l in statement.lines] == [lines[0].id]
+    assert parser.skipped == 3
+    # start balance follows the skipped transactions
+    assert statement.start_balance == Decimal('99955.01') + sum(l.amount for l in lines[1:])
+
+
+def test_failed_parse_records_nothing(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    parser = SberBankCSVPlugin(mock.Mock(), {'index': path}).get_parser(file_sample('sberbank.csv'))
+    lines = parser.iter_lines()
+    next(lines)
+    lines.close()
+
+    assert FingerprintIndex(path).exported(parser.statement.account_id) == set()
+
+
+def test_failed_validation_records_nothing(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    settings = {'index': path, 'currency': 'RUR'}
+
+    # balances in vtb sample do not add up with its transactions
+    result = batch.convert_file(file_sample('vtb.csv'), 'vtb', settings, str(tmpdir.join('vtb.ofx')))
+    statement = VtbPlugin(mock.Mock(), settings).get_parser(file_sample('vtb.csv')).parse()
+
+    assert result.error.startswith('ValidationError')
+    assert len(statement.lines) == 4
+    assert FingerprintIndex(path).exported(statement.account_id) == set()
+
+
+def test_commit_after_output(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    output = str(tmpdir.join('sberbank.ofx'))
+
+    result = batch.convert_file(file_sample('sberbank.csv'), 'sberbank_csv', {'index': path}, output)
+    statement = SberBankCSVPlugin(mock.Mock(), {}).get_parser(file_sample('sberbank.csv')).parse()
+
+    assert (result.error, result.rows) == (None, 11)
+    assert FingerprintIndex(path).exported(statement.account_id) == {l.id for l in statement.lines}
+
+
+def test_prune(tmpdir):
+    index = FingerprintIndex(str(tmpdir.join('index.sqlite')))
+    index.add('a', [('1', datetime.datetime(2019, 1, 1)), ('2', datetime.datetime(2019, 2, 1))])
+    index.add('b', [('3', datetime.datetime(2019, 1, 1))])
+
+    assert index.prune(datetime.datetime(2019, 1, 15), 'a') == 1
+    assert index.exported('a') == {'2'}
+    assert index.exported('b') == {'3'}
+    assert index.prune(datetime.datetime(2019, 1, 15)) == 1
+    assert index.exported('b') == set()
+
+
+def test_undated_are_pruned(tmpdir):
+    index = FingerprintIndex(str(tmpdir.join('index.sqlite')))
+    index.add('a', [('1', datetime.datetime(2019, 1, 1)), ('2', None)])
+    index.add('a', [('3', datetime.datetime(2019, 3, 1))])
+
+    assert index.prune(datetime.datetime(2019, 2, 1), 'a') == 2
+    assert index.exported('a') == {'3'}
+
+
+def test_index_of_earlier_version(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    index = FingerprintIndex(path)
+    index.db.executescript("""
+        DROP TABLE accounts;
+        CREATE TABLE accounts (account_id TEXT PRIMARY KEY, last_date TEXT, last_offset INTEGER);
+        INSERT INTO exported VALUES ('a', '1', NULL);
+        INSERT INTO accounts VALUES ('a', NULL, 10);
+    """)
+
+    index.add('a', [('2', datetime.datetime(2019, 1, 1))])
+
+    assert index.last('a') == datetime.datetime(2019, 1, 1)
+    assert index.prune(datetime.datetime(2018, 1, 1)) == 1
+    assert index.exported('a') == {'2'}
+
+
+def test_processing_dated_by_user_date(tmpdir):
+    path = str(tmpdir.join('index.sqlite'))
+    plugin = VtbPlugin(mock.Mock(), {'currency': 'RUR'})
+    parser = IncrementalParser(plugin.get_parser(file_sample('vtb.csv')), path)
+    lines = list(parser.iter_lines())
+    parser.commit()
+
+    assert lines[3].date is None
+    rows = FingerprintIndex(path).db.execute('SELECT id, date FROM exported').fetchall()
+    assert dict(rows)[lines[3].id] == lines[3].date_user.strftime('%Y-%m-%d %H:%M:%S')
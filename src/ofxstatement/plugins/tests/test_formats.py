@@ -0,0 +1,154 @@
+import io
+from collections import namedtuple
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from ofxstatement.plugins import avangard, tinkoff
+from ofxstatement.plugins.columnar import lines_to_columns
+from ofxstatement.plugins.formats import (Amount, Format, FormatStatementParser, Join, TypeRule, memo_formatter,
+                                          sign_type, type_parser)
+
+BankRecord = namedtuple('BankRecord', ['date', 'debit', 'credit', 'type', 'merchant', 'city'])
+
+
+class BankStatementParser(FormatStatementParser):
+    format = Format(
+        record=BankRecord, delimiter=';', skip_lines=1, date_format='%d.%m.%Y', date=('date',),
+        amount=Amount('debit', minus='credit'), trntype=TypeRule('type', {'Комиссия': 'FEE', 'Перевод': None}),
+        memo='{merchant|type}[ ({city})]', id='date')
+
+
+def _parse(text):
+    parser = BankStatementParser(io.StringIO(text))
+    return parser.parse().lines
+
+
+def test_new_bank():
+    lines = _parse('Дата;Приход;Расход;Тип;Получатель;Город\n'
+                   '01.02.2020;;100.50;Покупка;CAFE;MOSCOW\n'
+                   '02.02.2020;;10;Комиссия за обслуживание;;\n'
+                   '03.02.2020;500;;Перевод;;\n'
+                   '03.02.2020;500;;Зачисление;;\n')
+
+    assert [(l.date, l.amount, l.trntype, l.memo) for l in lines] == [
+        (datetime(2020, 2, 1), Decimal('-100.50'), 'CREDIT', 'CAFE (MOSCOW)'),
+        (datetime(2020, 2, 2), Decimal('-10'), 'FEE', 'Комиссия за обслуживание'),
+        (datetime(2020, 2, 3), Decimal('500'), 'DEBIT', 'Зачисление'),
+    ]
+    assert all(l.id for l in lines)
+
+
+def test_generated_source():
+    source = BankStatementParser(io.StringIO('')).build_transaction.source
+
+    assert 'self.parse_date(record.date)' in source
+    assert 'self.format_memo(record)' in source
+    # parts the format does not use
+    assert 'date_user' not in source
+    assert 'refnum' not in source
+
+
+@pytest.mark.parametrize('template, values, expected', [
+    ('{category}: {description}[, {MCC}][, {card}]', ('Кафе', 'Оплата', '5812', ''), 'Кафе: Оплата, 5812'),
+    ('{category}: {description}[, {MCC}][, {card}]', ('Кафе', 'Оплата', '', '*1234'), 'Кафе: Оплата, *1234'),
+    ('{description|type}[, {MCC}][, {card}]', ('', 'Покупка', '', ''), 'Покупка'),
+    ('{description|type}[, {MCC}][, {card}]', ('', '', '5411', ''), ', 5411'),
+    ('[{a} ]{b}', ('', 'x'), 'x'),
+    (Join(', ', ('a', 'b', 'c')), ('', 'y', 'z'), 'y, z'),
+])
+def test_memo_formatter(template, values, expected):
+    assert memo_formatter(template)(*values) == expected
+
+
+@pytest.mark.parametrize('parser_class, text, memos', [
+    (tinkoff.TinkoffStatementParser,
+     'header\n'
+     '01.02.2020 10:00:00;01.02.2020;*1234;OK;-100,00;RUB;-100,00;RUB;;Кафе;5812;Оплата;\n'
+     '02.02.2020 10:00:00;02.02.2020;;OK;-10,00;RUB;-10,00;RUB;;Связь;;Телефон;\n',
+     ['Кафе: Оплата, 5812, *1234', 'Связь: Телефон']),
+    (avangard.AvangardStatementParser,
+     '01.02.2020 10:00;;100;Покупка;;*1234;;;5812;CAFE\n'
+     '02.02.2020 10:00;;10;Комиссия за операцию;;;;;;\n',
+     ['CAFE, 5812, *1234', 'Комиссия за операцию']),
+])
+def test_plugin_memos(parser_class, text, memos):
+    assert [line.memo for line in parser_class(io.StringIO(text)).parse().lines] == memos
+    assert parser_class(io.StringIO(text)).parse_columns()['memo'] == memos
+
+
+def test_type_rule_of_format():
+    class PosParser(tinkoff.TinkoffStatementParser):
+        format = tinkoff.t_format._replace(trntype=TypeRule('description', {'Оплата': 'POS'}))
+
+    text = ('header\n'
+            '01.02.2020 10:00:00;01.02.2020;*1234;OK;-100,00;RUB;-100,00;RUB;;Кафе;5812;Оплата;\n')
+
+    assert [line.trntype for line in PosParser(io.StringIO(text)).parse().lines] == ['POS']
+    assert PosParser(io.StringIO(text)).parse_columns()['trntype'] == ['POS']
+
+
+def test_memo_of_short_row():
+    text = 'header\n01.02.2020 10:00:00;01.02.2020;*1234;OK;-100,00;RUB;-100,00;RUB;;Кафе\n'
+    parser = tinkoff.TinkoffStatementParser(io.StringIO(text))
+
+    assert parser.format_memo(next(iter(parser.split_records()))) == 'Кафе: None, *1234'
+
+
+def test_columns_same_as_lines():
+    text = ('Дата;Приход;Расход;Тип;Получатель;Город\n'
+            '01.02.2020;;100.50;Покупка;CAFE;MOSCOW\n'
+            '02.02.2020;;10;Комиссия за обслуживание;;\n'
+            '03.02.2020;500;;Перевод;;\n'
+            '03.02.2020;500;;Зачисление;;\n')
+    table = BankStatementParser(io.StringIO(text)).parse_columns()
+
+    assert table == lines_to_columns(_parse(text))
+
+
+def test_generated_on_first_use():
+    class LazyParser(FormatStatementParser):
+        format = BankStatementParser.format
+
+        @staticmethod
+        def parse_type(type, amount):
+            return 'OTHER'
+
+    class SubParser(LazyParser):
+        pass
+
+    class ClassParser(FormatStatementParser):
+        format = BankStatementParser.format
+
+    assert 'build_transaction' not in vars(LazyParser)
+    lines = SubParser(io.StringIO('title\n01.02.2020;;1;Покупка;CAFE;\n')).parse().lines
+    assert [(l.trntype, l.memo) for l in lines] == [('OTHER', 'CAFE')]
+    assert 'build_transaction' in vars(SubParser)
+    # generated attributes are there before any parser is created too
+    assert ClassParser.parse_type('Комиссия', -1) == 'FEE'
+    assert ClassParser.memo_text('CAFE', '', 'MOSCOW') == 'CAFE (MOSCOW)'
+    assert not hasattr(ClassParser, 'unknown')
+
+
+def test_no_format():
+    class BaseParser(FormatStatementParser):
+        header_lines = 1
+
+    with pytest.raises(TypeError):
+        BaseParser(io.StringIO(''))
+
+
+@pytest.mark.parametrize('template', ['[{a}', '{a}]', '[[{a}]]'])
+def test_bad_template(template):
+    with pytest.raises(ValueError):
+        memo_formatter(template)
+
+
+def test_type_rules():
+    parse_type = type_parser({'Перевод': 'XFER', 'Погашение': None}, zero='CHECK')
+    assert parse_type('Перевод с карты', -1) == 'XFER'
+    assert parse_type('Погашение долга', 1) is None
+    assert parse_type('Другое', 1) == 'DEBIT'
+    assert parse_type('Другое', 0) == 'CHECK'
+    assert [sign_type('CREDIT')(amount) for amount in (1, -1, 0)] == ['DEBIT', 'CREDIT', 'CREDIT']
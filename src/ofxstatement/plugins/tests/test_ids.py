@@ -0,0 +1,116 @@
+import inspect
+import os
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+from ofxstatement import statement
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.avangard import AvangardPlugin
+from ofxstatement.plugins.ids import COMPAT, FAST, id_generator
+from ofxstatement.plugins.interning import POOL_SIZE
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+TRANSACTIONS = [
+    (datetime(2020, 1, 2, 10, 11, 12), 'Оплата в магазине', Decimal('-1234.50')),
+    (datetime(2020, 1, 2), 'Перевод', Decimal('100')),
+    (datetime(2020, 1, 2), None, Decimal('100')),
+    (datetime(2020, 1, 2), 'Перевод', None),
+]
+
+
+@pytest.mark.parametrize('date, memo, amount', TRANSACTIONS)
+def test_compat_scheme(date, memo, amount):
+    line = statement.StatementLine(date=date, memo=memo, amount=amount)
+    generate = id_generator(COMPAT)
+
+    assert generate(date, memo, amount) == statement.generate_transaction_id(line)
+    # memoized date
+    assert generate(date, memo, amount) == statement.generate_transaction_id(line)
+
+
+@pytest.mark.parametrize('scheme', [COMPAT, FAST])
+def test_memo_size(scheme):
+    generate = id_generator(scheme)
+    start = datetime(2020, 1, 1)
+    ids = [generate(start + timedelta(seconds=i), 'Перевод', Decimal(i)) for i in range(POOL_SIZE + 100)]
+
+    dates = inspect.getclosurevars(generate).nonlocals['dates']
+    # memory stays bounded, latest dates are memoized
+    assert len(dates) <= POOL_SIZE
+    assert start + timedelta(seconds=POOL_SIZE + 99) in dates
+    assert ids[-1] == id_generator(scheme)(start + timedelta(seconds=POOL_SIZE + 99), 'Перевод',
+                                           Decimal(POOL_SIZE + 99))
+
+
+def test_fast_scheme():
+    ids = [id_generator(FAST)(*transaction) for transaction in TRANSACTIONS]
+
+    assert ids[0] == id_generator(FAST)(*TRANSACTIONS[0])
+    assert len(set(ids)) == len(ids)
+    assert all(len(id) == 32 for id in ids)
+
+
+def test_unknown_scheme():
+    with pytest.raises(ValueError):
+        id_generator('md5')
+
+
+def test_plugin_setting():
+    path = os.path.join(os.path.dirname(__file__), 'samples', 'sberbank.csv')
+    compat = SberBankCSVPlugin(UI(), {}).get_parser(path).parse().lines
+    fast = SberBankCSVPlugin(UI(), {'id_scheme': FAST}).get_parser(path).parse().lines
+
+    assert [line.id for line in compat] == [statement.generate_transaction_id(line) for line in compat]
+    assert [line.id for line in fast] == [id_generator(FAST)(line.date, line.memo, line.amount) for line in fast]
+
+
+AVANGARD = ['01.02.2020 10:00;1500.00;;Зачисление;01.02.2020 10:00;;;;;Пополнение',
+            '02.02.2020 11:00;;200.00;Покупка;;*1234;;;5812;CAFE',
+            '03.02.2020 12:00;100.00;30.10;Возврат;03.02.2020 12:00;;;;;',
+            '04.02.2020 13:00;;;Зачисление;;;;;;Бонус']
+TINKOFF = ['Дата операции;Дата платежа;Номер карты;Статус;Сумма операции;Валюта операции;Сумма платежа;'
+           'Валюта платежа;Кэшбэк;Категория;MCC;Описание;Бонусы',
+           '01.02.2020 10:00:00;01.02.2020;*1234;OK;-1500,00;RUB;-1500,00;RUB;;Кафе;5812;Оплата в кафе;0,00',
+           '02.02.2020 10:00:00;02.02.2020;;OK;200,50;RUB;200,50;RUB;;Пополнения;;Пополнение. Перевод;0,00']
+
+
+def _write(tmpdir, name, lines):
+    path = tmpdir.join(name)
+    path.write_text('\n'.join(lines) + '\n', encoding='cp1251')
+    return str(path)
+
+
+# ids given by versions before transaction index, amounts in whole roubles among them
+@pytest.mark.parametrize('plugin_cls, sample, expected', [
+    (AvangardPlugin, lambda tmpdir: _write(tmpdir, 'avangard.csv', AVANGARD), [
+        '8bb327794714fd8db673aba69ab258ea791ea4c1', '9bc45255ff23ad68606e8e491e62c61e96f613a7',
+        '8904a15a02f5491ee7d16c56b2b947d12e541cc6', '97672e1488f80a68c620661f16e01cf0b3d5dec4']),
+    (TinkoffPlugin, lambda tmpdir: _write(tmpdir, 'tinkoff.csv', TINKOFF), [
+        '8fc02e99d37f355e282c02a4814150fbc118db84', '4a325ee9762a6afbead56d092c848f9fba9a7c0d']),
+    (SberBankCSVPlugin, lambda tmpdir: file_sample('sberbank.csv'), [
+        '9db6073b284df12ce9bee2e1dbc266731238ecb3', '150cab790c5e52c51aaf33bfe74958ff530f7a7e',
+        'c8a49158213f0b37dca92d21bfc78e4f34cba384', '4d394e4b64314b1d8469a6e539a7d16852140d19',
+        'beb936bb44d7aed47a6b22725909bfedfcf86436', '8ba3f0f374992e8a7fc111794467eff8945c8d5b',
+        'ad1965e57e5ead7d0e064cfaf372d364410655c9', '76ac44275125182660f06b24231e5c6985aee132',
+        '27f1b974ee9f111196cfc14ae82abd39d34579e2', '1117d94c86f5b72af5895845479af399a1834de4',
+        '289eb478e56f3b4cc4b793f4fd1e726bc681fc79']),
+    (VtbPlugin, lambda tmpdir: file_sample('vtb.csv'), [
+        'ae42969649fa419bdc08df9341e65b9126d2dd8b', '8f3449f475656078b9016a3d235ca5639935bc83',
+        'c66efa3cc8d784bf32910e434e4991992202c211', 'e65cc9cc3423f8d97412b4f8df329a3c744f591c']),
+])
+def test_compat_ids_unchanged(plugin_cls, sample, expected, tmpdir):
+    plugin = plugin_cls(UI(), {'account': 'card'})
+    path = sample(tmpdir)
+
+    lines = plugin.get_parser(path).parse().lines
+    with open(path, encoding=plugin.get_encoding()) as f:
+        columns = plugin.create_parser(f).parse_columns()
+
+    assert [line.id for line in lines] == expected
+    assert columns['id'] == expected
+    assert all(type(line.amount) is Decimal for line in lines)
@@ -0,0 +1,91 @@
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins import columnar
+from ofxstatement.plugins.interning import Memo, StringPool
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin, VtbStatementParser
+from .util import file_sample
+
+
+def _tinkoff_sample(tmpdir):
+    lines = ['"Дата операции";"Дата платежа";"Номер карты";"Статус";"Сумма операции";"Валюта операции";'
+             '"Сумма платежа";"Валюта платежа";"Кэшбэк";"Категория";"MCC";"Описание";"Бонусы"']
+    for i in range(6):
+        category, description = ('Кафе', 'Оплата в кафе') if i % 2 else ('Супермаркеты', 'Оплата в AZBUKA')
+        lines.append('01.02.2020 10:%02d:00;01.02.2020;*1234;OK;-%d,00;RUB;-%d,00;RUB;;%s;5812;%s;0,00'
+                     % (i, i + 1, i + 1, category, description))
+    path = tmpdir.join('tinkoff.csv')
+    path.write_text('\n'.join(lines) + '\n', encoding='cp1251')
+    return str(path)
+
+
+def test_string_pool():
+    pool = StringPool()
+    first = ''.join(['Оплата', ' в кафе'])
+    second = ''.join(['Оплата в', ' кафе'])
+
+    assert first is not second
+    assert pool[first] is first
+    assert pool[second] is first
+    assert len(pool) == 1
+
+
+def test_memo():
+    calls = []
+
+    def join(*parts):
+        calls.append(parts)
+        return ', '.join(parts)
+
+    memo = Memo(join)
+
+    assert memo['Кафе', '5812'] == 'Кафе, 5812'
+    assert memo['Кафе', '5812'] is memo['Кафе', '5812']
+    assert memo['Аптеки', '5912'] == 'Аптеки, 5912'
+    assert calls == [('Кафе', '5812'), ('Аптеки', '5912')]
+
+
+def test_pool_size():
+    pool = StringPool(size=2)
+    memo = Memo(str.upper, size=2)
+    for value in ['a', 'b', 'c']:
+        assert pool[value] == value
+        assert memo[value,] == value.upper()
+
+    # values seen after the pool is full are shared again
+    late = ''.join(['d', 'e'])
+    assert pool[late] is late
+    assert pool[''.join(['d', 'e'])] is late
+    assert memo['de',] is memo['de',]
+    assert len(pool) <= 2 and len(memo) <= 2
+
+
+def test_tinkoff_memos_shared(tmpdir):
+    plugin = TinkoffPlugin(UI(), {'account': 'test'})
+    path = _tinkoff_sample(tmpdir)
+    parser = plugin.get_parser(path)
+    lines = parser.parse().lines
+    parser.close()
+    _, table = columnar.parse_columns(plugin, path)
+
+    for memos in ([line.memo for line in lines], table['memo']):
+        assert memos[:2] == ['Супермаркеты: Оплата в AZBUKA, 5812, *1234', 'Кафе: Оплата в кафе, 5812, *1234']
+        assert len({id(memo) for memo in memos}) == 2
+
+
+def test_vtb_payees_shared(tmpdir):
+    # every record twice
+    with open(file_sample('vtb.csv'), encoding='cp1251') as f:
+        text = f.read().splitlines()
+    records = text[VtbStatementParser.header_lines:]
+    path = tmpdir.join('vtb.csv')
+    path.write_text('\n'.join(text + records) + '\n', encoding='cp1251')
+
+    parser = VtbPlugin(UI(), {}).get_parser(str(path))
+    lines = parser.parse().lines
+    parser.close()
+    assert len(lines) == 2 * len(records)
+    by_value = {}
+    for line in lines:
+        assert by_value.setdefault(line.memo, line.memo) is line.memo
+        assert by_value.setdefault(line.payee, line.payee) is line.payee
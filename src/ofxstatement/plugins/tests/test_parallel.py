@@ -0,0 +1,82 @@
+from unittest import mock
+
+import pytest
+
+from ofxstatement.plugins.alfabank import AlfabankPlugin
+from ofxstatement.plugins.parallel import parallel_workers, split_ranges
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+COPIES = 50
+
+
+def _multiply(sample, header_lines, tmpdir):
+    # keep sample header, repeat its records
+    with open(file_sample(sample), 'rb') as f:
+        lines = f.readlines()
+    path = tmpdir.join(sample)
+    path.write_binary(b''.join(lines[:header_lines] + lines[header_lines:] * COPIES))
+    return str(path)
+
+
+def _tinkoff_sample(tmpdir):
+    # declined and blank records precede the first one setting statement currency
+    lines = ['Дата операции;Дата платежа;Номер карты;Статус;Сумма операции;Валюта операции;Сумма платежа;'
+             'Валюта платежа;Кэшбэк;Категория;MCC;Описание;Бонусы',
+             '01.02.2020 09:00:00;01.02.2020;*1234;FAILED;-1,00;RUB;-1,00;RUB;;Кафе;5812;Оплата;0,00', '']
+    for i in range(COPIES):
+        currency = 'RUB' if i % 3 else 'USD'
+        lines.append('01.02.2020 10:%02d:00;01.02.2020;*1234;OK;-%d,00;%s;-%d,00;%s;;Кафе;5812;Оплата;0,00'
+                     % (i, i + 1, currency, i + 1, currency))
+    path = tmpdir.join('tinkoff.csv')
+    path.write_text('\n'.join(lines) + '\n', encoding='cp1251')
+    return str(path)
+
+
+@pytest.mark.parametrize('plugin_cls, settings, sample, header_lines', [
+    (AlfabankPlugin, {}, 'alfabank.csv', 1),
+    (SberBankCSVPlugin, {}, 'sberbank.csv', 1),
+    (VtbPlugin, {'user_date': 'true'}, 'vtb.csv', 12),
+])
+def test_same_as_sequential(plugin_cls, settings, sample, header_lines, tmpdir):
+    path = _multiply(sample, header_lines, tmpdir)
+    _assert_same_as_sequential(plugin_cls, settings, path)
+
+
+def test_tinkoff_first_record_declined(tmpdir):
+    statement = _assert_same_as_sequential(TinkoffPlugin, {'account': 'card'}, _tinkoff_sample(tmpdir))
+
+    assert statement.currency == 'USD'
+    assert len(statement.lines) == 17
+
+
+def _assert_same_as_sequential(plugin_cls, settings, path):
+    expected = plugin_cls(mock.Mock(), settings).get_parser(path).parse()
+
+    parser = plugin_cls(mock.Mock(), dict(settings, parallel='3')).get_parser(path)
+    parser.min_chunk_size = 100
+    statement = parser.parse()
+
+    assert len(statement.lines) == len(expected.lines)
+    assert [vars(l) for l in statement.lines] == [vars(l) for l in expected.lines]
+    assert statement.account_id == expected.account_id
+    assert statement.currency == expected.currency
+    assert statement.start_balance == expected.start_balance
+    return statement
+
+
+def test_split_ranges(tmpdir):
+    path = tmpdir.join('lines.txt')
+    path.write_binary(b'header\n' + b'0123456789\n' * 10 + b'tail')
+
+    ranges = split_ranges(str(path), 7, 4, min_size=1)
+
+    assert ranges == [(7, 40, 3), (40, 73, 3), (73, 106, 3), (106, 121, 1)]
+
+
+def test_parallel_workers():
+    assert parallel_workers({}) == 0
+    assert parallel_workers({'parallel': '4'}) == 4
+    assert parallel_workers({'parallel': 'auto'}) >= 1
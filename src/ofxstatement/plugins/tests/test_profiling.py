@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins import profiling
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.sberbank_txt import SberBankTxtPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+
+@pytest.fixture(autouse=True)
+def no_profile_env(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+
+
+def _lines(statement):
+    return [vars(line) for line in statement.lines]
+
+
+def test_summary(capsys):
+    plugin = VtbPlugin(UI(), {'profile': 'summary'})
+    parser = plugin.get_parser(file_sample('vtb.csv'))
+    statement = parser.parse()
+    parser.close()
+
+    assert _lines(statement) == _lines(VtbPlugin(UI(), {}).get_parser(file_sample('vtb.csv')).parse())
+    assert parser.profile.calls['parse_record'] == len(statement.lines)
+    assert parser.profile.calls['transaction_id'] == len(statement.lines)
+    assert parser.profile.calls['parse_type'] == len(statement.lines)
+    assert parser.profile.calls['decode'] > len(statement.lines)
+    report = capsys.readouterr().err
+    assert report.startswith('Profile of VtbStatementParser\n')
+    assert 'transaction_id' in report
+
+
+def test_json_transitions(capsys):
+    parser = SberBankTxtPlugin(UI(), {'profile': 'json'}).get_parser(file_sample('sberbank_visa.txt'))
+    statement = parser.parse()
+    parser.close()
+
+    report = json.loads(capsys.readouterr().err)
+    assert report['parser'] == 'SberBankTxtStatementParser'
+    assert report['transitions']['init -> currency'] == 1
+    # two cards, a transaction table each
+    assert report['transitions']['transaction -> end_balance'] == 2
+    assert sum(report['transitions'].values()) == report['phases']['parse_record']['calls']
+    assert len(statement.lines) == 34
+
+
+def test_environment_and_file(monkeypatch, tmpdir):
+    path = str(tmpdir.join('profile.json'))
+    monkeypatch.setenv(profiling.PROFILE_ENV, 'json:' + path)
+    parser = SberBankCSVPlugin(UI(), {}).get_parser(file_sample('sberbank.csv'))
+    table = parser.parse_columns()
+    parser.close()
+
+    with open(path) as f:
+        phases = json.load(f)['phases']
+    assert phases['parse_date']['calls'] == 2 * len(table['id'])
+    # memos of all rows are formatted at once in columnar mode
+    assert 'format_memo' not in phases
+    # setting disables profiling requested by environment
+    parser = SberBankCSVPlugin(UI(), {'profile': ''}).get_parser(file_sample('sberbank.csv'))
+    parser.close()
+    assert not hasattr(parser, 'profile')
+
+
+def test_parallel(tmpdir):
+    # sample records repeated, so that workers get some of them
+    with open(file_sample('sberbank.csv'), 'rb') as f:
+        lines = f.readlines()
+    sample = tmpdir.join('sberbank.csv')
+    sample.write_binary(b''.join(lines[:1] + lines[1:] * 20))
+    path = str(tmpdir.join('profile.json'))
+    parser = SberBankCSVPlugin(UI(), {'profile': 'json:' + path, 'parallel': '2'}).get_parser(str(sample))
+    parser.min_chunk_size = 100
+    statement = parser.parse()
+    parser.close()
+
+    with open(path) as f:
+        phases = json.load(f)['phases']
+    assert len(statement.lines) == 220
+    # records parsed in this process and in workers
+    assert phases['parse_record']['calls'] == 220
+    assert phases['transaction_id']['calls'] == 220
+    assert phases['decode']['calls'] > 220
+
+
+def test_disabled():
+    parser = SberBankTxtPlugin(UI(), {}).get_parser(file_sample('sberbank_visa.txt'))
+    parser.close()
+    assert not hasattr(parser, 'profile')
+    assert 'run' not in vars(parser)
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        VtbPlugin(UI(), {'profile': 'verbose'})
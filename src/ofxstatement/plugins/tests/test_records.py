@@ -0,0 +1,27 @@
+import csv
+import io
+from collections import namedtuple
+
+from ofxstatement.plugins.records import read_records
+
+Record = namedtuple('Record', ['a', 'b', 'c'])
+
+DATA = 'a1;b1;c1\n\na2;b2\na3;b3;c3;d3;\n'
+
+
+def test_same_as_dict_reader():
+    dicts = list(csv.DictReader(io.StringIO(DATA), delimiter=';', fieldnames=Record._fields))
+    records = list(read_records(io.StringIO(DATA), Record, ';'))
+
+    assert [{f: d[f] for f in Record._fields} for d in dicts] == [r._asdict() for r in records]
+    assert records == [Record('a1', 'b1', 'c1'), Record('a2', 'b2', None), Record('a3', 'b3', 'c3')]
+
+
+QUOTED = 'a1;"b;1";c1\r\n"a2";"b\n2";c2\n'
+
+
+def test_quoted_fields():
+    expected = [Record('a1', 'b;1', 'c1'), Record('a2', 'b\n2', 'c2')]
+
+    assert list(read_records(io.StringIO(QUOTED), Record, ';')) == expected
+    assert list(read_records(io.StringIO(DATA + QUOTED), Record, ';'))[3:] == expected
@@ -1,7 +1,12 @@
 import datetime
+import re
+from decimal import Decimal
+
+import pytest
 
 from ofxstatement.ui import UI
-from ofxstatement.plugins.sberbank_txt import SberBankTxtPlugin
+from ofxstatement.plugins.sberbank_txt import (SberBankTxtPlugin, SberBankTxtStatementParser, ParserState, matcher,
+                                               separator_guard)
 from .util import file_sample
 
 
@@ -23,7 +28,7 @@ def test_parse_maestro():
 
     line0 = s.lines[0]
 
-    assert line0.amount == 10000.0
+    assert line0.amount == Decimal('10000.00')
     assert line0.memo == 'SBOL MOSCOW RUS'
     assert line0.date == datetime.datetime(2019, 3, 26, 0, 0)
     assert line0.trntype == 'DEBIT'
@@ -39,8 +44,8 @@ def test_parse_visa():
     assert s.currency == 'RUR'
 
     assert s.bank_id == 'SberBank'
-    assert s.end_balance == 20877.29
-    assert s.start_balance == 318.3
+    assert s.end_balance == Decimal('20877.29')
+    assert s.start_balance == Decimal('318.30')
 
     assert len(s.lines) == 34
 
@@ -51,7 +56,7 @@ def test_parse_visa():
 
     assert s.lines[7].memo == 'PEREKRESTOK KRYLATSKOY E NOGINSK RU'
     assert s.lines[7].trntype == 'CREDIT'
-    assert s.lines[7].amount == -1699.0
+    assert s.lines[7].amount == Decimal('-1699.00')
     assert s.lines[7].date == datetime.datetime(2018, 10, 4, 0, 0)
 
     assert s.lines[14].memo == 'TINKOFF BANK CARD2CARD Visa Direct RU'
@@ -59,4 +64,60 @@ def test_parse_visa():
     assert s.lines[25].memo == 'Rocketbank.ru Card2Car d MOSCOW RU'
     assert s.lines[25].trntype == 'CREDIT'
 
-    assert abs(sum(l.amount for l in s.lines) + s.start_balance - s.end_balance) < 0.001
+    assert sum(l.amount for l in s.lines) + s.start_balance == s.end_balance
+
+
+def test_combined_state_dispatch():
+    calls = []
+    state = ParserState('test', [
+        matcher(r"^[-+]{3,}$", 'separator', guard=separator_guard),
+        matcher(r"^(\d+)-(\d+)$", 'range', lambda p, m: calls.append((p, m.group(1), m.group(2)))),
+        matcher(r"^(\w+)$", None, lambda p, m: calls.append((p, m.group(0), m.group(1)))),
+    ])
+
+    assert state.run('a', '---+') == 'separator'
+    assert state.run('b', '12-34') == 'range'
+    assert state.run('c', 'word') is None
+    assert state.run('d', '+-') is None
+    assert calls == [('b', '12', '34'), ('c', 'word', 'word')]
+    # patterns with and without separator alternative
+    assert len(state.patterns) == 2
+
+
+def test_machine_is_shared():
+    plugin = SberBankTxtPlugin(UI(), {})
+    first = plugin.get_parser(file_sample('sberbank_maestro.txt'))
+    second = plugin.get_parser(file_sample('sberbank_visa.txt'))
+
+    assert first.machine is second.machine is SberBankTxtStatementParser.machine
+    # parsing one file does not leak into another
+    assert len(second.parse().lines) == 34
+    assert len(first.parse().lines) == 4
+    assert first.statement.account_id == 'СБЕРБАНК - MAESTRO XXXXXXXXX XXXX40696 ОСНОВНАЯ'
+    with pytest.raises(TypeError):
+        SberBankTxtStatementParser.machine['init'] = None
+
+
+def sequential_parse(parser):
+    """Parse statement trying matchers one by one, as before they were combined"""
+    for line in parser.fin:
+        for matcher, nextState, function, guard in parser.machine[parser.currentState].matchers:
+            match = re.match(matcher, line)
+            if match:
+                if function:
+                    function(parser, match)
+                if nextState:
+                    parser.currentState = nextState
+                break
+    return parser.statement, [line.to_line() for line in parser.completed]
+
+
+@pytest.mark.parametrize('sample', ['sberbank_maestro.txt', 'sberbank_visa.txt'])
+def test_combined_matches_sequential(sample):
+    plugin = SberBankTxtPlugin(UI(), {})
+    s = plugin.get_parser(file_sample(sample)).parse()
+    expected, lines = sequential_parse(plugin.get_parser(file_sample(sample)))
+
+    assert [vars(l) for l in s.lines] == [vars(l) for l in lines]
+    assert {k: v for k, v in vars(s).items() if k != 'lines'} == \
+        {k: v for k, v in vars(expected).items() if k != 'lines'}
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ofxstatement.plugins import server
+from .util import file_sample
+
+
+def _sample(name):
+    with open(file_sample(name), 'rb') as f:
+        return f.read()
+
+
+async def _request(port, method, target, body=None, length=None, extra=''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    head = '%s %s HTTP/1.1\r\nHost: localhost\r\n%s' % (method, target, extra)
+    if body is not None:
+        head += 'Content-Length: %d\r\n' % (len(body) if length is None else length)
+    writer.write(head.encode('latin-1') + b'\r\n' + (body or b''))
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, body
+
+
+def _serve(test, **kwargs):
+    """Run coroutine function test(server, port) against a server on a free port"""
+    loop = asyncio.new_event_loop()
+    conversions = server.ConversionServer(executor=ThreadPoolExecutor(2), **kwargs)
+
+    async def main():
+        listener = await conversions.start('127.0.0.1', 0)
+        try:
+            await test(conversions, listener.sockets[0].getsockname()[1])
+        finally:
+            listener.close()
+            await listener.wait_closed()
+
+    try:
+        loop.run_until_complete(main())
+    finally:
+        conversions.close()
+        loop.close()
+
+
+def test_convert():
+    async def test(conversions, port):
+        status, headers, body = await _request(port, 'POST', '/convert/sberbank_txt', _sample('sberbank_visa.txt'))
+
+        assert status == 200
+        assert headers['Content-Type'].startswith('application/x-ofx')
+        assert headers['X-Transactions'] == '34'
+        assert int(headers['Content-Length']) == len(body)
+        assert body.count(b'<STMTTRN>') == 34
+
+        status, _, body = await _request(port, 'GET', '/metrics')
+        metrics = json.loads(body.decode('utf-8'))
+        assert status == 200
+        assert metrics['requests'] == {'200': 1}
+        assert metrics['plugins'] == {'sberbank_txt': 1}
+        assert metrics['queued'] == metrics['running'] == 0
+        assert metrics['latency']['max'] > 0
+
+    _serve(test)
+
+
+@pytest.mark.parametrize('method, target, sample, status', [
+    ('POST', '/convert/vtb', 'vtb.csv', 422),  # balances do not add up
+    ('POST', '/convert/nonexistent', 'vtb.csv', 422),
+    ('POST', '/convert/vtb', 'empty', 413),  # announces more than max_size
+    ('POST', '/convert/vtb', None, 411),
+    ('POST', '/convert/vtb', 'negative', 400),
+    ('POST', '/convert/vtb', 'long header', 500),  # over the stream line limit
+    ('GET', '/convert/vtb', None, 405),
+    ('GET', '/', None, 404),
+])
+def test_errors(method, target, sample, status):
+    body = b'' if sample in ('empty', 'negative', 'long header') else sample and _sample(sample)
+    length = {'empty': server.DEFAULT_MAX_SIZE + 1, 'negative': -5}.get(sample)
+    extra = 'X-Padding: %s\r\n' % ('x' * 100000) if sample == 'long header' else ''
+
+    async def test(conversions, port):
+        assert (await _request(port, method, target, body, length, extra))[0] == status
+        assert conversions.metrics.requests == {status: 1}
+        # failed conversions count in latency too
+        assert len(conversions.metrics.latency) == (1 if status == 422 else 0)
+
+    _serve(test)
+
+
+def test_send_failure(monkeypatch):
+    convert = server.convert_file
+
+    def convert_file(path, plugin_name, settings, output):
+        # output can not be read once its size is sent
+        os.mkdir(output)
+        return convert(path, plugin_name, settings, output + '.ofx')
+
+    monkeypatch.setattr(server, 'convert_file', convert_file)
+
+    async def test(conversions, port):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        body = _sample('alfabank.csv')
+        writer.write(b'POST /convert/alfabank HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+        response = await reader.read()
+        writer.close()
+
+        assert response.startswith(b'HTTP/1.1 200 ')
+        assert b'HTTP/1.1 500' not in response
+        assert conversions.metrics.requests == {500: 1}
+        assert len(conversions.metrics.latency) == 1
+
+    _serve(test)
+
+
+def test_queue_full():
+    async def test(conversions, port):
+        # an upload in progress takes the only place, though the worker is free
+        body = _sample('alfabank.csv')
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(b'POST /convert/alfabank HTTP/1.1\r\nContent-Length: %d\r\n\r\n' % len(body) + body[:10])
+        while conversions.metrics.queued == 0:
+            await asyncio.sleep(0.01)
+
+        assert (await _request(port, 'POST', '/convert/alfabank', body))[0] == 503
+        writer.write(body[10:])
+        assert (await reader.read()).startswith(b'HTTP/1.1 200 ')
+        writer.close()
+        assert (await _request(port, 'POST', '/convert/alfabank', body))[0] == 200
+
+    _serve(test, workers=1, queue_size=0)
+
+
+def test_queued_requests_wait():
+    async def test(conversions, port):
+        async with conversions.slots:
+            pending = asyncio.ensure_future(_request(port, 'POST', '/convert/alfabank', _sample('alfabank.csv')))
+            while conversions.metrics.queued == 0:
+                await asyncio.sleep(0.01)
+            assert conversions.metrics.snapshot()['max_queued'] == 1
+        assert (await pending)[0] == 200
+        assert conversions.metrics.queued == 0
+
+    _serve(test, workers=1, queue_size=1)
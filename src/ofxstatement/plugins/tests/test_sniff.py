@@ -0,0 +1,78 @@
+import shutil
+
+import pytest
+
+from ofxstatement.plugins import batch, sniff
+from .util import file_sample
+
+
+@pytest.mark.parametrize('sample, plugin, encoding', [
+    ('alfabank.csv', 'alfabank', 'cp1251'),
+    ('sberbank.csv', 'sberbank_csv', 'utf-8'),
+    ('sberbank_visa.txt', 'sberbank_txt', 'cp1251'),
+    ('sberbank_maestro.txt', 'sberbank_txt', 'cp1251'),
+    ('vtb.csv', 'vtb', 'cp1251'),
+])
+def test_samples(sample, plugin, encoding):
+    result = sniff.sniff(file_sample(sample))
+
+    assert (result.plugin, result.encoding) == (plugin, encoding)
+    assert result.confidence == 1
+    # runner-up is far behind
+    assert sniff.score_head(sniff.read_head(file_sample(sample)))[1].confidence < sniff.MIN_CONFIDENCE
+
+
+def test_tinkoff_avangard(tmpdir):
+    tinkoff = tmpdir.join('tinkoff.csv')
+    tinkoff.write_text('"Дата операции";"Дата платежа";"Номер карты";"Статус";"Сумма операции";"Валюта операции";'
+                       '"Сумма платежа";"Валюта платежа";"Кэшбэк";"Категория";"MCC";"Описание";"Бонусы"\n'
+                       '"01.02.2020 10:00:00";"01.02.2020";"*1234";"OK";"-1,00";"RUB";"-1,00";"RUB";"";"Кафе";'
+                       '"5812";"Оплата";"0,00"\n', encoding='cp1251')
+    avangard = tmpdir.join('avangard.csv')
+    avangard.write_text('01.01.2019 00:02;;100.00;Покупка;31.12.2018 00:02;5321****4789;100.00;RUB;5411;SHOP\n',
+                        encoding='cp1251')
+
+    assert sniff.sniff(str(tinkoff)).plugin == 'tinkoff'
+    assert sniff.sniff(str(avangard)).plugin == 'avangard'
+
+
+def test_other_encoding(tmpdir):
+    # alfabank statement re-saved in UTF-8
+    with open(file_sample('alfabank.csv'), encoding='cp1251') as f:
+        path = tmpdir.join('alfabank.csv')
+        path.write_text(f.read(), encoding='utf-8')
+
+    result = sniff.sniff(str(path))
+
+    assert (result.plugin, result.encoding) == ('alfabank', 'utf-8')
+    assert sniff.plugin_settings(result) == {'file_encoding': 'utf-8'}
+
+
+def test_not_recognized(tmpdir):
+    path = tmpdir.join('notes.txt')
+    path.write_text('shopping list\nmilk\n', encoding='ascii')
+
+    assert sniff.sniff(str(path)) is None
+    with pytest.raises(ValueError):
+        batch.resolve_plugin('auto', None, str(path))
+
+
+def test_read_head_cuts_at_line(tmpdir):
+    path = tmpdir.join('lines.txt')
+    path.write_binary(b'first\nsecond\nthird')
+
+    assert sniff.read_head(str(path), 10) == b'first\n'
+    assert sniff.read_head(str(path)) == b'first\nsecond\nthird'
+
+
+def test_batch_auto(tmpdir):
+    source = tmpdir.mkdir('source')
+    for name in ('alfabank.csv', 'sberbank_visa.txt'):
+        shutil.copy(file_sample(name), str(source))
+    source.join('notes.txt').write_text('shopping list\n', encoding='ascii')
+    output = tmpdir.mkdir('output')
+
+    results = batch.convert_batch(batch.collect_files([str(source)]), [('*', 'auto')], str(output), workers=1)
+
+    assert [(r.plugin, r.error) for r in results] == [
+        ('alfabank', None), ('auto', 'statement format not recognized'), ('sberbank_txt', None)]
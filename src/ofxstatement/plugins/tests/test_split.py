@@ -0,0 +1,110 @@
+from decimal import Decimal
+
+import pytest
+
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins import batch
+from ofxstatement.plugins.alfabank import AlfabankPlugin
+from ofxstatement.plugins.split import parse_split, split_path, write_split_ofx
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.vtb import VtbPlugin
+from ofxstatement import statement
+from .util import file_sample
+
+
+def _alfabank_sample(tmpdir):
+    # two more accounts: a dollar one and a second rouble one
+    with open(file_sample('alfabank.csv'), encoding='cp1251') as f:
+        lines = f.read().splitlines()
+    extra = [line.replace(';11111111111111111111;RUR;', ';22222222222222222222;USD;') for line in lines[1:]]
+    extra.append(lines[1].replace('11111111111111111111', '33333333333333333333'))
+    path = tmpdir.join('alfabank.csv')
+    path.write_text('\n'.join(lines[:2] + extra + lines[2:]) + '\n', encoding='cp1251')
+    return str(path)
+
+
+def _tinkoff_sample(tmpdir):
+    lines = ['Дата операции;Дата платежа;Номер карты;Статус;Сумма операции;Валюта операции;Сумма платежа;'
+             'Валюта платежа;Кэшбэк;Категория;MCC;Описание;Бонусы']
+    for i, currency in enumerate(['RUB', 'USD', 'RUB', 'EUR', 'USD', 'RUB']):
+        lines.append('01.02.2020 10:0%d:00;01.02.2020;*1234;%s;-1%d,00;%s;-1%d,00;%s;;Кафе;5812;Оплата;0,00'
+                     % (i, 'FAILED' if i == 2 else 'OK', i, currency, i, currency))
+    path = tmpdir.join('tinkoff.csv')
+    path.write_text('\n'.join(lines) + '\n', encoding='cp1251')
+    return str(path)
+
+
+def test_alfabank(tmpdir):
+    path = _alfabank_sample(tmpdir)
+    plugin = AlfabankPlugin(UI(), {'split': 'true'})
+
+    statements = parse_split(plugin, path)
+
+    assert [(s.account_id, s.currency, len(s.lines)) for s in statements] == [
+        ('11111111111111111111', 'RUR', 3),
+        ('22222222222222222222', 'USD', 3),
+        ('33333333333333333333', 'RUR', 1),
+    ]
+    assert all(s.bank_id == 'Alfabank' for s in statements)
+    # without split, records of both rouble accounts are kept in one statement
+    parser = plugin.get_parser(path)
+    single = parser.parse()
+    parser.close()
+    assert [vars(l) for l in single.lines] == \
+        [vars(l) for l in statements[0].lines[:1] + statements[2].lines + statements[0].lines[1:]]
+
+
+def test_tinkoff(tmpdir):
+    statements = parse_split(TinkoffPlugin(UI(), {'account': 'card', 'split': 'true'}), _tinkoff_sample(tmpdir))
+
+    assert [(s.account_id, s.currency) for s in statements] == [('card', 'RUB'), ('card', 'USD'), ('card', 'EUR')]
+    assert [[l.amount for l in s.lines] for s in statements] == [
+        [Decimal('-10.00'), Decimal('-15.00')], [Decimal('-11.00'), Decimal('-14.00')], [Decimal('-13.00')]]
+
+
+def test_write_split_ofx(tmpdir):
+    output = str(tmpdir.join('out', 'statement.ofx'))
+    tmpdir.mkdir('out')
+
+    written = write_split_ofx(TinkoffPlugin(UI(), {'account': 'card'}), _tinkoff_sample(tmpdir), output)
+
+    assert [(target, writer.count) for target, writer in written] == [
+        (str(tmpdir.join('out', 'statement-card-RUB.ofx')), 2),
+        (str(tmpdir.join('out', 'statement-card-USD.ofx')), 2),
+        (str(tmpdir.join('out', 'statement-card-EUR.ofx')), 1),
+    ]
+    with open(written[1][0], encoding='utf-8') as f:
+        ofx = f.read()
+    assert '<CURDEF>USD</CURDEF>' in ofx
+    assert ofx.count('<STMTTRN>') == 2
+    assert len(tmpdir.join('out').listdir()) == 3
+
+
+def test_split_path():
+    assert split_path('out/a.ofx', statement.Statement('B', '4081 7810*', 'USD')) == 'out/a-4081_7810_-USD.ofx'
+    assert split_path('out/a', statement.Statement('B', None, 'RUB')) == 'out/a-RUB.ofx'
+
+
+def test_batch(tmpdir):
+    output = tmpdir.mkdir('output')
+    path = _alfabank_sample(tmpdir)
+
+    result = batch.convert_file(path, 'alfabank', {'split': 'true'}, str(output.join('alfabank.ofx')))
+
+    assert (result.error, result.rows) == (None, 7)
+    assert sorted(p.basename for p in output.listdir()) == [
+        'alfabank-11111111111111111111-RUR.ofx', 'alfabank-22222222222222222222-USD.ofx',
+        'alfabank-33333333333333333333-RUR.ofx']
+    assert result.output.split(', ')[0] == str(output.join('alfabank-11111111111111111111-RUR.ofx'))
+
+
+def test_not_supported(tmpdir):
+    output = tmpdir.mkdir('output')
+
+    with pytest.raises(ValueError, match='VtbPlugin does not support split'):
+        parse_split(VtbPlugin(UI(), {'split': 'true'}), file_sample('vtb.csv'))
+    result = batch.convert_file(file_sample('vtb.csv'), 'vtb', {'split': 'true'}, str(output.join('vtb.ofx')))
+
+    assert result.error == 'ValueError: VtbPlugin does not support split'
+    assert output.listdir() == []
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+PLUGINS = ['alfabank', 'avangard', 'sberbank_csv', 'sberbank_txt', 'tinkoff', 'vtb']
+
+# needed only by optional features, must not slow down plugin discovery
+DEFERRED = ['concurrent.futures', 'json', 'multiprocessing', 'sqlite3']
+
+
+@pytest.mark.parametrize('plugin', PLUGINS)
+def test_plugin_import_is_light(plugin):
+    code = ('import sys; import ofxstatement.plugins.%s; '
+            'print(" ".join(m for m in %r if m in sys.modules))' % (plugin, DEFERRED))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    output = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, env=env,
+                            universal_newlines=True, check=True).stdout
+
+    assert output.split() == []
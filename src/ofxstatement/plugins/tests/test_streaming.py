@@ -0,0 +1,62 @@
+import datetime
+import io
+from decimal import Decimal
+
+import pytest
+from ofxstatement import exceptions
+from ofxstatement.ofx import OfxWriter
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.alfabank import AlfabankPlugin
+from ofxstatement.plugins.sberbank_csv import SberBankCSVPlugin
+from ofxstatement.plugins.sberbank_txt import SberBankTxtPlugin
+from ofxstatement.plugins.streaming import StreamingOfxWriter, write_ofx
+from ofxstatement.plugins.vtb import VtbPlugin
+from .util import file_sample
+
+GEN_TIME = datetime.datetime(2020, 1, 1, 12, 0)
+
+SAMPLES = [
+    (AlfabankPlugin, {}, 'alfabank.csv'),
+    (SberBankCSVPlugin, {'currency': 'RUR'}, 'sberbank.csv'),
+    (SberBankTxtPlugin, {}, 'sberbank_maestro.txt'),
+    (SberBankTxtPlugin, {}, 'sberbank_visa.txt'),
+    (VtbPlugin, {}, 'vtb.csv'),
+]
+
+
+def _parser(plugin_cls, settings, sample):
+    return plugin_cls(UI(), settings).get_parser(file_sample(sample))
+
+
+@pytest.mark.parametrize('plugin_cls, settings, sample', SAMPLES)
+def test_streamed_ofx_is_the_same(plugin_cls, settings, sample):
+    writer = OfxWriter(_parser(plugin_cls, settings, sample).parse())
+    writer.genTime = GEN_TIME
+    expected = writer.toxml()
+
+    parser = _parser(plugin_cls, settings, sample)
+    out = io.StringIO()
+    writer = StreamingOfxWriter(parser.statement)
+    writer.genTime = GEN_TIME
+    writer.write(parser.iter_lines(), out)
+
+    assert out.getvalue() == expected
+    assert parser.statement.lines == []
+
+
+def test_write_ofx():
+    parser = _parser(SberBankTxtPlugin, {}, 'sberbank_visa.txt')
+
+    writer = write_ofx(parser, io.StringIO())
+
+    assert writer.count == 34
+    assert parser.statement.end_balance == Decimal('20877.29')
+
+
+def test_write_ofx_balance_mismatch():
+    # balances in the sample do not add up with its transactions
+    parser = _parser(VtbPlugin, {}, 'vtb.csv')
+
+    with pytest.raises(exceptions.ValidationError):
+        write_ofx(parser, io.StringIO())
@@ -0,0 +1,73 @@
+import pickle
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from ofxstatement import statement
+from ofxstatement.ui import UI
+
+from ofxstatement.plugins.tinkoff import TinkoffPlugin
+from ofxstatement.plugins.transactions import FIELDS, Transaction, to_lines
+
+
+def _transaction():
+    transaction = Transaction('1', datetime(2020, 2, 1), 'Кафе', Decimal('-10.00'))
+    transaction.payee = 'CAFE'
+    transaction.trntype = 'CREDIT'
+    return transaction
+
+
+def test_fields():
+    transaction = Transaction()
+
+    assert not hasattr(transaction, '__dict__')
+    assert set(FIELDS) >= set(vars(statement.StatementLine()))
+    assert all(hasattr(statement.StatementLine(), name) for name in FIELDS)
+    assert transaction.trntype == statement.StatementLine().trntype
+
+
+def test_to_line():
+    expected = statement.StatementLine('1', datetime(2020, 2, 1), 'Кафе', Decimal('-10.00'))
+    expected.payee = 'CAFE'
+    expected.trntype = 'CREDIT'
+
+    line, = to_lines([_transaction()])
+
+    assert isinstance(line, statement.StatementLine)
+    assert vars(line) == vars(expected)
+
+
+def test_pickle():
+    copy = pickle.loads(pickle.dumps(_transaction()))
+
+    assert [getattr(copy, name) for name in FIELDS] == [getattr(_transaction(), name) for name in FIELDS]
+
+
+def test_assert_valid():
+    _transaction().assert_valid()
+    transaction = _transaction()
+    transaction.trntype = 'UNKNOWN'
+    with pytest.raises(AssertionError):
+        transaction.assert_valid()
+    with pytest.raises(AssertionError):
+        Transaction(memo='no id').assert_valid()
+
+
+def test_iter_lines_and_parse(tmpdir):
+    path = tmpdir.join('tinkoff.csv')
+    path.write_text('"Дата операции";"Дата платежа";"Номер карты";"Статус";"Сумма операции";"Валюта операции";'
+                    '"Сумма платежа";"Валюта платежа";"Кэшбэк";"Категория";"MCC";"Описание";"Бонусы"\n'
+                    '01.02.2020 10:00:00;01.02.2020;*1234;OK;-10,00;RUB;-10,00;RUB;;Кафе;5812;Оплата в кафе;0,00\n',
+                    encoding='cp1251')
+    plugin = TinkoffPlugin(UI(), {'account': 'test'})
+
+    with open(str(path), encoding=plugin.get_encoding()) as f:
+        transaction, = plugin.create_parser(f).iter_lines()
+    parser = plugin.get_parser(str(path))
+    line, = parser.parse().lines
+    parser.close()
+
+    assert isinstance(transaction, Transaction)
+    assert isinstance(line, statement.StatementLine)
+    assert vars(line) == vars(transaction.to_line())
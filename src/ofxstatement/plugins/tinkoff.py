@@ -16,13 +16,13 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import csv
-from datetime import datetime
-from decimal import Decimal
-
-from ofxstatement.parser import StatementParser
+from collections import namedtuple
 from ofxstatement.plugin import Plugin
-from ofxstatement import statement
+from ofxstatement.plugins.columnar import filter_columns, read_columns
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.fingerprints import incremental
+from ofxstatement.plugins.formats import Amount, Format, FormatStatementParser, TypeRule
+from ofxstatement.plugins.parallel import ParallelStatementParser, parallel_workers
 
 
 # file format options
@@ -31,6 +31,7 @@ t_time_format = '%d.%m.%Y %H:%M:%S'
 t_encoding = 'cp1251'
 t_fieldnames = ['op_time', 'tr_time', 'card', 'status', 'op_amount', 'op_currency', 'amount',
                 'currency', 'cashback', 'category', 'MCC', 'description', 'bonus']
+TinkoffRecord = namedtuple('TinkoffRecord', t_fieldnames)
 t_type_map = {
     u"Капитализация": 'DIV',
     u"Вознаграждение за операции покупок": 'DIV',
@@ -47,86 +48,84 @@ t_type_map = {
 }
 
 
-def parse_type(type, amount):
-    for filter in t_type_map.keys():
-        if type.startswith(filter):
-            return t_type_map[filter]
-
-    result = None
-
-    if amount > 0:
-        result = 'DEBIT'
-    elif amount < 0:
-        result = 'CREDIT'
-
-    # print("Unknown type \"%s\", consider %s"%(type, result))
-    return result
-
+t_format = Format(
+    record=TinkoffRecord, delimiter=t_delimiter, skip_lines=1, date_format=t_time_format,
+    date=('op_time',), amount=Amount('amount'), trntype=TypeRule('description', t_type_map),
+    memo='{category}: {description}[, {MCC}][, {card}]', id='date')
 
-class TinkoffStatementParser(StatementParser):
-    statement = None
 
-    def __init__(self, fin):
-        super().__init__()
-        self.statement = statement.Statement()
-        self.fin = fin
-        # Skip 1st row with column's headers
-        self.fin.readline()
-        self.cur_record = 1
-
-    def split_records(self):
-        return csv.DictReader(self.fin, delimiter=t_delimiter, fieldnames=t_fieldnames)
+class TinkoffStatementParser(FormatStatementParser):
+    # number of lines preceding transaction records
+    header_lines = 1
+    profile_hooks = {'parse_date': 'parse_date', 'parse_type': 'parse_type', 'format_memo': 'format_memo',
+                     'transaction_id': 'transaction_id'}
+    format = t_format
 
     def parse_record(self, line):
-        transaction = statement.StatementLine()
-
-        if not line['status'] == 'OK':
-            print("Notice: Skipping line %d: Transaction time %s status is %s." % (
-                self.cur_record, line['op_time'], line['status']))
+        if not line.status == 'OK':
+            self.diagnostics.skip(self.cur_record, "status is %s", line.status, detail=line.op_time)
             return None
 
         if not self.statement.currency:
-            self.statement.currency = line['currency']
+            self.statement.currency = line.currency
 
-        if not line['currency'] == self.statement.currency:
-            print("Transaction %s currency '%s' differ from account currency '%s'." % (
-                line['op_time'], line['currency'], self.statement.currency))
+        if not line.currency == self.statement.currency:
+            self.diagnostics.skip(self.cur_record, "currency %s differs from account currency %s",
+                                  line.currency, self.statement.currency, detail=line.op_time)
             return None
 
-        transaction.date = datetime.strptime(line['op_time'], t_time_format)
-
-        transaction.amount = Decimal(line['amount'].replace(',', '.'))
-
-        transaction.trntype = parse_type(line['description'], transaction.amount)
-
-        transaction.memo = "%s: %s" % (line['category'], line['description'])
-
-        self._append_to_memo(transaction, line, 'MCC')
-        self._append_to_memo(transaction, line, 'card')
-
-        # as csv file does not contain explicit id of transaction, generating artificial one
-        transaction.id = statement.generate_transaction_id(transaction)
-
-        if transaction.trntype:
-            return transaction
-        else:
-            return None
+        # date, amount, type, memo and id as t_format says
+        return super().parse_record(line)
+
+    def parse_columns(self):
+        columns = read_columns(self.fin, TinkoffRecord, t_delimiter)
+        keep = []
+        for status, currency, op_time in zip(columns.status, columns.currency, columns.op_time):
+            self.cur_record += 1
+            if not status == 'OK':
+                self.diagnostics.skip(self.cur_record, "status is %s", status, detail=op_time)
+                keep.append(False)
+                continue
+            if not self.statement.currency:
+                self.statement.currency = currency
+            if not currency == self.statement.currency:
+                self.diagnostics.skip(self.cur_record, "currency %s differs from account currency %s",
+                                      currency, self.statement.currency, detail=op_time)
+                keep.append(False)
+                continue
+            keep.append(True)
+        columns = filter_columns(columns, keep)
+
+        # date, amount, type, memo and id as t_format says
+        table = self.build_columns(columns)
+        self.diagnostics.report()
+        return table
 
     @staticmethod
-    def _append_to_memo(transaction, line, field):
-        if line[field]:
-            transaction.memo = "%s, %s" % (transaction.memo, line[field])
-
+    def split_key(line):
+        """Return (account, currency) of statement record belongs to, see split module"""
+        return None, line.currency
 
 
 class TinkoffPlugin(Plugin):
     """Tinkoff Bank CSV (http://tinkoff.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'Tinkoff', account_required=True)
+
+    def get_encoding(self):
+        return t_encoding
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=t_encoding)
-        parser = TinkoffStatementParser(f)
-        parser.statement.currency = self.settings.get('currency')
-        parser.statement.account_id = self.settings['account']
-        parser.statement.bank_id = self.settings.get('bank', 'Tinkoff')
-        return parser
+        if parallel_workers(self.settings):
+            parser = ParallelStatementParser(self, fin, TinkoffStatementParser.header_lines)
+        else:
+            parser = self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+        return incremental(self, parser)
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(TinkoffStatementParser(f), self.config)
@@ -0,0 +1,78 @@
+#    Compact transaction record for ofxstatement-russian plugins
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License version 3 as
+#    published by the Free Software Foundation.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""Transactions as slotted objects while parsing.
+
+StatementLine keeps its fields in a per-instance __dict__, which takes
+several times the memory of the values themselves. Parsers build
+Transaction objects with the same fields in __slots__ instead, iter_lines()
+yields them and OFX writers, columnar tables and worker processes take them
+as they are. They become StatementLine objects only in parse(), which
+returns a regular ofxstatement Statement.
+"""
+
+from ofxstatement import statement
+
+FIELDS = ('id', 'date', 'memo', 'amount', 'payee', 'date_user', 'check_no', 'refnum', 'trntype',
+          'bank_account_to')
+
+
+class Transaction:
+    """Statement line with fields of StatementLine and no __dict__"""
+
+    __slots__ = FIELDS
+
+    def __init__(self, id=None, date=None, memo=None, amount=None):
+        self.id = id
+        self.date = date
+        self.memo = memo
+        self.amount = amount
+        self.payee = None
+        self.date_user = None
+        self.check_no = None
+        self.refnum = None
+        self.trntype = 'CHECK'
+        self.bank_account_to = None
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in FIELDS)
+
+    def __setstate__(self, state):
+        for name, value in zip(FIELDS, state):
+            setattr(self, name, value)
+
+    def assert_valid(self):
+        """Same checks as StatementLine.assert_valid()"""
+        assert self.trntype in statement.TRANSACTION_TYPES, (
+            "trntype must be one of %s" % statement.TRANSACTION_TYPES)
+        if self.bank_account_to:
+            self.bank_account_to.assert_valid()
+        assert self.id or self.check_no or self.refnum
+
+    def to_line(self):
+        """Return StatementLine with the same fields"""
+        line = statement.StatementLine(self.id, self.date, self.memo, self.amount)
+        line.payee = self.payee
+        line.date_user = self.date_user
+        line.check_no = self.check_no
+        line.refnum = self.refnum
+        line.trntype = self.trntype
+        if self.bank_account_to is not None:
+            line.bank_account_to = self.bank_account_to
+        return line
+
+
+def to_lines(transactions):
+    """Return iterator of StatementLine objects for transactions"""
+    return (transaction.to_line() for transaction in transactions)
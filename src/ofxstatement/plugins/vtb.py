@@ -15,13 +15,16 @@
 #    You should have received a copy of the GNU General Public License
 #    along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-from ofxstatement.parser import StatementParser
 from ofxstatement.plugin import Plugin
-from ofxstatement import statement
+from ofxstatement.plugins.amounts import parse_amount
+from ofxstatement.plugins.columnar import map_distinct, new_table, read_columns
+from ofxstatement.plugins.config import configure, parser_config
+from ofxstatement.plugins.fingerprints import incremental
+from ofxstatement.plugins.formats import Amount, Format, FormatStatementParser, TypeRule
+from ofxstatement.plugins.parallel import ParallelStatementParser, parallel_workers
 
 import csv
-from decimal import Decimal
-from datetime import datetime
+from collections import namedtuple
 
 default_encoding = 'cp1251'
 delimiter = ';'
@@ -60,6 +63,7 @@ records_fieldnames = [
     'reason',
     'status',
 ]
+VtbRecord = namedtuple('VtbRecord', records_fieldnames)
 
 statuses = {
     'PROCESSING': 'В обработке',
@@ -69,21 +73,27 @@ card_info_prefix = "Карта *"
 card_info_prefix_len = len(card_info_prefix)+5
 
 
-class VtbStatementParser(StatementParser):
+vtb_format = Format(
+    record=VtbRecord, delimiter=delimiter, skip_lines=0, date_format=operation_date_format,
+    date_user='operation_date', amount=Amount('account_amount'), trntype=TypeRule(None, zero='CHECK'),
+    memo='{reason}', id='date_user', interned=('memo',))
 
-    statement = None
+
+class VtbStatementParser(FormatStatementParser):
+
+    # number of lines preceding transaction records: two period dates, statement
+    # info and balance info rows, each block followed by skipped lines
+    header_lines = 2 + dates_skip_lines + 1 + statement_info_skip_lines + 1 + balance_info_skip_lines
+    profile_hooks = {'parse_date': 'parse_date', 'parse_datetime': 'parse_date',
+                     'parse_payee': 'parse_payee', 'parse_type': 'parse_type', 'transaction_id': 'transaction_id'}
+    format = vtb_format
 
     def __init__(self, fin):
-        super().__init__()
-        self.statement = statement.Statement()
-        self.fin = fin
+        super().__init__(fin)
         self.user_date = False
 
-    def parse(self):
-        """Main entry point for parsers
-
-        super() implementation will call to split_records and parse_record to
-        process the file.
+    def parse_header(self):
+        """Read statement period, account and balances preceding transactions
         """
         dates_reader = csv.DictReader(self.fin, delimiter=delimiter, fieldnames=dates_fieldnames)
         start_date_entry = next(dates_reader)
@@ -105,44 +115,47 @@ class VtbStatementParser(StatementParser):
         if self.statement.currency is None:
             self.statement.currency = balance_info_item['currency']
 
-        self.statement.end_balance = self._parse_decimal(balance_info_item['end_balance'])
-        self.statement.start_balance = self.statement.end_balance - sum((self._parse_decimal(balance_info_item['income']),
-                                                                         self._parse_decimal(balance_info_item['withdrawl'])))
+        self.statement.end_balance = parse_amount(balance_info_item['end_balance'])
+        self.statement.start_balance = self.statement.end_balance - sum((parse_amount(balance_info_item['income']),
+                                                                         parse_amount(balance_info_item['withdrawl'])))
 
         self.skip_lines(balance_info_skip_lines)
 
-        super(VtbStatementParser, self).parse()
-        return self.statement
-
-    def split_records(self):
-        """Return iterable object consisting of a line per transaction
-        """
-        return csv.DictReader(self.fin, delimiter=delimiter, fieldnames=records_fieldnames)
-
     def parse_record(self, line):
-        """Parse given transaction line and return StatementLine object
+        """Parse given transaction line and return Transaction object
         """
-        transaction = statement.StatementLine()
+        # as csv file does not contain explicit id of transaction, generating artificial one
+        # using operation date as main date in all cases, see vtb_format
+        transaction = self.build_transaction(line)
 
-        transaction.date_user = datetime.strptime(line['operation_date'], operation_date_format)
-        if line['status'] != statuses['PROCESSING']:
+        if line.status != statuses['PROCESSING']:
             if self.user_date:
                 transaction.date = transaction.date_user
             else:
-                transaction.date = self.parse_datetime(line['processing_date'])
-        transaction.memo = line['reason']
-        transaction.amount = self._parse_decimal(line['account_amount'])
-        transaction.payee = self.parse_payee(line['reason'])
-        transaction.trntype = self.parse_type(transaction.amount)
-
-        # as csv file does not contain explicit id of transaction, generating artificial one
-        # using operation date as main date in all cases
-        transaction.id = statement.generate_transaction_id(statement.StatementLine(
-            date=transaction.date_user, memo=transaction.memo, amount=transaction.amount
-        ))
+                transaction.date = self.parse_datetime(line.processing_date)
+        # reasons and payees cut from them repeat with merchants, share them
+        transaction.payee = self.strings[self.parse_payee(line.reason)]
 
         return transaction
 
+    def parse_columns(self):
+        self.parse_header()
+        columns = read_columns(self.fin, VtbRecord, delimiter)
+        self.cur_record += len(columns.status)
+
+        user_dates = list(map(self.parse_date, columns.operation_date))
+        processed = [status != statuses['PROCESSING'] for status in columns.status]
+        if self.user_date:
+            dates = [date if keep else None for date, keep in zip(user_dates, processed)]
+        else:
+            dates = map_distinct(self.parse_datetime, columns.processing_date, processed)
+        amounts = list(map(parse_amount, columns.account_amount))
+        reasons = [self.strings[reason] for reason in columns.reason]
+        payees = map_distinct(lambda reason: self.strings[self.parse_payee(reason)], reasons)
+        return new_table(len(dates), id=list(map(self.transaction_id, user_dates, reasons, amounts)),
+                         date=dates, date_user=user_dates, trntype=map_distinct(self.parse_type, amounts),
+                         amount=amounts, memo=reasons, payee=payees)
+
     @staticmethod
     def parse_account_id(value):
         return value.lstrip("'")
@@ -154,35 +167,30 @@ class VtbStatementParser(StatementParser):
         else:
             return reason
 
-    @staticmethod
-    def parse_type(amount):
-        result = 'CHECK'
-        if amount > 0:
-            result = 'DEBIT'
-        elif amount < 0:
-            result = 'CREDIT'
-
-        return result
-
     def skip_lines(self, lines_count):
         for _ in range(lines_count):
             next(self.fin)
 
-    @staticmethod
-    def _parse_decimal(value):
-        # some plugins pass localised numbers, clean them up
-        return Decimal(value.replace(",", ".").replace(" ", ""))
-
 
 class VtbPlugin(Plugin):
     """VTB bank CSV (https://www.vtb.ru)
     """
 
+    def __init__(self, ui, settings):
+        super().__init__(ui, settings)
+        self.config = parser_config(settings, 'VTB', user_date='false')
+
+    def get_encoding(self):
+        return self.settings.get('file_encoding', default_encoding)
+
     def get_parser(self, fin):
-        f = open(fin, 'r', encoding=self.settings.get('file_encoding', default_encoding))
-        parser = VtbStatementParser(f)
-        parser.statement.currency = self.settings.get('currency')
-        parser.statement.account_id = self.settings.get('account')
-        parser.statement.bank_id = self.settings.get('bank', 'VTB')
-        parser.user_date = self.settings.get('user_date', 'false') == 'true'
-        return parser
+        if parallel_workers(self.settings):
+            parser = ParallelStatementParser(self, fin, VtbStatementParser.header_lines)
+        else:
+            parser = self.create_parser(open(fin, 'r', encoding=self.get_encoding()))
+        return incremental(self, parser)
+
+    def create_parser(self, f):
+        """Return parser reading statement from text stream f
+        """
+        return configure(VtbStatementParser(f), self.config)